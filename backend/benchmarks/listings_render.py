@@ -0,0 +1,127 @@
+"""CPU cost of rendering one GET /listings page, old path vs new.
+
+    cd backend && python -m benchmarks.listings_render [--cards 100] [--rounds 200]
+
+Only the Python work after Mongo returns is timed: normalising the documents
+is common to both paths and is measured separately. No database, no network.
+
+  legacy    Listing(**doc) per card, ListingsResponse around them, then
+            model_dump + JSONResponse (what get_listings did).
+  legacy+fa the same, then FastAPI's response_model validation and
+            jsonable_encoder on top (what get_artist_listings did).
+  fast      utils.rendering: one TypeAdapter pass and orjson.
+"""
+
+import argparse
+import copy
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from models.listingModel import Listing, ListingsResponse
+from utils.rendering import render_listings_response, validate_listings
+from utils.serialization import DEFAULT_ARTISAN, serialize_listing_doc
+
+
+def _card(i: int) -> dict:
+    """A document shaped like one row of the LIST_CARD_PROJECTION aggregate."""
+    return {
+        "_id": ObjectId(),
+        "title": f"Hand-painted Blue Pottery Vase #{i}",
+        "description": "Glazed quartz-paste vase from Jaipur. " * 8,
+        "category": "Pottery",
+        "tags": ["pottery", "jaipur", "blue", "handmade"],
+        "price": 1299.0 + i,
+        "originalPrice": 1499.0,
+        "suggested_price": "₹1,299",
+        "image_ids": [ObjectId(), ObjectId()],
+        "artist_id": "artisan-1",
+        "status": "active",
+        "inStock": True,
+        "stockCount": 10,
+        "state": "Rajasthan",
+        "created_at": datetime(2025, 1, 1) + timedelta(minutes=i),
+        "updated_at": datetime(2025, 1, 1) + timedelta(minutes=i),
+        "review_count": 12,
+        "rating": 4.5,
+    }
+
+
+def _page(cards: int) -> list:
+    docs = []
+    for i in range(cards):
+        doc = serialize_listing_doc(_card(i))
+        doc["images"] = [f"/api/listings/{doc['id']}/images/{x}" for x in doc["image_ids"]]
+        doc["artisan"] = dict(DEFAULT_ARTISAN)
+        docs.append(doc)
+    return docs
+
+
+def _legacy(docs: list) -> bytes:
+    result = ListingsResponse(
+        listings=[Listing(**doc) for doc in docs], total=1000, limit=len(docs), skip=0
+    )
+    return JSONResponse(result.model_dump(mode="json", by_alias=True)).body
+
+
+def _legacy_response_model(docs: list) -> bytes:
+    result = ListingsResponse(
+        listings=[Listing(**doc) for doc in docs], total=1000, limit=len(docs), skip=0
+    )
+    # Roughly fastapi.routing.serialize_response for a response_model route.
+    validated = TypeAdapter(ListingsResponse).validate_python(
+        result.model_dump(by_alias=True)
+    )
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def _fast(docs: list) -> bytes:
+    listings, _ = validate_listings(docs)
+    return render_listings_response(listings, total=1000, limit=len(docs), skip=0)
+
+
+def _time(fn, docs: list, rounds: int) -> float:
+    """Median milliseconds per page."""
+    samples = []
+    for _ in range(rounds):
+        page = copy.deepcopy(docs)
+        started = time.process_time()
+        fn(page)
+        samples.append((time.process_time() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = _page(args.cards)
+    assert _fast(copy.deepcopy(docs)) == _legacy(copy.deepcopy(docs)), "outputs differ"
+
+    started = time.process_time()
+    for _ in range(args.rounds):
+        _page(args.cards)
+    normalise = (time.process_time() - started) * 1000 / args.rounds
+
+    legacy = _time(_legacy, docs, args.rounds)
+    legacy_fa = _time(_legacy_response_model, docs, args.rounds)
+    fast = _time(_fast, docs, args.rounds)
+
+    print(f"{args.cards} cards/page, median of {args.rounds} rounds, CPU ms per page")
+    print(f"  serialize_listing_doc (both) {normalise:8.2f}")
+    print(f"  legacy                       {legacy:8.2f}")
+    print(f"  legacy + response_model      {legacy_fa:8.2f}")
+    print(f"  fast                         {fast:8.2f}")
+    print(f"  saved vs legacy              {legacy - fast:8.2f}  ({legacy / fast:.1f}x)")
+    print(f"  saved vs response_model      {legacy_fa - fast:8.2f}  ({legacy_fa / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""In-process BM25 engine vs the regex search path, by catalogue size.
+
+    cd backend && python -m benchmarks.search_engine [--sizes 10000,100000,1000000]
+        [--queries 50] [--mongo-uri mongodb://localhost:27017]
+
+For each size a synthetic catalogue is generated and the same search +
+category filter + first page (100) is answered three ways:
+
+  engine    services.search_engine: build time, posting-list memory and
+            per-query latency.
+  regex     the regex path's work done in-process: a case-insensitive
+            re.search over title/description/tags of every document, then
+            newest first. A lower bound for the unindexed $regex COLLSCAN,
+            which pays the same per-document cost plus BSON decoding.
+  mongo     only with --mongo-uri: the real regex aggregate from
+            routes/listing.py against a scratch database (dropped afterwards).
+
+Latencies are medians in milliseconds.
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from services.search_engine import ListingSearchEngine
+
+CRAFTS = [
+    "madhubani", "mithila", "pottery", "dhokra", "bandhani", "ikat", "kantha",
+    "brass", "terracotta", "block", "print", "chikankari", "pashmina", "jute",
+]
+NOUNS = ["vase", "saree", "stole", "lamp", "painting", "bowl", "bag", "horse", "wall", "hanging"]
+FILLER = "hand made by artisans using traditional techniques passed down generations".split()
+CATEGORIES = ["Pottery", "Textiles", "Paintings", "Metalwork", "Home Decor"]
+QUERIES = ["madhubani painting", "brass lamp", "blue pottery vase", "ikat saree", "jute"]
+
+
+def _catalogue(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    docs = []
+    for i in range(n):
+        craft, noun = rng.choice(CRAFTS), rng.choice(NOUNS)
+        docs.append(
+            {
+                "_id": ObjectId(),
+                "title": f"{craft.title()} {noun} {i}",
+                "description": " ".join(rng.sample(FILLER, 6) + [craft, noun]),
+                "tags": [craft, noun],
+                "category": rng.choice(CATEGORIES),
+                "price": float(rng.randint(100, 20000)),
+                "created_at": start + timedelta(minutes=i),
+            }
+        )
+    return docs
+
+
+def _median_ms(fn, rounds: int) -> float:
+    samples = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        fn(QUERIES[i % len(QUERIES)])
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _regex_page(docs: list, query: str, category: str, limit: int = 100) -> list:
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    hits = [
+        d
+        for d in docs
+        if d["category"] == category
+        and (
+            pattern.search(d["title"])
+            or pattern.search(d["description"])
+            or any(pattern.search(t) for t in d["tags"])
+        )
+    ]
+    hits.sort(key=lambda d: d["created_at"], reverse=True)
+    return hits[:limit]
+
+
+def _postings_mb(engine: ListingSearchEngine) -> float:
+    total = sum(
+        slots.itemsize * len(slots) + weights.itemsize * len(weights)
+        for slots, weights in engine._postings.values()
+    )
+    return total / (1024 * 1024)
+
+
+def _mongo_ms(uri: str, docs: list, rounds: int) -> float:
+    from pymongo import MongoClient
+
+    client = MongoClient(uri)
+    db = client[f"kalamitra_bench_{ObjectId()}"]
+    try:
+        for i in range(0, len(docs), 10000):
+            db.listings.insert_many(
+                [dict(d, category_key=d["category"].lower()) for d in docs[i : i + 10000]]
+            )
+        db.listings.create_index([("created_at", -1), ("_id", -1)])
+
+        def run(query: str) -> None:
+            escaped = re.escape(query)
+            clause = {
+                "$or": [
+                    {field: {"$regex": escaped, "$options": "i"}}
+                    for field in ("title", "description", "tags")
+                ]
+            }
+            pipeline = [
+                {"$match": {"category_key": "pottery", **clause}},
+                {"$sort": {"created_at": -1, "_id": -1}},
+                {"$limit": 101},
+            ]
+            list(db.listings.aggregate(pipeline))
+
+        return _median_ms(run, rounds)
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--mongo-uri")
+    args = parser.parse_args()
+
+    header = f"{'listings':>9} {'build s':>8} {'postings':>9} {'engine':>8} {'regex':>8}"
+    if args.mongo_uri:
+        header += f" {'mongo':>8}"
+    print(header)
+    for size in (int(s) for s in args.sizes.split(",")):
+        docs = _catalogue(size)
+
+        started = time.perf_counter()
+        engine = ListingSearchEngine()
+        engine.load(docs)
+        build = time.perf_counter() - started
+
+        engine_ms = _median_ms(
+            lambda q: engine.search(q, category_key="pottery", limit=100), args.queries
+        )
+        # The scan costs the same for every query; a few rounds are enough.
+        regex_ms = _median_ms(
+            lambda q: _regex_page(docs, q, "Pottery"), max(3, args.queries // 10)
+        )
+        line = (
+            f"{size:>9} {build:>8.2f} {_postings_mb(engine):>7.1f}MB"
+            f" {engine_ms:>8.2f} {regex_ms:>8.2f}"
+        )
+        if args.mongo_uri:
+            line += f" {_mongo_ms(args.mongo_uri, docs, max(3, args.queries // 10)):>8.2f}"
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
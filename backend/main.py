@@ -12,6 +12,9 @@ from firebase_admin import credentials
 
 from routes import ai, auth, users, artists, listing, stripe, orders
 from services.database import Database
+from services.listing_cache import catalogue_version
+from services.search_engine import SEARCH_ENGINE, SEARCH_ENGINE_ENABLED
+from utils.ttl_cache import cache_stats
 
 # Load environment variables
 load_dotenv()
@@ -35,6 +38,14 @@ if not firebase_admin._apps:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await Database.connect_db()
+    if SEARCH_ENGINE_ENABLED:
+        # Built before the first request; if it fails, search keeps using
+        # Mongo and the first engine query retries the build.
+        try:
+            db = Database.get_db()
+            await SEARCH_ENGINE.rebuild(db, await catalogue_version(db))
+        except Exception:
+            logger.exception("Search engine build failed; using Mongo search")
     yield
     await Database.close_db()
 
@@ -64,8 +75,21 @@ app.add_middleware(
     expose_headers=["Retry-After"],
 )
 
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip, except for listing images: WebP/JPEG gain nothing from it, it
+    drops Content-Length, and a 206 body must stay exactly the bytes its
+    Content-Range names."""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and "/images/" in scope.get("path", ""):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 # Compress JSON list responses (the listings payload is the big one).
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+app.add_middleware(JSONGZipMiddleware, minimum_size=1000)
 
 # Include routers
 app.include_router(auth.router, prefix="/api", tags=["Authentication"])
@@ -92,6 +116,12 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/caches")
+async def health_caches():
+    """Hit/miss counters for the in-process caches (per worker)."""
+    return cache_stats()
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
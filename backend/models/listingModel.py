@@ -82,14 +82,111 @@ class Listing(BaseModel):
 
 class ListingsResponse(BaseModel):
     listings: List[Listing]
-    total: int
+    # None when the caller asked for count=none (or count=estimate with a
+    # filter); page with `has_more` / `next_cursor` instead.
+    total: Optional[int] = None
+    has_more: bool = False
     limit: int
     skip: int
+    # Opaque keyset cursor for the next page; None on the last page.
+    next_cursor: Optional[str] = None
 
     class Config:
         json_encoders = {
             datetime: lambda dt: dt.isoformat(),
             ObjectId: str  # Convert ObjectId to string for JSON serialization
         }
+
+
+class ListingCard(BaseModel):
+    """`view=card`: one marketplace grid tile or artisan dashboard row.
+
+    Unlike `Listing`, unknown fields are dropped rather than passed through,
+    so a card carries exactly this and no more.
+    """
+    id: str = Field(alias="_id")
+    title: str
+    description: str
+    tags: List[str] = []
+    category: str
+    state: Optional[str] = None
+    suggested_price: str
+    price: Optional[float] = 0.0
+    originalPrice: Optional[float] = 0.0
+    image_ids: List[str] = []
+    images: List[str] = []
+    artist_id: Optional[str] = None
+    artisan: Optional[Dict[str, Any]] = None
+    status: str = "active"
+    inStock: Optional[bool] = True
+    stockCount: Optional[int] = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    review_count: Optional[int] = None
+    rating: Optional[float] = None
+
+    class Config:
+        populate_by_name = True
+        extra = "ignore"
+
+class ListingCartItem(BaseModel):
+    """`view=cart`: what a cart, wishlist or checkout line needs."""
+    id: str = Field(alias="_id")
+    title: str
+    price: Optional[float] = 0.0
+    originalPrice: Optional[float] = 0.0
+    image_ids: List[str] = []
+    images: List[str] = []
+    artist_id: Optional[str] = None
+    artisan: Optional[Dict[str, Any]] = None
+    status: str = "active"
+    inStock: Optional[bool] = True
+    stockCount: Optional[int] = 0
+
+    class Config:
+        populate_by_name = True
+        extra = "ignore"
+
+class ReviewsPage(BaseModel):
+    """One page of a listing's reviews, newest first."""
+    reviews: List[Review]
+    total: int
+    next_cursor: Optional[str] = None
+
+
+class FacetCount(BaseModel):
+    # `key` is what GET /listings filters on (category=/state=); `label` is the
+    # stored display spelling.
+    key: str
+    label: str
+    count: int
+
+class PriceBandCount(BaseModel):
+    # [min, max); max is None for the open-ended top band.
+    min: float
+    max: Optional[float] = None
+    count: int
+
+class ListingFacetsResponse(BaseModel):
+    """Sidebar counts for GET /listings/facets.
+
+    Each dimension is counted with every filter applied except its own, so
+    picking a category does not collapse the category list to one entry.
+    """
+    total: int
+    categories: List[FacetCount] = []
+    states: List[FacetCount] = []
+    price_bands: List[PriceBandCount] = []
+
+class Suggestion(BaseModel):
+    text: str
+    # title | category | tag | craft
+    kind: str
+    # How many listings (or artisans, for crafts) carry it.
+    count: int
+
+class SuggestionsResponse(BaseModel):
+    query: str
+    suggestions: List[Suggestion] = []
+
 # NOTE: the duplicate `Order` model that used to live here was removed.
 # The single definition is models/orderModel.py.
@@ -5,7 +5,8 @@ from typing import Any, Dict, List, Optional
 
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import Response
 from firebase_admin import auth
 
 from models.artistModel import (
@@ -15,9 +16,17 @@ from models.artistModel import (
     ArtistProfile,
     ArtistProfileUpdate,
 )
-from models.listingModel import Listing, ListingsResponse
+from models.listingModel import ListingsResponse
 from services.database import Database
+from services.listing_cache import invalidate_artisan
+from services.listing_cards import CARD_IMAGE_SIZE, LIST_CARD_PROJECTION
 from utils.image_helpers import construct_image_urls, get_first_image_url
+from utils.rendering import (
+    LISTING_VIEWS,
+    render_listings_response,
+    validate_listings,
+    view_projection,
+)
 from utils.serialization import serialize_listing_doc
 
 from .auth import check_artist_role, get_current_user
@@ -59,7 +68,8 @@ def _first_image_id(listing: Optional[dict]) -> Optional[str]:
 def _product_image(listing: Optional[dict]) -> str:
     image_id = _first_image_id(listing)
     if listing and image_id:
-        return get_first_image_url(str(listing["_id"]), [image_id])
+        # Order rows draw a small thumbnail.
+        return get_first_image_url(str(listing["_id"]), [image_id], "thumb")
     return "/placeholder.svg"
 
 
@@ -126,6 +136,7 @@ async def complete_artisan_onboarding(
                 {**artisan_profile.model_dump(by_alias=True), "is_onboarded": True}
             )
             profile = await db["users"].find_one({"_id": result.inserted_id})
+        await invalidate_artisan(db, current_user["firebase_uid"])
         return ArtisanProfileResponse(**serialize_artisan_doc(profile))
     except HTTPException:
         raise
@@ -192,9 +203,9 @@ async def update_artist_profile(
         value = getattr(profile_update, field, None)
         if value is not None:
             mongo_update[field] = value
-    await Database.get_db()["users"].update_one(
-        {"firebase_uid": firebase_uid}, {"$set": mongo_update}
-    )
+    db = Database.get_db()
+    await db["users"].update_one({"firebase_uid": firebase_uid}, {"$set": mongo_update})
+    await invalidate_artisan(db, firebase_uid, mongo_update)
 
     return ArtistProfile(
         display_name=user.display_name or "",
@@ -208,43 +219,50 @@ async def update_artist_profile(
 
 
 @router.get("/artist/listings", response_model=ListingsResponse)
-async def get_artist_listings(current_user: dict = Depends(check_artist_role)):
+async def get_artist_listings(
+    # The dashboard table only needs `view=card`; full documents by default.
+    view: str = Query("full", pattern=f"^({'|'.join(LISTING_VIEWS)})$"),
+    current_user: dict = Depends(check_artist_role),
+):
     db = Database.get_db()
     firebase_uid = current_user["firebase_uid"]
+    # Narrower views keep the computed `rating` and `review_count` that GET
+    # /listings renders; the full view stays whole documents.
+    projection = None if view == "full" else view_projection(view, LIST_CARD_PROJECTION)
 
     listings = (
         await db["listings"]
-        .find({"artist_id": firebase_uid})
+        .find({"artist_id": firebase_uid}, projection)
         .sort("created_at", -1)
         .to_list(length=MAX_ARTIST_LISTINGS)  # was .to_list(None)
     )
 
-    serialized_listings = []
-    skipped = 0
+    serialized_docs = []
     for listing_doc in listings:
         doc = serialize_listing_doc(listing_doc)
         image_ids = doc.get("image_ids", [])
         doc["images"] = (
-            construct_image_urls(doc["id"], image_ids) if image_ids else ["/placeholder.svg"]
+            construct_image_urls(doc["id"], image_ids, CARD_IMAGE_SIZE)
+            if image_ids
+            else ["/placeholder.svg"]
         )
-        try:
-            serialized_listings.append(Listing(**doc))
-        except Exception:
-            skipped += 1
-            logger.warning(
-                "Skipping artist listing %s: fails Listing validation",
-                doc.get("id"),
-                exc_info=True,
-            )
+        serialized_docs.append(doc)
+    serialized_listings, skipped = validate_listings(serialized_docs, view)
     if skipped:
         logger.error("%s of this artisan's listings failed validation", skipped)
 
-    return ListingsResponse(
-        listings=serialized_listings,
-        # count_documents used to re-run a filter already answered by len().
-        total=len(listings),
-        limit=MAX_ARTIST_LISTINGS,
-        skip=0,
+    # Rendered here rather than by response_model, which validated and encoded
+    # every listing a second time.
+    return Response(
+        content=render_listings_response(
+            serialized_listings,
+            view=view,
+            # count_documents used to re-run a filter already answered by len().
+            total=len(listings),
+            limit=MAX_ARTIST_LISTINGS,
+            skip=0,
+        ),
+        media_type="application/json",
     )
 
 
@@ -2,7 +2,9 @@ import asyncio
 import hashlib
 import io
 import logging
+import os
 import re
+import time
 import uuid
 from datetime import datetime
 from typing import List, Optional
@@ -24,15 +26,72 @@ from fastapi import (
 from fastapi.responses import Response, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
 
-from models.listingModel import Listing, ListingsResponse, Review, ReviewCreate
+from models.listingModel import (
+    FacetCount,
+    Listing,
+    ListingFacetsResponse,
+    ListingsResponse,
+    PriceBandCount,
+    Review,
+    ReviewCreate,
+    ReviewsPage,
+    SuggestionsResponse,
+)
 from routes.auth import get_current_user
 from services.database import Database
 from services.generateListing import generate_listing_with_gemini
-from utils.image_helpers import construct_image_urls
+from services.image_cache import HOT_IMAGES, RESIZED_IMAGES
+from services.search_engine import SEARCH_ENGINE, SEARCH_ENGINE_ENABLED
+from services.suggest_index import SUGGESTIONS
+from services.listing_cards import (
+    CARD_IMAGE_SIZE,
+    CARD_PROJECTIONS,
+    LIST_CARD_PROJECTION,
+    LISTING_CARDS_COLLECTION,
+    LISTING_CARDS_ENABLED,
+    attach_images,
+    card_body,
+    render_cards,
+)
+from services.listing_cache import (
+    DETAIL_REVIEW_MODES,
+    LISTING_DETAILS,
+    LISTING_FACETS,
+    LISTING_PAGES,
+    LISTING_PAGES_MAX_SKIP,
+    body_etag,
+    catalogue_version,
+    etag_matches,
+    invalidate_listings,
+    listing_pages_key,
+    listings_etag,
+)
+from utils.image_helpers import FULL_IMAGE_SIZE, IMAGE_RENDITIONS, IMAGE_SIZES
+from utils.http_range import RangeNotSatisfiable, if_range_allows, parse_range
+from utils.pagination import (
+    InvalidCursor,
+    cursor_for,
+    cursor_tag,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+)
 from utils.serialization import (
     build_artisan_block,
     fetch_artisans_by_uid,
+    filter_key,
+    listing_filter_keys,
+    review_aggregate_update,
     serialize_listing_doc,
+    serialize_review_doc,
+)
+from utils.rendering import (
+    LISTING_VIEWS,
+    dump_listings,
+    render_json,
+    render_listings_response,
+    validate_listings,
+    view_projection,
 )
 
 logger = logging.getLogger(__name__)
@@ -47,17 +106,88 @@ MAX_IMAGE_BYTES = 8 * 1024 * 1024  # 8 MB per file
 MAX_TOTAL_UPLOAD_BYTES = 24 * 1024 * 1024  # 24 MB per request
 
 IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Listings pages change on every write: cacheable, but always revalidated
+# against the ETag.
+LISTINGS_CACHE_CONTROL = "public, no-cache"
 
-# Stored images are downscaled + re-encoded to WebP on the way in. Phone photos
-# were previously written to GridFS at full resolution and then served twelve at
-# a time on the marketplace grid.
-STORED_IMAGE_MAX_EDGE = 1600
+# Stored images are downscaled + re-encoded to WebP on the way in, once per
+# IMAGE_RENDITIONS size. Phone photos were previously written to GridFS at full
+# resolution and then served twelve at a time on the marketplace grid.
 STORED_IMAGE_QUALITY = 82
 
-# `GET /listings` renders cards, so descriptions are truncated server-side.
-LIST_DESCRIPTION_CHARS = 300
+# `?w=` / `?q=` on the image endpoint: resized on demand from the full-size
+# file and kept on disk (services/image_cache.py). Allowlisted so a crawler
+# cannot fill the cache with one file per integer width.
+RESIZE_WIDTHS = (160, 240, 320, 480, 640, 800, 960, 1280)
+RESIZE_QUALITIES = (60, 75, STORED_IMAGE_QUALITY)
+
+# `view=` of GET /listings/batch -> the rendition its image URLs point at. The
+# full view is the detail shape, with the full-size images.
+BATCH_IMAGE_SIZES = {"card": CARD_IMAGE_SIZE, "cart": "thumb"}
+
+# Newest first, `_id` as the tie-breaker so the keyset cursor never skips or
+# repeats rows that share a created_at. Backed by the compound index declared
+# in Database._INDEXES.
+LISTINGS_SORT = [("created_at", -1), ("_id", -1)]
+LISTINGS_CURSOR_TAG = "newest"
+
+# `sort=` orders, each ending on `_id` and each backed by its own index in
+# Database._INDEXES, unfiltered and behind category_key. The frontend used to
+# sort by price on the client, which only ever reordered the current page.
+# The name doubles as the keyset cursor tag. Rating and popularity read the
+# stored review aggregates (rating_avg is 0, not null, with no reviews). Sort
+# keys a view does not render are fetched for the cursor and dropped again.
+LISTING_SORTS = {
+    LISTINGS_CURSOR_TAG: LISTINGS_SORT,
+    "price_asc": [("price", 1), ("_id", 1)],
+    "price_desc": [("price", -1), ("_id", -1)],
+    "rating": [("rating_avg", -1), ("review_count", -1), ("_id", -1)],
+    "popular": [("review_count", -1), ("_id", -1)],
+}
+
+# Search used to be a three-way `$or` of case-insensitive `$regex`, which no
+# index can serve, while the `listings_text` index sat unused. `text` ranks by
+# textScore (newest first among equal scores); `regex` is kept for short and
+# partial-word queries, and so the two can be compared under load.
+DEFAULT_SEARCH_MODE = os.getenv("LISTINGS_SEARCH_MODE", "auto").lower()
+if DEFAULT_SEARCH_MODE not in ("auto", "text", "regex", "engine"):
+    DEFAULT_SEARCH_MODE = "auto"
+MIN_TEXT_SEARCH_CHARS = 3
+RELEVANCE_SORT = [("search_score", -1), ("created_at", -1), ("_id", -1)]
+RELEVANCE_CURSOR_TAG = "relevance"
+# A search with an explicit `sort=` still matches through the text index but
+# is ordered by that sort; its cursors carry this prefix.
+TEXT_CURSOR_PREFIX = "text:"
+# `engine`: the in-process BM25 index (services/search_engine.py), only when
+# SEARCH_ENGINE_ENABLED. `auto` prefers it whenever it is built.
+ENGINE_CURSOR_TAG = "engine"
+
+# GET /listings/export: rows per server-side cursor batch, which is also what
+# is held in memory and flushed to the client at a time.
+EXPORT_BATCH_SIZE = int(os.getenv("LISTINGS_EXPORT_BATCH_SIZE", "500"))
+MAX_EXPORT_BATCH_SIZE = 5000
+# Review bodies and the raw voice transcription are not catalogue data.
+EXPORT_PROJECTION = {"reviews": 0, "transcription": 0}
+
+# GET /listings/batch: most ids per request (a cart or a wishlist page).
+MAX_BATCH_IDS = 50
+
+# Reviews live in their own collection, indexed on (listing_id, created_at);
+# listings keep only the aggregates. The detail endpoint still embeds them for
+# `reviews=all` (the default), the newest DETAIL_LATEST_REVIEWS for
+# `reviews=latest`; GET /listings/{id}/reviews pages through the rest.
+DETAIL_LATEST_REVIEWS = 5
+# Newest first, `_id` breaking ties between reviews posted in the same instant.
+REVIEWS_SORT = [("created_at", -1), ("_id", -1)]
+REVIEWS_CURSOR_TAG = "reviews"
+
+# Price-band edges (rupees) for GET /listings/facets. The last band is open
+# ended.
+FACET_PRICE_BANDS = [0, 500, 1000, 2500, 5000, 10000, 20000]
 
 _GRIDFS_BUCKETS: dict = {}
+# GridFS's default; files report their own as `chunk_size`.
+GRIDFS_CHUNK_SIZE = 255 * 1024
 
 
 def _bucket(db: AsyncIOMotorDatabase) -> AsyncIOMotorGridFSBucket:
@@ -70,40 +200,174 @@ def _bucket(db: AsyncIOMotorDatabase) -> AsyncIOMotorGridFSBucket:
     return bucket
 
 
-def _optimize_for_storage(content: bytes) -> tuple:
-    """Downscale and re-encode an upload to WebP before it goes into GridFS.
+def _renditions_for_storage(content: bytes) -> dict:
+    """Decode an upload once and re-encode it to WebP at every IMAGE_RENDITIONS
+    size, before it goes into GridFS.
 
     Uploads used to be stored exactly as received - full-resolution phone
     photos, several MB each - and then served twelve at a time on the
     marketplace grid. Cache headers only help the *second* visit; this is the
     one that helps the first. CPU-bound, so callers run it in a thread.
 
-    Returns (bytes, content_type). Falls back to the original bytes if the
-    image cannot be decoded (e.g. an exotic format), so an upload never fails
-    purely because optimization did.
+    Returns {size: (bytes, content_type)}. `full` is always there; it falls
+    back to the original bytes (content_type None) if the image cannot be
+    decoded (e.g. an exotic format) or the re-encode did not help, so an
+    upload never fails purely because optimization did. A smaller size is left
+    out when the image is no larger than it; the next size up serves it.
     """
+    renditions = {}
     try:
         with Image.open(io.BytesIO(content)) as img:
             img.load()
             # WebP has no alpha issue, but paletted/CMYK modes need converting.
             if img.mode not in ("RGB", "RGBA"):
                 img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
-            if max(img.size) > STORED_IMAGE_MAX_EDGE:
-                img.thumbnail(
-                    (STORED_IMAGE_MAX_EDGE, STORED_IMAGE_MAX_EDGE),
-                    Image.Resampling.LANCZOS,
-                )
-            buffer = io.BytesIO()
-            img.save(buffer, format="WEBP", quality=STORED_IMAGE_QUALITY, method=4)
-            optimized = buffer.getvalue()
+            source_edge = max(img.size)
+            # Largest first, each resampled from the one before it.
+            for size in reversed(IMAGE_SIZES):
+                edge = IMAGE_RENDITIONS[size]
+                if size != FULL_IMAGE_SIZE and source_edge <= edge:
+                    continue
+                if max(img.size) > edge:
+                    img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                img.save(buffer, format="WEBP", quality=STORED_IMAGE_QUALITY, method=4)
+                renditions[size] = (buffer.getvalue(), "image/webp")
     except Exception:
         logger.warning("Could not optimize upload; storing original", exc_info=True)
-        return content, None
+        return {FULL_IMAGE_SIZE: (content, None)}
+
+    # Only keep the full-size re-encode if it actually helped.
+    if len(renditions[FULL_IMAGE_SIZE][0]) >= len(content):
+        renditions[FULL_IMAGE_SIZE] = (content, None)
+    return renditions
+
+
+async def _store_image(bucket, filename: str, data: bytes, metadata: dict):
+    upload_stream = bucket.open_upload_stream(filename, metadata=metadata)
+    await upload_stream.write(data)
+    await upload_stream.close()
+    return upload_stream._id
+
+
+# Read size when streaming a cached file, as FileResponse uses.
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+def _open_file(path: str) -> tuple:
+    """(handle, size). Blocking, so callers run it in a thread. Once open, the
+    file can be unlinked (evicted) without affecting the read."""
+    handle = open(path, "rb")
+    return handle, os.fstat(handle.fileno()).st_size
+
+
+async def _iter_file(handle):
+    try:
+        while True:
+            chunk = await asyncio.to_thread(handle.read, FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+def _resize_to_cache(source: bytes, width: int, quality: int, key: str) -> tuple:
+    """Resize to `width` (never up), encode to WebP and write it to
+    RESIZED_IMAGES. CPU-bound and blocking, so callers run it in a thread.
+
+    Returns (bytes, stored): a failed disk write still serves the image.
+    """
+    with Image.open(io.BytesIO(source)) as img:
+        img.load()
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.width > width:
+            img.thumbnail((width, img.height), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format="WEBP", quality=quality, method=4)
+    body = buffer.getvalue()
+    try:
+        RESIZED_IMAGES.write(key, body)
+    except OSError:
+        logger.warning("Could not cache resized image %s", key, exc_info=True)
+        return body, False
+    return body, True
+
+
+async def _close_stream(download_stream) -> None:
+    close = getattr(download_stream, "close", None)
+    if close is not None:
+        result = close()
+        if asyncio.iscoroutine(result):
+            await result
+
+
+async def _iter_stream(download_stream):
+    try:
+        while True:
+            chunk = await download_stream.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        await _close_stream(download_stream)
+
+
+async def _iter_stream_range(download_stream, start: int, end: int):
+    """Bytes start..end (inclusive), reading only the GridFS chunks that hold
+    them: seek to `start`, read up to the end of its chunk, then whole
+    chunks."""
+    try:
+        result = download_stream.seek(start)
+        if asyncio.iscoroutine(result):
+            await result
+        chunk_size = getattr(download_stream, "chunk_size", None) or GRIDFS_CHUNK_SIZE
+        remaining = end - start + 1
+        want = chunk_size - start % chunk_size
+        while remaining > 0:
+            data = await download_stream.read(min(want, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            want = chunk_size
+            yield data
+    finally:
+        await _close_stream(download_stream)
+
+
+def _image_bytes_response(
+    request: Request, body: bytes, content_type: str, headers: dict, etag: str
+) -> Response:
+    """An image held in memory, with the same Range handling as a streamed one."""
+    headers = dict(headers, **{"Accept-Ranges": "bytes"})
+    try:
+        byte_range = (
+            parse_range(request.headers.get("range"), len(body))
+            if if_range_allows(request.headers.get("if-range"), etag)
+            else None
+        )
+    except RangeNotSatisfiable:
+        return Response(
+            status_code=416, headers={**headers, "Content-Range": f"bytes */{len(body)}"}
+        )
+    if byte_range is None:
+        return Response(content=body, media_type=content_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+    return Response(
+        content=body[start : end + 1], status_code=206, media_type=content_type, headers=headers
+    )
 
-    # Only keep the re-encode if it actually helped.
-    if len(optimized) >= len(content):
-        return content, None
-    return optimized, "image/webp"
+
+def _rendition_id(renditions: Optional[dict], size: str):
+    """The GridFS id serving `size`: that rendition or the next larger one
+    stored, None for the full-size file itself (and for images uploaded
+    before renditions existed)."""
+    for name in IMAGE_SIZES[IMAGE_SIZES.index(size) : -1]:
+        if (renditions or {}).get(name):
+            return renditions[name]
+    return None
 
 
 def _object_id_or_400(value: str, what: str = "id") -> ObjectId:
@@ -113,20 +377,225 @@ def _object_id_or_400(value: str, what: str = "id") -> ObjectId:
         raise HTTPException(status_code=400, detail=f"Invalid {what} format")
 
 
-def _attach_images(serialized_doc: dict) -> dict:
-    listing_id_str = serialized_doc.get("id")
-    image_ids = serialized_doc.get("image_ids", [])
-    serialized_doc["images"] = (
-        construct_image_urls(listing_id_str, image_ids)
-        if listing_id_str and image_ids
-        else ["/placeholder.svg"]
+def _listing_filters(
+    min_price: Optional[float],
+    max_price: Optional[float],
+    category: str,
+    state: str,
+) -> dict:
+    """The non-search part of the GET /listings filter."""
+    filter_query = {}
+
+    # The old guard (`if min_price > 0 or max_price < 20000`) meant
+    # max_price=50000 silently filtered nothing. Always apply the bounds.
+    #
+    # CANONICAL PRICE FIELD: `price` (float). `suggested_price` is the raw
+    # AI string ("₹1,299") and is display-only/legacy. The filter, the sort
+    # and - critically - what Stripe actually charges all read `price`, so
+    # the UI must render `price` too or the filter will keep looking broken.
+    price_filter = {}
+    if min_price is not None:
+        price_filter["$gte"] = min_price
+    if max_price is not None:
+        price_filter["$lte"] = max_price
+    if price_filter:
+        filter_query["price"] = price_filter
+
+    # Equality on the stored lower-case keys. The anchored case-insensitive
+    # regex these replace could not use an index.
+    if category != "all":
+        filter_query["category_key"] = filter_key(category)
+    if state != "all":
+        filter_query["state_key"] = filter_key(state)
+    return filter_query
+
+
+def _regex_search_clause(search: str) -> dict:
+    # re.escape: the raw user string used to be interpolated straight into
+    # $regex, so `(((((((` was a ReDoS and `.*` a full scan.
+    escaped = re.escape(search)
+    return {
+        "$or": [
+            {"title": {"$regex": escaped, "$options": "i"}},
+            {"description": {"$regex": escaped, "$options": "i"}},
+            {"tags": {"$regex": escaped, "$options": "i"}},
+        ]
+    }
+
+
+def _choose_search_mode(
+    search: str, requested: str, cursor: Optional[str], ranked: bool = True
+) -> str:
+    """Resolve `auto` to `engine`, `text` or `regex` for this request.
+
+    `ranked` is False when the caller asked for an explicit sort, which the
+    engine (relevance only) cannot serve.
+    """
+    if requested == "engine" and not (SEARCH_ENGINE_ENABLED and ranked):
+        requested = "auto"
+    if requested != "auto":
+        return requested
+    if cursor:
+        # Stay on whichever path produced the first page.
+        tag = cursor_tag(cursor) or ""
+        if tag == ENGINE_CURSOR_TAG and SEARCH_ENGINE_ENABLED and ranked:
+            return "engine"
+        if tag == RELEVANCE_CURSOR_TAG or tag.startswith(TEXT_CURSOR_PREFIX):
+            return "text"
+        return "regex"
+    if ranked and SEARCH_ENGINE.built:
+        return "engine"
+    # $text matches whole (stemmed) words only; a two-letter prefix would
+    # find nothing, so very short queries go straight to regex.
+    if len(search) < MIN_TEXT_SEARCH_CHARS:
+        return "regex"
+    return "text"
+
+
+async def _fetch_listings_page(
+    collection,
+    filter_query: dict,
+    projection: dict,
+    sort: list,
+    cursor_tag_name: str,
+    cursor: Optional[str],
+    skip: int,
+    limit: int,
+    count: str,
+    text_search: bool,
+) -> tuple:
+    """Run one page of GET /listings against `listings` or `listing_cards`.
+
+    Returns (raw_docs, total_or_None, next_cursor, has_more, effective_skip).
+    """
+    keyset = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, cursor_tag_name, len(sort))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        keyset = keyset_filter(sort, after)
+        skip = 0
+
+    # The text score is not a stored field; materialise it so it can be both
+    # sorted on and compared against by the keyset cursor.
+    scoring = [{"$addFields": {"search_score": {"$meta": "textScore"}}}] if text_search else []
+    sort_only = [field for field, _ in sort if field != "_id" and field not in projection]
+    projection = dict(projection, **{field: 1 for field in sort_only})
+
+    # One extra row tells us whether there is a next page.
+    page_stages = [
+        {"$skip": skip},
+        {"$limit": limit + 1},
+        {"$project": projection},
+    ]
+    total_count = None
+    if count == "exact":
+        # Page and total in ONE round trip. It used to be an aggregate plus
+        # a separate count_documents over the same regex-heavy filter, i.e.
+        # every search scanned the collection twice. The keyset condition
+        # lives inside the page branch so `total` still counts the whole
+        # filter, not just what is left after the cursor.
+        if keyset:
+            page_stages.insert(0, {"$match": keyset})
+        pipeline = [
+            {"$match": filter_query},
+            *scoring,
+            {"$sort": dict(sort)},
+            {"$facet": {"page": page_stages, "total": [{"$count": "n"}]}},
+        ]
+        facets = await collection.aggregate(pipeline).to_list(length=1)
+        facet = facets[0] if facets else {}
+        raw_listings = facet.get("page", [])
+        total_count = facet["total"][0]["n"] if facet.get("total") else 0
+    else:
+        # Infinite scroll never needs an exact count: page only. Without a
+        # text score the keyset condition goes in the leading $match, where an
+        # index can use it.
+        if keyset and text_search:
+            stages = [{"$match": filter_query}, *scoring, {"$match": keyset}]
+        elif keyset:
+            stages = [{"$match": {"$and": [filter_query, keyset]} if filter_query else keyset}]
+        else:
+            stages = [{"$match": filter_query}, *scoring]
+        pipeline = [*stages, {"$sort": dict(sort)}, *page_stages]
+        raw_listings = await collection.aggregate(pipeline).to_list(length=limit + 1)
+        if count == "estimate" and not filter_query:
+            # Collection metadata, no scan. Only valid without a filter.
+            total_count = await collection.estimated_document_count()
+
+    next_cursor = None
+    has_more = len(raw_listings) > limit
+    if has_more:
+        raw_listings = raw_listings[:limit]
+        next_cursor = cursor_for(raw_listings[-1], cursor_tag_name, sort)
+    for doc in raw_listings:
+        for field in sort_only:
+            doc.pop(field, None)
+    return raw_listings, total_count, next_cursor, has_more, skip
+
+
+async def _engine_listings_page(
+    db: AsyncIOMotorDatabase,
+    projection: dict,
+    search: str,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    category: str,
+    state: str,
+    cursor: Optional[str],
+    skip: int,
+    limit: int,
+    count: str,
+) -> tuple:
+    """GET /listings search, filtered, ranked and paged by the in-process
+    engine. Mongo only supplies the cards on the page, by `_id`.
+
+    Same return shape as _fetch_listings_page. The total is a by-product of
+    ranking, so every count mode except `none` gets an exact one.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, ENGINE_CURSOR_TAG, 3)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        skip = 0
+    keys, total = SEARCH_ENGINE.search(
+        search,
+        min_price=min_price,
+        max_price=max_price,
+        category_key=None if category == "all" else filter_key(category),
+        state_key=None if state == "all" else filter_key(state),
+        after=after,
+        skip=skip,
+        limit=limit,
     )
-    return serialized_doc
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+    next_cursor = encode_cursor(ENGINE_CURSOR_TAG, list(keys[-1])) if has_more else None
+
+    raw_listings = []
+    if keys:
+        ids = [ObjectId(key[2]) for key in keys]
+        rows = await db.listings.aggregate(
+            [{"$match": {"_id": {"$in": ids}}}, {"$project": projection}]
+        ).to_list(length=len(ids))
+        by_id = {str(row["_id"]): row for row in rows}
+        # Ranked order; a listing deleted on another worker since the last
+        # rebuild simply drops out.
+        raw_listings = [by_id[key[2]] for key in keys if key[2] in by_id]
+    return raw_listings, None if count == "none" else total, next_cursor, has_more, skip
 
 
 @router.get("/listings", response_model=ListingsResponse)
 async def get_listings(
+    request: Request,
     skip: int = Query(0, ge=0),
+    # Keyset pagination. `skip` still works for old clients, but deep pages
+    # cost Mongo a walk over every earlier row; the cursor costs the same on
+    # page 1 and page 500. When a cursor is given, `skip` is ignored.
+    cursor: Optional[str] = None,
     # An unbounded `limit` used to be accepted (limit=10000000 worked).
     limit: int = Query(100, ge=1, le=100),
     search: str = "",
@@ -138,151 +607,602 @@ async def get_listings(
     max_price: Optional[float] = Query(None, ge=0),
     category: str = "all",
     state: str = "all",
+    # exact: page + total in one $facet. estimate: collection metadata count
+    # when unfiltered, otherwise no total. none: no total at all - use
+    # `has_more`. Both cheaper modes skip the count scan entirely.
+    count: str = Query("exact", pattern="^(exact|estimate|none)$"),
+    # text: the listings_text index, ranked by relevance. regex: the legacy
+    # unindexed scan. engine: the in-process BM25 index, when enabled. auto:
+    # engine if built, else text; falling back to regex for short queries and
+    # for partial words neither index can match. Overrides
+    # LISTINGS_SEARCH_MODE so the paths can be compared under load; the path
+    # taken is reported in the X-Search-Mode header.
+    search_mode: Optional[str] = Query(None, pattern="^(auto|text|regex|engine)$"),
+    # One of LISTING_SORTS. Unset: newest first, or by relevance when
+    # searching. An explicit sort applies to searches too, bypassing the
+    # engine.
+    sort: Optional[str] = Query(None, pattern=f"^({'|'.join(LISTING_SORTS)})$"),
+    # full: the `Listing` shape (still projected to the card fields, as it
+    # has been). card / cart: the slimmer view models, read with a matching
+    # projection.
+    view: str = Query("full", pattern=f"^({'|'.join(LISTING_VIEWS)})$"),
     db: AsyncIOMotorDatabase = Depends(Database.get_db),
 ):
-    """Get all listings with pagination and filters."""
+    """Get all listings with pagination and filters.
+
+    Conditional: every response carries an ETag derived from the catalogue
+    version and the query, and a matching If-None-Match is answered 304.
+    """
+    search = search.strip()
+    requested_mode = search_mode or DEFAULT_SEARCH_MODE
+
+    # Nothing here is per-user, so every caller shares the cache and the ETag.
+    query_key = listing_pages_key(
+        skip=skip,
+        limit=limit,
+        search=search,
+        min_price=min_price,
+        max_price=max_price,
+        category=category,
+        state=state,
+        count=count,
+        search_mode=requested_mode,
+        sort=sort,
+        view=view,
+    )
+    # The version is held in-process, so a client re-polling an unchanged
+    # catalogue gets its 304 without Mongo being touched - as get_image does.
+    # The cursor is case-sensitive, so it stays out of the normalized key.
+    version = await catalogue_version(db)
+    etag = listings_etag(version, (query_key, cursor))
+    conditional_headers = {"ETag": etag, "Cache-Control": LISTINGS_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=conditional_headers)
+
+    # Cursor pages and deep skips are left out of the page cache: they are
+    # crawls, not the hot home page. Keyed on the version too, so another
+    # worker's write retires these entries once this one sees it.
+    cache_key = None
+    if cursor is None and skip <= LISTING_PAGES_MAX_SKIP:
+        cache_key = (version, query_key)
+        cached = LISTING_PAGES.get(cache_key)
+        if cached is not None:
+            body, headers = cached
+            return Response(
+                content=body,
+                media_type="application/json",
+                headers={**headers, **conditional_headers, "X-Cache": "HIT"},
+            )
+
     try:
-        filter_query = {}
+        filter_query = _listing_filters(min_price, max_price, category, state)
+        projection = view_projection(view, LIST_CARD_PROJECTION)
 
+        mode = None
+        started = time.perf_counter()
         if search:
-            # re.escape: the raw user string used to be interpolated straight
-            # into $regex, so `(((((((` was a ReDoS and `.*` a full scan.
-            escaped = re.escape(search.strip())
-            filter_query["$or"] = [
-                {"title": {"$regex": escaped, "$options": "i"}},
-                {"description": {"$regex": escaped, "$options": "i"}},
-                {"tags": {"$regex": escaped, "$options": "i"}},
-            ]
-
-        # The old guard (`if min_price > 0 or max_price < 20000`) meant
-        # max_price=50000 silently filtered nothing. Always apply the bounds.
-        #
-        # CANONICAL PRICE FIELD: `price` (float). `suggested_price` is the raw
-        # AI string ("₹1,299") and is display-only/legacy. The filter, the sort
-        # and - critically - what Stripe actually charges all read `price`, so
-        # the UI must render `price` too or the filter will keep looking broken.
-        price_filter = {}
-        if min_price is not None:
-            price_filter["$gte"] = min_price
-        if max_price is not None:
-            price_filter["$lte"] = max_price
-        if price_filter:
-            filter_query["price"] = price_filter
-
-        if category != "all":
-            filter_query["category"] = {
-                "$regex": f"^{re.escape(category)}$",
-                "$options": "i",
-            }
-        if state != "all":
-            filter_query["state"] = {"$regex": f"^{re.escape(state)}$", "$options": "i"}
+            mode = _choose_search_mode(search, requested_mode, cursor, ranked=sort is None)
+        sort_name = sort or LISTINGS_CURSOR_TAG
+
+        page = None
+        if mode == "engine":
+            await SEARCH_ENGINE.ensure_current(db, version)
+            page = await _engine_listings_page(
+                db,
+                projection,
+                search,
+                min_price,
+                max_price,
+                category,
+                state,
+                cursor,
+                skip,
+                limit,
+                count,
+            )
+        elif mode == "text":
+            page = await _fetch_listings_page(
+                db.listings,
+                {**filter_query, "$text": {"$search": search}},
+                projection,
+                RELEVANCE_SORT if sort is None else LISTING_SORTS[sort_name],
+                RELEVANCE_CURSOR_TAG if sort is None else TEXT_CURSOR_PREFIX + sort_name,
+                cursor,
+                skip,
+                limit,
+                count,
+                text_search=sort is None,
+            )
+        if (
+            page is not None
+            and requested_mode == "auto"
+            and not page[0]
+            and not cursor
+            and skip == 0
+        ):
+            # Nothing for whole words - most likely a partial word ("pott"),
+            # which only the regex path can match.
+            mode = "regex"
+            page = None
+        from_cards = False
+        if page is None:
+            collection = db.listings
+            if mode == "regex":
+                filter_query.update(_regex_search_clause(search))
+            elif LISTING_CARDS_ENABLED and mode is None:
+                # Browsing: the precomputed cards, same filters and indexes.
+                collection = db[LISTING_CARDS_COLLECTION]
+                projection = CARD_PROJECTIONS[view]
+                from_cards = True
+            page = await _fetch_listings_page(
+                collection,
+                filter_query,
+                projection,
+                LISTING_SORTS[sort_name],
+                sort_name,
+                cursor,
+                skip,
+                limit,
+                count,
+                text_search=False,
+            )
+        raw_listings, total_count, next_cursor, has_more, skip = page
+
+        headers = {}
+        if mode:
+            headers["X-Search-Mode"] = mode
+            logger.debug(
+                "Listings search %r via %s: %.1f ms",
+                search,
+                mode,
+                (time.perf_counter() - started) * 1000,
+            )
 
-        # Projection: this endpoint renders a card grid, but it used to return
-        # whole documents - full descriptions, stories, raw voice
-        # transcriptions, entire review arrays, plus every undeclared field
-        # that `extra = "allow"` lets through - 100 at a time.
-        pipeline = [
-            {"$match": filter_query},
-            {"$sort": {"created_at": -1}},
-            {"$skip": skip},
-            {"$limit": limit},
+        if from_cards:
+            # Already rendered on write; only the view's fields were read.
+            headers["X-Read-Model"] = LISTING_CARDS_COLLECTION
+            serialized_listings = [card_body(card, view) for card in raw_listings]
+            skipped = 0
+        else:
+            # Contract #1: the artisan is embedded, fetched with one `$in` for
+            # the page (1 + N queries -> 2). Then one pydantic-core pass over
+            # the whole page, then orjson. It used to be a Listing(**doc) per
+            # card, a ListingsResponse around them, and a model_dump +
+            # json.dumps on top.
+            serialized_listings, skipped = await render_cards(db, raw_listings, view)
+
+        if skipped:
+            # `total` used to keep counting documents that were silently
+            # dropped, which broke pagination with no signal at all.
+            logger.error(
+                "%s listing(s) failed validation and were omitted from this page", skipped
+            )
+            if total_count is not None:
+                total_count = max(total_count - skipped, len(serialized_listings))
+
+        body = render_listings_response(
+            serialized_listings,
+            view=view,
+            dumped=from_cards,
+            total=total_count,
+            has_more=has_more,
+            limit=limit,
+            skip=skip,
+            next_cursor=next_cursor,
+        )
+        if cache_key is not None:
+            LISTING_PAGES.set(cache_key, (body, headers))
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={
+                **headers,
+                **conditional_headers,
+                "X-Cache": "MISS" if cache_key is not None else "BYPASS",
+            },
+        )
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error fetching listings")
+        raise HTTPException(status_code=500, detail="Error fetching listings")
+
+
+@router.get("/listings/suggest", response_model=SuggestionsResponse)
+async def suggest_listings(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    db: AsyncIOMotorDatabase = Depends(Database.get_db),
+):
+    """Typeahead for the search box, from the in-process prefix index.
+
+    Every keystroke used to run the full regex search. Only the first call
+    on a worker touches Mongo (to build the index); the catalogue version
+    check after that is served from memory too.
+    """
+    try:
+        await SUGGESTIONS.ensure_current(db, await catalogue_version(db))
+    except Exception:
+        logger.exception("Could not build the suggest index")
+        raise HTTPException(status_code=503, detail="Suggestions unavailable")
+    return {"query": q, "suggestions": SUGGESTIONS.suggest(q, limit)}
+
+
+@router.get("/listings/export")
+async def export_listings(
+    # Tunable per caller: larger batches mean fewer round trips, smaller ones
+    # a smaller resident page and an earlier first byte.
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=MAX_EXPORT_BATCH_SIZE),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    category: str = "all",
+    state: str = "all",
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(Database.get_db),
+):
+    """Stream every matching listing as NDJSON, one document per line.
+
+    Partner feeds and analytics used to crawl GET /listings 100 rows at a time
+    with `skip`, which gets slower with every page. This is a single
+    server-side cursor in `_id` order; at most one batch is in memory.
+    """
+    filter_query = _listing_filters(min_price, max_price, category, state)
+    cursor = (
+        db.listings.find(filter_query, EXPORT_PROJECTION)
+        .sort("_id", 1)
+        .batch_size(batch_size)
+    )
+    logger.info(
+        "Listings export for %s (filter=%s, batch_size=%d)",
+        current_user.get("firebase_uid"),
+        filter_query,
+        batch_size,
+    )
+
+    async def _lines():
+        batch = []
+        try:
+            async for doc in cursor:
+                batch.append(render_json(attach_images(serialize_listing_doc(doc))))
+                if len(batch) >= batch_size:
+                    yield b"\n".join(batch) + b"\n"
+                    batch = []
+            if batch:
+                yield b"\n".join(batch) + b"\n"
+        except Exception:
+            # Headers are already sent; a truncated body is all that can
+            # signal this, so make sure it is at least logged.
+            logger.exception("Listings export aborted")
+            raise
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(
+        _lines(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-store",
+            "Content-Disposition": 'attachment; filename="listings.ndjson"',
+        },
+    )
+
+
+def _facet_count_branch(match: dict, field: str) -> list:
+    """Count per `<field>_key`, labelled with a stored display spelling."""
+    return [
+        *([{"$match": match}] if match else []),
+        {
+            "$group": {
+                "_id": f"${field}_key",
+                "label": {"$first": f"${field}"},
+                "count": {"$sum": 1},
+            }
+        },
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+
+
+async def _fetch_facets(
+    db: AsyncIOMotorDatabase,
+    search_clause: dict,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    category: str,
+    state: str,
+) -> ListingFacetsResponse:
+    # Each dimension drops its own filter (a sidebar that only listed the
+    # selected category would be useless); search applies to all of them.
+    price_match = _listing_filters(None, None, category, state)
+    facets = await db.listings.aggregate(
+        [
+            {"$match": search_clause},
             {
-                "$project": {
-                    "title": 1,
-                    "category": 1,
-                    "tags": 1,
-                    "price": 1,
-                    "originalPrice": 1,
-                    "suggested_price": 1,
-                    "image_ids": 1,
-                    "artist_id": 1,
-                    "status": 1,
-                    "inStock": 1,
-                    "stockCount": 1,
-                    "created_at": 1,
-                    "updated_at": 1,
-                    "state": 1,
-                    # Card blurb only; the full text is on the detail endpoint.
-                    "description": {
-                        "$substrCP": [{"$ifNull": ["$description", ""]}, 0, LIST_DESCRIPTION_CHARS]
-                    },
-                    # Aggregates instead of shipping every review body.
-                    "review_count": {"$size": {"$ifNull": ["$reviews", []]}},
-                    "rating": {"$avg": "$reviews.rating"},
+                "$facet": {
+                    "total": [
+                        {"$match": _listing_filters(min_price, max_price, category, state)},
+                        {"$count": "n"},
+                    ],
+                    "categories": _facet_count_branch(
+                        _listing_filters(min_price, max_price, "all", state), "category"
+                    ),
+                    "states": _facet_count_branch(
+                        _listing_filters(min_price, max_price, category, "all"), "state"
+                    ),
+                    "price_bands": [
+                        *([{"$match": price_match}] if price_match else []),
+                        {
+                            "$bucket": {
+                                "groupBy": "$price",
+                                "boundaries": [*FACET_PRICE_BANDS, float("inf")],
+                                "default": "other",
+                            }
+                        },
+                    ],
                 }
             },
         ]
-        raw_listings = await db.listings.aggregate(pipeline).to_list(length=limit)
-        total_count = await db.listings.count_documents(filter_query)
+    ).to_list(length=1)
+    facet = facets[0] if facets else {}
+
+    band_counts = {b["_id"]: b["count"] for b in facet.get("price_bands", [])}
+    edges = [*FACET_PRICE_BANDS, None]
+    return ListingFacetsResponse(
+        total=facet["total"][0]["n"] if facet.get("total") else 0,
+        categories=[
+            FacetCount(key=b["_id"], label=b.get("label") or b["_id"], count=b["count"])
+            for b in facet.get("categories", [])
+            if b["_id"]
+        ],
+        states=[
+            FacetCount(key=b["_id"], label=b.get("label") or b["_id"], count=b["count"])
+            for b in facet.get("states", [])
+            if b["_id"]
+        ],
+        # Empty bands included, so the sidebar layout does not jump around.
+        price_bands=[
+            PriceBandCount(min=low, max=high, count=band_counts.get(low, 0))
+            for low, high in zip(edges, edges[1:])
+        ],
+    )
 
-        serialized_docs = [serialize_listing_doc(doc) for doc in raw_listings]
 
-        # Contract #1: embed the artisan so the marketplace stops firing one
-        # request per card. 1 + N queries -> 2 queries.
-        artisans = await fetch_artisans_by_uid(
-            db, (d.get("artist_id") for d in serialized_docs)
-        )
+@router.get("/listings/facets", response_model=ListingFacetsResponse)
+async def get_listing_facets(
+    search: str = "",
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    category: str = "all",
+    state: str = "all",
+    search_mode: Optional[str] = Query(None, pattern="^(auto|text|regex|engine)$"),
+    db: AsyncIOMotorDatabase = Depends(Database.get_db),
+):
+    """Category, state and price-band counts for the marketplace sidebar.
 
-        serialized_listings = []
-        skipped = 0
-        for doc in serialized_docs:
-            _attach_images(doc)
-            doc["artisan"] = build_artisan_block(artisans.get(doc.get("artist_id")))
-            try:
-                serialized_listings.append(Listing(**doc))
-            except Exception:
-                skipped += 1
-                logger.warning(
-                    "Skipping listing %s: does not validate against the Listing model",
-                    doc.get("id"),
-                    exc_info=True,
-                )
+    Takes the same filters as GET /listings and answers in one $facet
+    aggregation; the sidebar used to need one listings call per facet.
+    """
+    search = search.strip()
+    requested_mode = search_mode or DEFAULT_SEARCH_MODE
+
+    version = await catalogue_version(db)
+    cache_key = (
+        version,
+        listing_pages_key(
+            search=search,
+            min_price=min_price,
+            max_price=max_price,
+            category=category,
+            state=state,
+            search_mode=requested_mode,
+        ),
+    )
+    cached = LISTING_FACETS.get(cache_key)
+    if cached is not None:
+        return cached
 
-        if skipped:
-            # `total` used to keep counting documents that were silently
-            # dropped, which broke pagination with no signal at all.
-            logger.error(
-                "%s listing(s) failed validation and were omitted from this page", skipped
+    try:
+        mode = _choose_search_mode(search, requested_mode, None) if search else None
+        if mode == "engine":
+            # Counts come from Mongo; $text is the nearest equivalent.
+            mode = "text"
+        search_clause = {}
+        if mode == "text":
+            search_clause = {"$text": {"$search": search}}
+        elif mode == "regex":
+            search_clause = _regex_search_clause(search)
+        result = await _fetch_facets(
+            db, search_clause, min_price, max_price, category, state
+        )
+        if mode == "text" and requested_mode == "auto" and not result.total:
+            # Same partial-word fallback as GET /listings.
+            result = await _fetch_facets(
+                db, _regex_search_clause(search), min_price, max_price, category, state
             )
-            total_count = max(total_count - skipped, len(serialized_listings))
+    except Exception:
+        logger.exception("Error computing listing facets")
+        raise HTTPException(status_code=500, detail="Error computing listing facets")
+
+    LISTING_FACETS.set(cache_key, result)
+    return result
+
+
+def _detail_listing(doc: dict, artisans: dict) -> Listing:
+    """The full listing as GET /listings/{id} returns it."""
+    serialized = attach_images(serialize_listing_doc(doc))
+    serialized["artisan"] = build_artisan_block(artisans.get(serialized.get("artist_id")))
+    return Listing(**serialized)
+
 
-        return ListingsResponse(
-            listings=serialized_listings, total=total_count, limit=limit, skip=skip
+@router.get("/listings/batch")
+async def get_listings_batch(
+    ids: str = Query(..., min_length=1, description="Comma-separated listing ids"),
+    # A cart wants `view=cart`; the default stays the detail shape.
+    view: str = Query("full", pattern=f"^({'|'.join(LISTING_VIEWS)})$"),
+    db: AsyncIOMotorDatabase = Depends(Database.get_db),
+):
+    """Several listings by id, in the order asked for.
+
+    The cart and checkout pages used to call GET /listings/{id} once per item,
+    two queries each. This is one `$in` on listings and one
+    fetch_artisans_by_uid() for all of them. With the full view each item is
+    what GET /listings/{id}?reviews=none returns as `listing`; ids that do not
+    exist (sold out and deleted, say) are reported in `missing` rather than
+    failing the batch.
+    """
+    requested = list(dict.fromkeys(part.strip() for part in ids.split(",") if part.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="No listing ids given")
+    if len(requested) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_IDS} listing ids per request",
+        )
+    object_ids = [_object_id_or_400(listing_id, "listing ID") for listing_id in requested]
+    try:
+        projection = (
+            {"reviews": 0} if view == "full" else view_projection(view, LIST_CARD_PROJECTION)
+        )
+        found = {}
+        async for doc in db.listings.find({"_id": {"$in": object_ids}}, projection):
+            found[str(doc["_id"])] = doc
+        artisans = await fetch_artisans_by_uid(
+            db, (doc.get("artist_id") for doc in found.values())
+        )
+        docs = []
+        for listing_id in requested:
+            if listing_id in found:
+                doc = attach_images(
+                    serialize_listing_doc(found[listing_id]), BATCH_IMAGE_SIZES.get(view)
+                )
+                doc["artisan"] = build_artisan_block(artisans.get(doc.get("artist_id")))
+                docs.append(doc)
+        listings, _ = validate_listings(docs, view)
+        return Response(
+            content=render_json(
+                {
+                    "listings": dump_listings(listings, view),
+                    "missing": [
+                        listing_id for listing_id in requested if listing_id not in found
+                    ],
+                }
+            ),
+            media_type="application/json",
         )
     except HTTPException:
         raise
     except Exception:
-        logger.exception("Error fetching listings")
+        logger.exception("Error fetching listing batch")
         raise HTTPException(status_code=500, detail="Error fetching listings")
 
 
+async def _detail_reviews(db: AsyncIOMotorDatabase, listing_oid: ObjectId, mode: str) -> list:
+    """The `reviews` a detail response embeds, oldest first as they always were."""
+    if mode == "none":
+        return []
+    cursor = db.reviews.find({"listing_id": listing_oid})
+    if mode == "latest":
+        docs = await cursor.sort(REVIEWS_SORT).limit(DETAIL_LATEST_REVIEWS).to_list(None)
+        docs.reverse()
+    else:
+        docs = await cursor.sort([("created_at", 1), ("_id", 1)]).to_list(None)
+    return [serialize_review_doc(doc) for doc in docs]
+
+
 @router.get("/listings/{listing_id}")
 async def get_listing(
+    request: Request,
     listing_id: str,
+    # all: every review. latest: the newest DETAIL_LATEST_REVIEWS, oldest
+    # first like `all`. none: no review bodies; the stored review_count /
+    # rating_avg are still there. The last two keep the payload the same size
+    # however many reviews a listing collects.
+    reviews: str = Query("all", pattern=f"^({'|'.join(DETAIL_REVIEW_MODES)})$"),
     db: AsyncIOMotorDatabase = Depends(Database.get_db),
 ):
-    """Get a specific listing by ID."""
-    object_id = _object_id_or_400(listing_id, "listing ID")
-    try:
-        listing = await db.listings.find_one({"_id": object_id})
-        if not listing:
-            raise HTTPException(status_code=404, detail="Listing not found")
-
-        serialized = _attach_images(serialize_listing_doc(listing))
+    """Get a specific listing by ID.
 
-        artisan_doc = None
-        if serialized.get("artist_id"):
-            artisan_doc = await db.users.find_one(
-                {"firebase_uid": serialized["artist_id"]}
+    Read-through: the rendered body is kept in LISTING_DETAILS until the
+    listing (or its artisan) is written, so a hot product page costs no
+    queries. The ETag is a digest of the body, and a matching If-None-Match
+    is answered 304.
+    """
+    object_id = _object_id_or_400(listing_id, "listing ID")
+    cache_key = (str(object_id), reviews)
+    cached = LISTING_DETAILS.get(cache_key)
+    cache_status = "HIT"
+    if cached is None:
+        cache_status = "MISS"
+        try:
+            # Not projected away, an embedded array left by a failed
+            # migration would be read and dropped on every miss.
+            listing = await db.listings.find_one({"_id": object_id}, {"reviews": 0})
+            if not listing:
+                raise HTTPException(status_code=404, detail="Listing not found")
+
+            artist_id = listing.get("artist_id")
+            artisans, listing["reviews"] = await asyncio.gather(
+                fetch_artisans_by_uid(db, [artist_id] if artist_id else []),
+                _detail_reviews(db, object_id, reviews),
+            )
+            body = render_json(
+                {"listing": _detail_listing(listing, artisans).model_dump(by_alias=True)}
             )
-        serialized["artisan"] = build_artisan_block(artisan_doc)
+        except HTTPException:
+            raise
+        except Exception:
+            logger.exception("Error fetching listing %s", listing_id)
+            raise HTTPException(status_code=500, detail="Error fetching listing")
+        cached = (body_etag(body), body)
+        LISTING_DETAILS.set(cache_key, cached)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": LISTINGS_CACHE_CONTROL, "X-Cache": cache_status}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/listings/{listing_id}/reviews", response_model=ReviewsPage)
+async def get_listing_reviews(
+    listing_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncIOMotorDatabase = Depends(Database.get_db),
+):
+    """A listing's reviews, newest first, `limit` at a time.
 
-        return {"listing": Listing(**serialized)}
-    except HTTPException:
-        raise
+    Keyset-paged over the reviews collection's (listing_id, created_at)
+    index, so a listing with thousands of reviews costs the same per page as
+    one with ten.
+    """
+    object_id = _object_id_or_400(listing_id, "listing ID")
+    filter_query = {"listing_id": object_id}
+    if cursor:
+        try:
+            after = decode_cursor(cursor, REVIEWS_CURSOR_TAG, len(REVIEWS_SORT))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        filter_query.update(keyset_filter(REVIEWS_SORT, after))
+
+    try:
+        listing, docs = await asyncio.gather(
+            db.listings.find_one({"_id": object_id}, {"review_count": 1}),
+            db.reviews.find(filter_query).sort(REVIEWS_SORT).limit(limit + 1).to_list(None),
+        )
     except Exception:
-        logger.exception("Error fetching listing %s", listing_id)
-        raise HTTPException(status_code=500, detail="Error fetching listing")
+        logger.exception("Error fetching reviews for listing %s", listing_id)
+        raise HTTPException(status_code=500, detail="Error fetching reviews")
+    if not listing:
+        raise HTTPException(status_code=404, detail="Listing not found")
+
+    page = docs[:limit]
+    return {
+        "reviews": [serialize_review_doc(doc) for doc in page],
+        "total": listing.get("review_count") or 0,
+        "next_cursor": (
+            cursor_for(page[-1], REVIEWS_CURSOR_TAG, REVIEWS_SORT) if len(docs) > limit else None
+        ),
+    }
 
 
 @router.post("/listings/{listing_id}/reviews", response_model=Review)
@@ -331,11 +1251,23 @@ async def submit_listing_review(
             verified=paid_order is not None,
         )
 
+        # The aggregates first: a listing deleted in the meantime then leaves
+        # no orphaned review. Two writes without a transaction, so a failure
+        # between them leaves the count one ahead of the collection.
         update_result = await db.listings.update_one(
-            {"_id": object_id}, {"$push": {"reviews": new_review_doc.model_dump()}}
+            {"_id": object_id}, review_aggregate_update(new_review_doc.rating)
         )
         if update_result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Listing not found.")
+        await db.reviews.insert_one(
+            {
+                **new_review_doc.model_dump(exclude={"id"}),
+                "_id": ObjectId(new_review_doc.id),
+                "listing_id": object_id,
+                "created_at": datetime.utcnow(),
+            }
+        )
+        await invalidate_listings(db, listing_id)
 
         return new_review_doc
     except HTTPException:
@@ -362,6 +1294,7 @@ async def create_listing(
     try:
         bucket = _bucket(db)
         image_ids = []
+        image_renditions = {}
         image_contents = []
         total_bytes = 0
 
@@ -387,29 +1320,40 @@ async def create_listing(
             # Keep the ORIGINAL bytes for Gemini (it does its own downscale),
             # but store an optimized copy. CPU-bound work goes to a thread.
             image_contents.append(content)
-            stored_bytes, stored_type = await asyncio.to_thread(
-                _optimize_for_storage, content
-            )
+            renditions = await asyncio.to_thread(_renditions_for_storage, content)
             logger.info(
-                "Upload %s: %d bytes -> %d bytes stored",
+                "Upload %s: %d bytes -> %s",
                 img.filename,
                 len(content),
-                len(stored_bytes),
+                ", ".join(f"{size} {len(data)} bytes" for size, (data, _) in renditions.items()),
             )
 
             unique_filename = f"{uuid.uuid4()}_{img.filename}"
-            upload_stream = bucket.open_upload_stream(
+            metadata = {
+                "original_filename": img.filename,
+                "original_bytes": len(content),
+                "uploaded_at": datetime.utcnow(),
+            }
+            linked = {}
+            for size, (data, content_type) in renditions.items():
+                if size == FULL_IMAGE_SIZE:
+                    continue
+                linked[size] = await _store_image(
+                    bucket,
+                    f"{size}_{unique_filename}",
+                    data,
+                    dict(metadata, content_type=content_type, rendition=size),
+                )
+            full_bytes, full_type = renditions[FULL_IMAGE_SIZE]
+            image_id = await _store_image(
+                bucket,
                 unique_filename,
-                metadata={
-                    "content_type": stored_type or img.content_type,
-                    "original_filename": img.filename,
-                    "original_bytes": len(content),
-                    "uploaded_at": datetime.utcnow(),
-                },
+                full_bytes,
+                dict(metadata, content_type=full_type or img.content_type, renditions=linked),
             )
-            await upload_stream.write(stored_bytes)
-            await upload_stream.close()
-            image_ids.append(upload_stream._id)
+            image_ids.append(image_id)
+            if linked:
+                image_renditions[str(image_id)] = linked
 
         ai_listing = await generate_listing_with_gemini(transcription, image_contents)
         firebase_uid = current_user["firebase_uid"]
@@ -433,6 +1377,8 @@ async def create_listing(
             "story": ai_listing.get("story", ""),
             "transcription": transcription,
             "image_ids": image_ids,
+            # {full image id: {size: GridFS id}}, for GET .../images/{id}?size=
+            "image_renditions": image_renditions,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "status": "active",
@@ -448,14 +1394,18 @@ async def create_listing(
             "stockCount": 10,
             "features": ai_listing.get("features", []),
             "specifications": ai_listing.get("specifications", {}),
-            "reviews": [],
+            "review_count": 0,
+            "rating_sum": 0,
+            "rating_avg": 0.0,
             "shippingInfo": {
                 "estimatedDays": "3-5 business days",
                 "returnPolicy": "30-day returns",
             },
         }
+        listing_data.update(listing_filter_keys(listing_data))
 
         result = await db.listings.insert_one(listing_data)
+        await invalidate_listings(db, str(result.inserted_id))
 
         return {
             "message": "Listing created successfully",
@@ -513,6 +1463,7 @@ async def update_listing_status(
         {"_id": ObjectId(listing_id)},
         {"$set": {"status": status, "updated_at": datetime.utcnow()}},
     )
+    await invalidate_listings(db, listing_id)
     return {"message": f"Listing status updated to {status}"}
 
 
@@ -545,28 +1496,78 @@ async def get_image(
     listing_id: str,
     image_id: str,
     request: Request,
+    # One of IMAGE_RENDITIONS. Images uploaded before renditions existed, or
+    # smaller than the size asked for, are served at the next size up.
+    size: str = Query(FULL_IMAGE_SIZE, pattern=f"^({'|'.join(IMAGE_SIZES)})$"),
+    # Any other width in RESIZE_WIDTHS, at a RESIZE_QUALITIES quality. Takes
+    # precedence over `size`.
+    w: Optional[int] = None,
+    q: int = STORED_IMAGE_QUALITY,
     db: AsyncIOMotorDatabase = Depends(Database.get_db),
 ):
     """Serve an image out of GridFS.
 
     Frozen contract #5: long-lived Cache-Control + ETag. GridFS ids are
     immutable, so the content behind a URL can never change - `immutable` is
-    accurate here. The body is streamed rather than read into memory.
+    accurate here. Large bodies are streamed rather than read into memory. A
+    `Range` (honoured per `If-Range`) gets a 206 read from just the GridFS
+    chunks that hold it.
+
+    With `w=`, the full-size file is resized in a worker thread once and then
+    served from the on-disk cache, without touching Mongo or GridFS. Other
+    files up to HOT_IMAGE_MAX_FILE_BYTES are read whole on first request and
+    then served from HOT_IMAGES, again without touching Mongo or GridFS.
     """
     listing_object_id = _object_id_or_400(listing_id, "listing ID")
     image_object_id = _object_id_or_400(image_id, "image ID")
-
-    # ETag is derived from the ids alone, so a conditional request is answered
-    # without touching GridFS at all.
-    etag = '"%s"' % hashlib.sha1(f"{listing_id}:{image_id}".encode()).hexdigest()
+    if w is not None and w not in RESIZE_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"w must be one of {list(RESIZE_WIDTHS)}")
+    if q not in RESIZE_QUALITIES:
+        raise HTTPException(status_code=400, detail=f"q must be one of {list(RESIZE_QUALITIES)}")
+
+    # ETag is derived from the ids (and size) alone, so a conditional request
+    # is answered without touching GridFS at all. Full-size ETags are the ones
+    # already in browser caches.
+    etag_key = f"{listing_id}:{image_id}"
+    if w is not None:
+        etag_key += f":w{w}:q{q}"
+    elif size != FULL_IMAGE_SIZE:
+        etag_key += f":{size}"
+    etag = '"%s"' % hashlib.sha1(etag_key.encode()).hexdigest()
     if request.headers.get("if-none-match") == etag:
         return Response(
             status_code=304,
             headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL},
         )
+    headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": etag}
+
+    # Keyed by listing too: an entry exists only once the image was checked
+    # against this listing below, and goes when the listing is deleted.
+    resized_key = f"{listing_id}_{image_id}_w{w}_q{q}.webp"
+    if w is not None:
+        path = await RESIZED_IMAGES.get(resized_key)
+        if path is not None:
+            # Opened here rather than handing FileResponse the path: the file
+            # may be removed before the response would open it.
+            try:
+                handle, length = await asyncio.to_thread(_open_file, path)
+            except FileNotFoundError:
+                RESIZED_IMAGES.forget(resized_key)
+            else:
+                return StreamingResponse(
+                    _iter_file(handle),
+                    media_type="image/webp",
+                    headers={**headers, "Content-Length": str(length)},
+                )
+    else:
+        # Same reasoning, keyed by the ETag key: listing, image and size.
+        hot = HOT_IMAGES.get(etag_key)
+        if hot is not None:
+            body, content_type = hot
+            return _image_bytes_response(request, body, content_type, headers, etag)
 
     listing = await db.listings.find_one(
-        {"_id": listing_object_id}, {"image_ids": 1}
+        {"_id": listing_object_id}, {"image_ids": 1, f"image_renditions.{image_id}": 1}
     )
     if not listing:
         raise HTTPException(status_code=404, detail="Listing not found")
@@ -578,8 +1579,32 @@ async def get_image(
     if image_id not in image_ids_in_listing:
         raise HTTPException(status_code=404, detail="Image not found in listing")
 
+    if w is not None:
+        try:
+            download_stream = await _bucket(db).open_download_stream(image_object_id)
+            try:
+                source = await download_stream.read()
+            finally:
+                await _close_stream(download_stream)
+        except Exception:
+            logger.warning("GridFS file %s missing for listing %s", image_id, listing_id)
+            raise HTTPException(status_code=404, detail="Image file not found")
+        try:
+            body, stored = await asyncio.to_thread(_resize_to_cache, source, w, q, resized_key)
+        except Exception:
+            logger.warning("Could not resize image %s; serving it as stored", image_id, exc_info=True)
+        else:
+            if stored:
+                await RESIZED_IMAGES.add(resized_key, len(body))
+            return Response(content=body, media_type="image/webp", headers=headers)
+
+    file_id = image_object_id
+    if size != FULL_IMAGE_SIZE and w is None:
+        renditions = (listing.get("image_renditions") or {}).get(image_id)
+        file_id = _rendition_id(renditions, size) or image_object_id
+
     try:
-        download_stream = await _bucket(db).open_download_stream(image_object_id)
+        download_stream = await _bucket(db).open_download_stream(file_id)
     except Exception:
         logger.warning("GridFS file %s missing for listing %s", image_id, listing_id)
         raise HTTPException(status_code=404, detail="Image file not found")
@@ -589,26 +1614,45 @@ async def get_image(
     if isinstance(metadata, dict):
         content_type = metadata.get("content_type", content_type)
 
-    async def _iter():
-        try:
-            while True:
-                chunk = await download_stream.readchunk()
-                if not chunk:
-                    break
-                yield chunk
-        finally:
-            close = getattr(download_stream, "close", None)
-            if close is not None:
-                result = close()
-                if asyncio.iscoroutine(result):
-                    await result
-
-    headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": etag}
     length = getattr(download_stream, "length", None)
+    byte_range = None
     if isinstance(length, int):
-        headers["Content-Length"] = str(length)
+        headers["Accept-Ranges"] = "bytes"
+        try:
+            if if_range_allows(request.headers.get("if-range"), etag):
+                byte_range = parse_range(request.headers.get("range"), length)
+        except RangeNotSatisfiable:
+            await _close_stream(download_stream)
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{length}"}
+            )
+
+    if byte_range is None and isinstance(length, int) and length <= HOT_IMAGES.max_item_bytes:
+        # Small enough to keep: read it whole once, serve it from memory after.
+        try:
+            body = await download_stream.read()
+        finally:
+            await _close_stream(download_stream)
+        HOT_IMAGES.set(etag_key, (body, content_type), len(body))
+        return Response(content=body, media_type=content_type, headers=headers)
+
+    if byte_range is None:
+        if isinstance(length, int):
+            headers["Content-Length"] = str(length)
+        return StreamingResponse(
+            _iter_stream(download_stream), media_type=content_type, headers=headers
+        )
 
-    return StreamingResponse(_iter(), media_type=content_type, headers=headers)
+    # A resumed download used to restart from byte zero.
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_stream_range(download_stream, start, end),
+        status_code=206,
+        media_type=content_type,
+        headers=headers,
+    )
 
 
 @router.delete("/listings/{listing_id}")
@@ -621,7 +1665,9 @@ async def delete_listing(
     could wipe any artisan's catalogue with a single curl."""
     listing = await _require_listing_owner(db, listing_id, current_user)
 
-    image_ids = listing.get("image_ids") or []
+    image_ids = list(listing.get("image_ids") or [])
+    for renditions in (listing.get("image_renditions") or {}).values():
+        image_ids.extend(renditions.values())
     if image_ids:
         bucket = _bucket(db)
         for image_id in image_ids:
@@ -631,8 +1677,15 @@ async def delete_listing(
                 )
             except Exception:
                 logger.warning("Could not delete GridFS image %s", image_id, exc_info=True)
+    await RESIZED_IMAGES.discard_prefix(f"{listing_id}_")
+    HOT_IMAGES.discard_prefix(f"{listing_id}:")
 
     result = await db.listings.delete_one({"_id": ObjectId(listing_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Listing not found")
+    try:
+        await db.reviews.delete_many({"listing_id": ObjectId(listing_id)})
+    except Exception:
+        logger.warning("Could not delete reviews of listing %s", listing_id, exc_info=True)
+    await invalidate_listings(db, listing_id)
     return {"message": "Listing deleted successfully"}
@@ -118,7 +118,9 @@ async def get_orders(
             if listing and image_id:
                 # NameError fix: listing_id_str used to be referenced in a
                 # branch where it had never been assigned.
-                product_image_url = get_first_image_url(str(listing["_id"]), [image_id])
+                product_image_url = get_first_image_url(
+                    str(listing["_id"]), [image_id], "thumb"
+                )
 
             estimated = order_doc.get("estimated_delivery")
             delivered = order_doc.get("delivered_date")
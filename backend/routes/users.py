@@ -8,6 +8,7 @@ from firebase_admin import auth
 
 from models.profileModel import RoleUpdate, UserProfile, UserProfileUpdate
 from services.database import Database
+from services.listing_cache import invalidate_artisan
 
 from .auth import get_current_user
 
@@ -75,6 +76,7 @@ async def update_user_profile(
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
             )
+        await invalidate_artisan(db, firebase_uid, mongo_update)
         return UserProfile(
             display_name=updated_user_doc.get("display_name") or "",
             email=updated_user_doc.get("email") or "",
@@ -142,7 +144,9 @@ async def update_user_role(
 async def delete_user_account(current_user: dict = Depends(get_current_user)):
     firebase_uid = current_user["firebase_uid"]
     try:
-        await Database.get_db()["users"].delete_one({"firebase_uid": firebase_uid})
+        db = Database.get_db()
+        await db["users"].delete_one({"firebase_uid": firebase_uid})
+        await invalidate_artisan(db, firebase_uid)
     except Exception:
         logger.exception("Error deleting user %s", firebase_uid)
         raise HTTPException(status_code=500, detail="Failed to delete user account.")
@@ -5,6 +5,10 @@ import os
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+from services.index_advisor import log_index_report
+from services.migrations import run_migrations
 
 load_dotenv()
 
@@ -19,6 +23,13 @@ SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS",
 CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
 SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "20000"))
 
+# Data backfills (services/migrations.py). Each runs once per database, before
+# this worker serves; see that module for large catalogues.
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() == "true"
+# Explain every registered query shape after the indexes are ensured and log
+# the ones that scan or sort in memory (services/index_advisor.py).
+INDEX_ADVISOR_ON_STARTUP = os.getenv("INDEX_ADVISOR_ON_STARTUP", "false").lower() == "true"
+
 
 class Database:
     _client: AsyncIOMotorClient = None
@@ -46,23 +57,96 @@ class Database:
                 raise
 
             await cls._create_indexes()
+            if RUN_MIGRATIONS_ON_STARTUP:
+                await run_migrations(cls._db)
+            if INDEX_ADVISOR_ON_STARTUP:
+                await log_index_report(cls._db)
 
     # (collection, keys, kwargs). Created independently so one failure - e.g. a
     # unique index rejected because of pre-existing duplicates - cannot skip
     # every index declared after it.
     _INDEXES = [
-        ("listings", [("created_at", DESCENDING)], {}),
-        ("listings", "artist_id", {}),
-        ("listings", "category", {}),
-        ("listings", "price", {}),
+        # Matches the (created_at, _id) keyset cursor of GET /listings, so
+        # every page is an index range scan instead of a $skip walk.
+        ("listings", [("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+        # GET /artist/listings: equality on the artisan, newest first. The
+        # single-field artist_id index it replaces (dropped below) left an
+        # in-memory SORT.
+        ("listings", [("artist_id", ASCENDING), ("created_at", DESCENDING)], {}),
+        # The category/state filters are equality matches on lower-cased keys
+        # (a case-insensitive ^X$ regex could not use an index at all), with
+        # the newest-first sort behind them so no SORT stage is needed.
+        (
+            "listings",
+            [("category_key", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            {},
+        ),
+        (
+            "listings",
+            [("state_key", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            {},
+        ),
+        # Both filters at once; neither single-key index can serve the sort
+        # behind the other key's equality.
+        (
+            "listings",
+            [
+                ("category_key", ASCENDING),
+                ("state_key", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            {},
+        ),
+        # GET /listings?sort=price_asc|price_desc|rating|popular, each
+        # unfiltered and behind the category filter (the common pairing).
+        # (price, _id) also serves price-range filters; it replaces the old
+        # single-field price index. Other filter + sort pairs sort in memory,
+        # over the filtered rows only.
+        ("listings", [("price", ASCENDING), ("_id", ASCENDING)], {}),
+        (
+            "listings",
+            [("category_key", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING)],
+            {},
+        ),
+        (
+            "listings",
+            [("rating_avg", DESCENDING), ("review_count", DESCENDING), ("_id", DESCENDING)],
+            {},
+        ),
+        (
+            "listings",
+            [
+                ("category_key", ASCENDING),
+                ("rating_avg", DESCENDING),
+                ("review_count", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            {},
+        ),
+        ("listings", [("review_count", DESCENDING), ("_id", DESCENDING)], {}),
+        (
+            "listings",
+            [("category_key", ASCENDING), ("review_count", DESCENDING), ("_id", DESCENDING)],
+            {},
+        ),
         ("listings", "status", {}),
         # users.firebase_uid is queried on EVERY authenticated request by
         # get_current_user and had no index at all - a collection scan per call.
         ("users", "firebase_uid", {"unique": True}),
-        # Order queries: by buyer (buyer dashboard), by product (artisan).
+        # Order queries: by buyer (buyer dashboard), by product (artisan), all
+        # newest first. GET /orders is an $or of buyer_id and buyerEmail, so
+        # BOTH branches need order_date behind them for a SORT_MERGE plan.
         ("orders", [("buyer_id", ASCENDING), ("order_date", DESCENDING)], {}),
-        ("orders", "buyerEmail", {}),
-        ("orders", "product_id", {}),
+        ("orders", [("buyerEmail", ASCENDING), ("order_date", DESCENDING)], {}),
+        ("orders", [("product_id", ASCENDING), ("order_date", DESCENDING)], {}),
+        # GET /listings/{id}/reviews pages newest first per listing; the
+        # detail endpoint and listing deletes select on listing_id alone.
+        (
+            "reviews",
+            [("listing_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            {},
+        ),
         # Webhook lookup + idempotency.
         ("orders", "stripe_session_id", {"sparse": True}),
         ("orders", "paid_session_id", {"sparse": True}),
@@ -76,10 +160,45 @@ class Database:
             {"name": "listings_text"},
         ),
     ]
+    # GET /listings browses `listing_cards` (services/listing_cards.py) with
+    # the same filters and sorts, so it gets the same compound indexes; the
+    # artist_id one also serves the artisan-profile card refresh.
+    _INDEXES += [
+        ("listing_cards", keys, kwargs)
+        for collection, keys, kwargs in _INDEXES
+        if collection == "listings" and isinstance(keys, list) and keys[-1][1] != TEXT
+    ]
+
+    # (collection, index name) of indexes an entry above replaces. create_index
+    # never removes anything, so without this every database created before
+    # the compound indexes kept maintaining these on each write.
+    _SUPERSEDED_INDEXES = [
+        ("listings", "created_at_-1"),  # (created_at, _id)
+        ("listings", "artist_id_1"),  # (artist_id, created_at)
+        ("listings", "category_1"),  # filters moved to category_key
+        ("listings", "price_1"),  # (price, _id)
+        ("orders", "buyerEmail_1"),  # (buyerEmail, order_date)
+        ("orders", "product_id_1"),  # (product_id, order_date)
+    ]
+    # IndexNotFound: already dropped, or the database never had it.
+    _INDEX_NOT_FOUND = 27
 
     @classmethod
     async def _create_indexes(cls):
         """Create indexes for better query performance"""
+        # Best effort, like the creates: a failed drop leaves a redundant
+        # index behind, nothing worse.
+        for collection, name in cls._SUPERSEDED_INDEXES:
+            try:
+                await cls._db[collection].drop_index(name)
+                logger.info("Dropped superseded index %s on %s", name, collection)
+            except OperationFailure as exc:
+                if exc.code != cls._INDEX_NOT_FOUND:
+                    logger.warning(
+                        "Could not drop index %s on %s", name, collection, exc_info=True
+                    )
+            except Exception:
+                logger.warning("Could not drop index %s on %s", name, collection, exc_info=True)
         created = 0
         for collection, keys, kwargs in cls._INDEXES:
             try:
@@ -0,0 +1,326 @@
+"""Bounded caches of listing image bytes, keyed so that a hit needs no Mongo.
+
+HOT_IMAGES keeps small images in memory. A handful of homepage images carry
+most of the image traffic, and each of those requests cost a `listings` lookup
+for the membership check, a GridFS files lookup and the chunk reads. Files up
+to HOT_IMAGE_MAX_FILE_BYTES are held whole, with their content type, within
+HOT_IMAGE_CACHE_MAX_BYTES. Keys are the response's ETag key, listing included,
+so a hit stands in for the membership check. That check is only as fresh as
+the entry: deleting a listing discards its entries on the worker that handled
+the delete, and HOT_IMAGE_CACHE_TTL_SECONDS bounds how long any other worker
+keeps serving them.
+
+RESIZED_IMAGES keeps resizes on disk. GET /listings/{id}/images/{image_id}?w=
+resizes on demand: images stored before renditions existed have only one size,
+and clients ask for widths we never planned for. A resize costs a GridFS read
+plus a decode and an encode, so the result is written here. Later requests are
+answered from local disk without touching Mongo or GridFS.
+
+Files are named by listing, image, width and quality. Image ids are immutable,
+so an entry never goes stale; deleting a listing removes its files from every
+worker's directory on this host (another worker's lookup then finds the file
+gone and treats it as a miss). Total size is held under IMAGE_CACHE_MAX_BYTES,
+least recently served first out.
+
+Same process-local trade-offs as utils/ttl_cache.py: each index lives in this
+worker and is touched only on the event loop. Each worker keeps its files in
+its own subdirectory of IMAGE_CACHE_DIR, within its own IMAGE_CACHE_MAX_BYTES,
+so the disk holds up to workers x budget. Files left by a previous run of the
+same pid are adopted on first use, oldest first; other dead workers' files
+are removed.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.ttl_cache import register
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kalamitra-renditions")
+)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HOT_IMAGE_CACHE_MAX_BYTES = int(os.getenv("HOT_IMAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+HOT_IMAGE_MAX_FILE_BYTES = int(os.getenv("HOT_IMAGE_MAX_FILE_BYTES", str(256 * 1024)))
+HOT_IMAGE_CACHE_TTL_SECONDS = float(os.getenv("HOT_IMAGE_CACHE_TTL_SECONDS", "60"))
+
+_PARTIAL_SUFFIX = ".partial"
+
+
+class MemoryLRUCache:
+    """Values of a known size in bytes, at most `max_bytes` of them in total,
+    each living at most `ttl_seconds`. A value larger than `max_item_bytes` is
+    never stored. Expired entries are dropped lazily on read, as in TTLCache,
+    and count toward `max_bytes` until then."""
+
+    def __init__(self, name: str, max_bytes: int, max_item_bytes: int, ttl_seconds: float):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be >= 1")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be > 0")
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self.ttl = float(ttl_seconds)
+        # key -> (expires_at, value, bytes)
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register(name, self)
+
+    def get(self, key: str) -> Any:
+        """The value, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            self.pop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, size: int) -> bool:
+        """Store the value unless it is over `max_item_bytes`; evicts the least
+        recently served entries to stay within `max_bytes`."""
+        if size > self.max_item_bytes:
+            return False
+        self.pop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.evictions += 1
+        return True
+
+    def pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def discard_prefix(self, prefix: str) -> int:
+        """Drop every entry whose key starts with `prefix`."""
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self.pop(key)
+        return len(keys)
+
+    def reset(self) -> None:
+        """Drop all state. Used by tests; never called at runtime."""
+        self._entries.clear()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "max_item_bytes": self.max_item_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class DiskLRUCache:
+    """Files under `root`/<pid>, at most `max_bytes` of them in total.
+
+    Each worker process owns its own subdirectory, so its index sees every
+    file it has to count and the budget holds per worker. On first use the
+    directories of workers that are no longer running are removed.
+    """
+
+    def __init__(self, name: str, root: str, max_bytes: int):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be >= 1")
+        self.name = name
+        self.root = root
+        # Set on first use, in the worker process (not a pre-fork parent).
+        self.directory: Optional[str] = None
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> bytes
+        self._bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        register(name, self)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        directory = os.path.join(self.root, str(os.getpid()))
+        found = await asyncio.to_thread(_scan, self.root, directory)
+        if self._loaded:  # another request finished loading meanwhile
+            return
+        self.directory = directory
+        self._loaded = True
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    async def get(self, key: str) -> Optional[str]:
+        """The file's path, or None on a miss. The file may still be gone by
+        the time it is opened: call forget() then."""
+        await self._ensure_loaded()
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self.path(key)
+        self.misses += 1
+        return None
+
+    def forget(self, key: str) -> None:
+        """The file get() returned has gone since: drop it from the index and
+        count that lookup as the miss it was."""
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+        self.hits -= 1
+        self.misses += 1
+
+    def write(self, key: str, data: bytes) -> str:
+        """Write the file; blocking, so call it from a worker thread, after
+        get(). Readers never see a partial file. Call add() afterwards, on
+        the event loop."""
+        os.makedirs(self.directory, exist_ok=True)
+        partial = self.path(f"{key}.{uuid.uuid4().hex}{_PARTIAL_SUFFIX}")
+        with open(partial, "wb") as handle:
+            handle.write(data)
+        os.replace(partial, self.path(key))
+        return self.path(key)
+
+    async def add(self, key: str, size: int) -> None:
+        await self._ensure_loaded()
+        self._bytes -= self._entries.pop(key, 0)
+        self._entries[key] = size
+        self._bytes += size
+        self._evict()
+
+    async def discard_prefix(self, prefix: str) -> int:
+        """Drop every entry whose key starts with `prefix`, and remove such
+        files from the other workers' directories too."""
+        await self._ensure_loaded()
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            self._bytes -= self._entries.pop(key)
+        await asyncio.to_thread(_remove_prefix, self.root, prefix)
+        return len(keys)
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            self._unlink(key)
+
+    def _unlink(self, key: str) -> None:
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove cached image %s", key, exc_info=True)
+
+    def reset(self) -> None:
+        """Drop all state and files. Used by tests; never called at runtime."""
+        if self._loaded:
+            for key in list(self._entries):
+                self._unlink(key)
+        self._entries.clear()
+        self._bytes = 0
+        self._loaded = False
+        self.directory = None
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def _scan(root: str, directory: str) -> List[Tuple[float, str, int]]:
+    """(mtime, name, bytes) of the files a previous run left in `directory`.
+    Blocking: runs in a thread. Also removes unfinished writes, and the
+    directories of workers that are gone (and files from before per-worker
+    directories)."""
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(root):
+        if entry.path == directory:
+            continue
+        if entry.is_dir():
+            if entry.name.isdigit() and not _pid_running(int(entry.name)):
+                shutil.rmtree(entry.path, ignore_errors=True)
+        elif entry.is_file():
+            _remove(entry.path)
+    found = []
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue
+        if entry.name.endswith(_PARTIAL_SUFFIX):
+            # A write that never finished.
+            _remove(entry.path)
+            continue
+        stat = entry.stat()
+        found.append((stat.st_mtime, entry.name, stat.st_size))
+    return found
+
+
+def _remove_prefix(root: str, prefix: str) -> None:
+    """Blocking: runs in a thread."""
+    for worker_dir in os.scandir(root):
+        if not worker_dir.is_dir():
+            continue
+        for entry in os.scandir(worker_dir.path):
+            if entry.name.startswith(prefix):
+                _remove(entry.path)
+
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+HOT_IMAGES = MemoryLRUCache(
+    "hot_images", HOT_IMAGE_CACHE_MAX_BYTES, HOT_IMAGE_MAX_FILE_BYTES, HOT_IMAGE_CACHE_TTL_SECONDS
+)
+RESIZED_IMAGES = DiskLRUCache("resized_images", IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
@@ -0,0 +1,174 @@
+"""Explain the hot query shapes and flag plans that scan or sort in memory.
+
+Database._INDEXES is written against the shapes below. When a route changes
+its filter or sort, its shape here should change with it, and this report is
+how a missing index shows up before a slow page does: a COLLSCAN means no
+index matched the filter, a blocking SORT means none delivered the order.
+
+Only the query planner runs (verbosity "queryPlanner"): no documents are
+read, so it is cheap enough to run at startup (INDEX_ADVISOR_ON_STARTUP) or
+by hand against production with `python -m services.index_advisor`, which
+exits non-zero if anything is flagged.
+
+Placeholder values stand in for request parameters; the planner chooses by
+shape, not by value.
+"""
+
+import asyncio
+import json
+import logging
+import sys
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_NEWEST = [("created_at", -1), ("_id", -1)]
+
+# (name, collection, filter, sort). Keep in step with the routes named.
+QUERY_SHAPES = [
+    # routes/listing.py get_listings
+    ("listings.newest", "listings", {}, _NEWEST),
+    ("listings.category", "listings", {"category_key": "pottery"}, _NEWEST),
+    ("listings.state", "listings", {"state_key": "rajasthan"}, _NEWEST),
+    (
+        "listings.category_state",
+        "listings",
+        {"category_key": "pottery", "state_key": "rajasthan"},
+        _NEWEST,
+    ),
+    ("listings.price_band", "listings", {"price": {"$gte": 500, "$lte": 2500}}, _NEWEST),
+    # ... with sort=
+    ("listings.price_asc", "listings", {}, [("price", 1), ("_id", 1)]),
+    (
+        "listings.category_price_desc",
+        "listings",
+        {"category_key": "pottery"},
+        [("price", -1), ("_id", -1)],
+    ),
+    (
+        "listings.rating",
+        "listings",
+        {},
+        [("rating_avg", -1), ("review_count", -1), ("_id", -1)],
+    ),
+    ("listings.popular", "listings", {}, [("review_count", -1), ("_id", -1)]),
+    # ... served from the read model (LISTING_CARDS_ENABLED)
+    ("cards.newest", "listing_cards", {}, _NEWEST),
+    ("cards.category", "listing_cards", {"category_key": "pottery"}, _NEWEST),
+    ("cards.rating", "listing_cards", {}, [("rating_avg", -1), ("review_count", -1), ("_id", -1)]),
+    # routes/listing.py get_listing_reviews
+    ("listing.reviews", "reviews", {"listing_id": "id"}, [("created_at", -1), ("_id", -1)]),
+    # routes/artists.py get_artist_listings
+    ("artist.listings", "listings", {"artist_id": "uid"}, [("created_at", -1)]),
+    # routes/orders.py get_orders
+    (
+        "buyer.orders",
+        "orders",
+        {"$or": [{"buyer_id": "uid"}, {"buyerEmail": "buyer@example.com"}]},
+        [("order_date", -1)],
+    ),
+    # routes/artists.py get_artist_orders
+    ("artist.orders", "artist_orders", {"artist_id": "uid"}, [("order_date", -1)]),
+    (
+        "artist.product_orders",
+        "orders",
+        {"product_id": {"$in": ["a", "b"]}},
+        [("order_date", -1)],
+    ),
+]
+
+# SORT_MERGE / SORT_KEY_GENERATOR are fine: they merge already-ordered index
+# streams. Only a blocking SORT holds the whole result in memory.
+PROBLEM_STAGES = {"COLLSCAN": "collection scan", "SORT": "in-memory sort"}
+
+
+def _winning_plan(explain: dict) -> dict:
+    planner = explain.get("queryPlanner", {})
+    plan = planner.get("winningPlan", {})
+    # The slot-based engine (MongoDB 7+) nests the classic tree one level down.
+    return plan.get("queryPlan", plan)
+
+
+def plan_summary(explain: dict) -> Dict[str, List[str]]:
+    """The stages and index names in an explain's winning plan, root first."""
+    stages: List[str] = []
+    indexes: List[str] = []
+
+    def _walk(node: Any) -> None:
+        if isinstance(node, dict):
+            if "stage" in node:
+                stages.append(node["stage"])
+            if "indexName" in node:
+                indexes.append(node["indexName"])
+            for key in ("inputStage", "inputStages", "queryPlan"):
+                if key in node:
+                    _walk(node[key])
+        elif isinstance(node, list):
+            for item in node:
+                _walk(item)
+
+    _walk(_winning_plan(explain))
+    return {"stages": stages, "indexes": indexes}
+
+
+async def index_report(db) -> List[Dict[str, Any]]:
+    """One row per QUERY_SHAPES entry; `problems` is empty for a good plan."""
+    report = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        row: Dict[str, Any] = {"shape": name, "collection": collection}
+        try:
+            explain = await db.command(
+                {
+                    "explain": {"find": collection, "filter": query, "sort": dict(sort)},
+                    "verbosity": "queryPlanner",
+                }
+            )
+        except Exception as exc:
+            row.update(stages=[], indexes=[], problems=[f"explain failed: {exc}"])
+            report.append(row)
+            continue
+        summary = plan_summary(explain)
+        row.update(summary)
+        row["problems"] = [
+            PROBLEM_STAGES[stage] for stage in summary["stages"] if stage in PROBLEM_STAGES
+        ]
+        report.append(row)
+    return report
+
+
+async def log_index_report(db) -> List[Dict[str, Any]]:
+    """Run the report and log it; never raises, like run_migrations."""
+    try:
+        report = await index_report(db)
+    except Exception:
+        logger.warning("Index advisor failed", exc_info=True)
+        return []
+    flagged = 0
+    for row in report:
+        if row["problems"]:
+            flagged += 1
+            logger.warning(
+                "Query shape %s on %s: %s (plan %s)",
+                row["shape"],
+                row["collection"],
+                ", ".join(row["problems"]),
+                " <- ".join(row["stages"]),
+            )
+    logger.info("Index advisor: %s of %s query shapes flagged", flagged, len(report))
+    return report
+
+
+if __name__ == "__main__":
+    from services.database import Database
+
+    async def _main() -> int:
+        await Database.connect_db()
+        try:
+            report = await index_report(Database.get_db())
+        finally:
+            await Database.close_db()
+        print(json.dumps(report, indent=2))
+        return 1 if any(row["problems"] for row in report) else 0
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,243 @@
+"""Process-local caches in front of the listings read path.
+
+Also the invalidation hooks: every write that can change what a listings page
+renders (create, status change, delete, a new review) calls
+`invalidate_listings()`, and every write to a user profile calls
+`invalidate_artisan()`, so new caches only have to be wired up here rather
+than in every route. The same hooks keep the in-process catalogue indexes
+(LISTING_INDEXES) and the `listing_cards` read model up to date.
+
+Both hooks bump the catalogue version (invalidate_artisan only when a rendered
+artisan block can have changed), a counter kept in Mongo (`counters`)
+so every worker - and a restarted one - agrees on it. GET /listings derives
+its ETag from it and keys its page cache on it. Readers hold the version for
+CATALOGUE_VERSION_TTL_SECONDS, so a conditional request is answered without a
+round trip; a write on another worker is seen within that window.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+
+from services.listing_cards import refresh_artisan_cards, refresh_listing_card
+from services.search_engine import SEARCH_ENGINE
+from services.suggest_index import SUGGESTIONS
+from services.versioned_index import CATALOGUE_COUNTER_ID, CHANGE_LOG_SIZE
+from utils.serialization import ARTISAN_CACHE, ARTISAN_PROJECTION
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Serialized `ListingsResponse` bodies for GET /listings, keyed by the
+# normalized query. Short TTL because other workers' writes cannot reach this
+# process's copy (see utils/ttl_cache.py).
+LISTING_PAGES_TTL_SECONDS = float(os.getenv("LISTINGS_CACHE_TTL_SECONDS", "30"))
+LISTING_PAGES_MAX_ENTRIES = int(os.getenv("LISTINGS_CACHE_MAX_ENTRIES", "256"))
+# Deep `skip` pages are scrapers, not the home page; caching them would only
+# evict the entries that matter.
+LISTING_PAGES_MAX_SKIP = int(os.getenv("LISTINGS_CACHE_MAX_SKIP", "200"))
+
+LISTING_PAGES = TTLCache(
+    "listing_pages", LISTING_PAGES_MAX_ENTRIES, LISTING_PAGES_TTL_SECONDS
+)
+
+# GET /listings/facets results, keyed by catalogue version + filter. One entry
+# is a handful of counts, so it can afford to live longer than a page.
+LISTING_FACETS = TTLCache(
+    "listing_facets",
+    int(os.getenv("LISTINGS_FACETS_CACHE_MAX_ENTRIES", "256")),
+    float(os.getenv("LISTINGS_FACETS_CACHE_TTL_SECONDS", "60")),
+)
+
+# Rendered GET /listings/{id} bodies with their ETag, keyed by listing id and
+# `reviews=` mode. A product page used to cost two sequential queries
+# (listing, then artisan) on every view. Writes to the listing drop its
+# entries; the TTL bounds staleness from other workers' writes, as for the
+# page cache.
+LISTING_DETAILS = TTLCache(
+    "listing_details",
+    int(os.getenv("LISTING_DETAIL_CACHE_MAX_ENTRIES", "1024")),
+    float(os.getenv("LISTING_DETAIL_CACHE_TTL_SECONDS", "60")),
+)
+DETAIL_REVIEW_MODES = ("all", "latest", "none")
+
+# In-process indexes over the catalogue (services/versioned_index.py), kept in
+# step with every write that goes through the hooks below.
+LISTING_INDEXES = (SUGGESTIONS, SEARCH_ENGINE)
+
+CATALOGUE_VERSION_TTL_SECONDS = float(os.getenv("CATALOGUE_VERSION_TTL_SECONDS", "5"))
+CATALOGUE_VERSION = TTLCache("catalogue_version", 1, CATALOGUE_VERSION_TTL_SECONDS)
+
+
+def listing_pages_key(**params) -> tuple:
+    """Normalize GET /listings parameters into a cache key.
+
+    Search, category and state are all matched case-insensitively, so
+    "Pottery" and "pottery " must share an entry.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized[name] = value
+    return tuple(sorted(normalized.items()))
+
+
+def listings_etag(version: int, query_key: tuple) -> str:
+    """Weak: GZipMiddleware may re-encode the body, the content is the same."""
+    digest = hashlib.sha1(repr((version, query_key)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Weak ETag for one rendered document: it changes exactly when the body
+    does, whichever worker rendered it."""
+    return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+async def catalogue_version(db) -> int:
+    version = CATALOGUE_VERSION.get(CATALOGUE_COUNTER_ID)
+    if version is None:
+        doc = await db.counters.find_one({"_id": CATALOGUE_COUNTER_ID}, {"version": 1})
+        version = (doc or {}).get("version", 0)
+        CATALOGUE_VERSION.set(CATALOGUE_COUNTER_ID, version)
+    return version
+
+
+async def _bump_catalogue_version(db, change: dict) -> None:
+    """`change` goes on the counter's change log in the same update, so other
+    workers' indexes can catch up on it (services/versioned_index.py)."""
+    try:
+        doc = await db.counters.find_one_and_update(
+            {"_id": CATALOGUE_COUNTER_ID},
+            {
+                "$inc": {"version": 1},
+                "$push": {"changes": {"$each": [change], "$slice": -CHANGE_LOG_SIZE}},
+            },
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        CATALOGUE_VERSION.set(CATALOGUE_COUNTER_ID, doc["version"])
+        # The caller has already re-indexed what it wrote.
+        for index in LISTING_INDEXES:
+            index.caught_up(doc["version"] - 1, doc["version"])
+    except Exception:
+        # The write itself already succeeded; do not fail the request over
+        # it. Clients may see a stale 304 until the next bump.
+        logger.exception("Could not bump the catalogue version")
+        CATALOGUE_VERSION.clear()
+
+
+async def _reindex_listing(db, listing_id: str) -> None:
+    """Fetch the written listing once, for every index that is built."""
+    indexes = [index for index in LISTING_INDEXES if index.built]
+    if not indexes:
+        return
+    projection = {field: 1 for index in indexes for field in index.LISTING_FIELDS}
+    try:
+        doc = await db.listings.find_one({"_id": ObjectId(listing_id)}, projection)
+    except (InvalidId, TypeError):
+        return
+    except Exception:
+        # Left for the version-triggered rebuild to pick up.
+        logger.warning("Could not re-index listing %s", listing_id, exc_info=True)
+        return
+    for index in indexes:
+        index.update_listing(listing_id, doc)
+
+
+async def _reindex_artisan(db, firebase_uid: str) -> None:
+    indexes = [index for index in LISTING_INDEXES if index.built]
+    if not indexes:
+        return
+    try:
+        doc = await db.users.find_one({"firebase_uid": firebase_uid}, {"craft": 1})
+    except Exception:
+        logger.warning("Could not re-index artisan %s", firebase_uid, exc_info=True)
+        return
+    for index in indexes:
+        index.update_artisan(firebase_uid, doc)
+
+
+async def invalidate_listings(db, listing_id: Optional[str] = None) -> None:
+    """A listing was written. Any page may contain it, so every page goes.
+
+    Without a `listing_id` any listing may have changed (an artisan block they
+    embed, say), so every cached detail goes as well.
+    """
+    await _invalidate(db, listing_id, {"listing_id": listing_id} if listing_id else {})
+
+
+async def _invalidate(db, listing_id: Optional[str], change: dict) -> None:
+    LISTING_PAGES.clear()
+    LISTING_FACETS.clear()
+    if listing_id:
+        for mode in DETAIL_REVIEW_MODES:
+            LISTING_DETAILS.pop((listing_id, mode))
+        await _reindex_listing(db, listing_id)
+        try:
+            await refresh_listing_card(db, listing_id)
+        except Exception:
+            # Stale until the listing is written again or the cards rebuilt.
+            logger.warning("Could not refresh the card of listing %s", listing_id, exc_info=True)
+    else:
+        LISTING_DETAILS.clear()
+    await _bump_catalogue_version(db, change)
+    logger.debug("Listing caches invalidated (listing=%s)", listing_id)
+
+
+async def _has_listings(db, firebase_uid: str) -> bool:
+    try:
+        return await db.listings.find_one({"artist_id": firebase_uid}, {"_id": 1}) is not None
+    except Exception:
+        logger.warning("Could not look up listings of %s", firebase_uid, exc_info=True)
+        return True  # cascade rather than leave stale artisan blocks
+
+
+async def invalidate_artisan(
+    db, firebase_uid: Optional[str], fields: Optional[Iterable[str]] = None
+) -> None:
+    """A user profile changed; `fields` are the ones written, if known.
+
+    Pages, details and cards embed the artisan block, so they go too - but
+    only when there is a block to change: some field in ARTISAN_PROJECTION
+    was written, and the user has listings. Otherwise (a buyer's profile, an
+    artisan's phone number) the catalogue version stays put, so listings
+    ETags and other workers' indexes are left alone.
+    """
+    if not firebase_uid:
+        return
+    ARTISAN_CACHE.pop(firebase_uid)
+    if fields is not None and not any(field in ARTISAN_PROJECTION for field in fields):
+        return
+    if not await _has_listings(db, firebase_uid):
+        return
+    await _reindex_artisan(db, firebase_uid)
+    try:
+        await refresh_artisan_cards(db, firebase_uid)
+    except Exception:
+        logger.warning("Could not refresh the cards of artisan %s", firebase_uid, exc_info=True)
+    # Every detail embeds some artisan block; the indexes only need the artisan.
+    await _invalidate(db, None, {"artisan_uid": firebase_uid})
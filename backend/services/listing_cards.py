@@ -0,0 +1,268 @@
+"""`listing_cards`: the GET /listings card, precomputed.
+
+A browse page used to rebuild every card at read time: a `$project` that
+truncates the description and derives `rating`, a `users` lookup for the
+artisan block, and a `construct_image_urls` call per row, then a pydantic pass.
+This collection holds the finished full-view card per listing - artisan block
+and image URLs included - plus the keys the browse filters and sorts read
+(`category_key`, `state_key`, `rating_avg`), so a page is one indexed find
+whose rows go straight to orjson.
+
+Maintained on write through services/listing_cache.py: invalidate_listings()
+re-renders one listing's card (create, edit, status, images, reviews, delete)
+and invalidate_artisan() rewrites the artisan block on that artisan's cards.
+Built by the `2025_listing_cards` migration; rebuild by hand with
+`python -m services.listing_cards` (image URLs embed API_BASE_URL, so after
+changing it). A rebuild overwrites cards in place and never empties the
+collection, so it is safe while the app serves.
+
+Reads switch over with LISTING_CARDS_ENABLED=true, once the migration has run.
+Searches keep reading `listings`, where the text index lives.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReplaceOne
+
+from utils.image_helpers import construct_image_urls
+from utils.rendering import VIEW_MODELS, dump_listings, validate_listings
+from utils.serialization import (
+    build_artisan_block,
+    fetch_artisans_by_uid,
+    serialize_listing_doc,
+)
+
+logger = logging.getLogger(__name__)
+
+LISTING_CARDS_ENABLED = os.getenv("LISTING_CARDS_ENABLED", "false").lower() == "true"
+LISTING_CARDS_COLLECTION = "listing_cards"
+REBUILD_BATCH_SIZE = 500
+
+# `GET /listings` renders cards, so descriptions are truncated server-side.
+LIST_DESCRIPTION_CHARS = 300
+
+# Projection: this endpoint renders a card grid, but it used to return whole
+# documents - full descriptions, stories, raw voice transcriptions, entire
+# review arrays, plus every undeclared field that `extra = "allow"` lets
+# through - 100 at a time.
+LIST_CARD_PROJECTION = {
+    "title": 1,
+    "category": 1,
+    "tags": 1,
+    "price": 1,
+    "originalPrice": 1,
+    "suggested_price": 1,
+    "image_ids": 1,
+    "artist_id": 1,
+    "status": 1,
+    "inStock": 1,
+    "stockCount": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "state": 1,
+    # Card blurb only; the full text is on the detail endpoint.
+    "description": {
+        "$substrCP": [{"$ifNull": ["$description", ""]}, 0, LIST_DESCRIPTION_CHARS]
+    },
+    # Stored aggregates (maintained by submit_listing_review) instead of
+    # walking every review array on every request. `rating` stays null for a
+    # listing nobody has reviewed.
+    "review_count": {"$ifNull": ["$review_count", 0]},
+    "rating": {"$cond": [{"$gt": ["$review_count", 0]}, "$rating_avg", None]},
+}
+
+# Cards are grid tiles: their image URLs ask for the `card` rendition.
+CARD_IMAGE_SIZE = "card"
+
+# Stored beside the card for the browse filters and sorts, never rendered.
+CARD_QUERY_KEYS = ("category_key", "state_key", "rating_avg")
+_CARD_SOURCE_PROJECTION = dict(LIST_CARD_PROJECTION, **{key: 1 for key in CARD_QUERY_KEYS})
+
+
+def _aliases(model) -> List[str]:
+    return [info.alias or name for name, info in model.model_fields.items()]
+
+
+# What each view renders, in the order its model dumps it. The full view also
+# passes through the projected fields `Listing` does not declare (`state`).
+CARD_FIELDS: Dict[str, Tuple[str, ...]] = {
+    view: tuple(_aliases(model)) for view, model in VIEW_MODELS.items()
+}
+CARD_FIELDS["full"] += tuple(key for key in LIST_CARD_PROJECTION if key not in CARD_FIELDS["full"])
+CARD_PROJECTIONS = {view: {key: 1 for key in fields} for view, fields in CARD_FIELDS.items()}
+
+
+def attach_images(serialized_doc: dict, size: Optional[str] = None) -> dict:
+    listing_id_str = serialized_doc.get("id")
+    image_ids = serialized_doc.get("image_ids", [])
+    serialized_doc["images"] = (
+        construct_image_urls(listing_id_str, image_ids, size)
+        if listing_id_str and image_ids
+        else ["/placeholder.svg"]
+    )
+    return serialized_doc
+
+
+async def render_cards(
+    db, raw_docs: List[dict], view: str = "full", fresh_artisans: bool = False
+) -> Tuple[list, int]:
+    """Projected `listings` rows to validated `view` models: serialized, with
+    `card` image URLs and the artisan block (one `$in` for the page).
+    `fresh_artisans` skips ARTISAN_CACHE, see fetch_artisans_by_uid().
+
+    Returns (listings, skipped), as validate_listings() does.
+    """
+    serialized_docs = [serialize_listing_doc(doc) for doc in raw_docs]
+    artisans = await fetch_artisans_by_uid(
+        db, (d.get("artist_id") for d in serialized_docs), use_cache=not fresh_artisans
+    )
+    for doc in serialized_docs:
+        attach_images(doc, CARD_IMAGE_SIZE)
+        doc["artisan"] = build_artisan_block(artisans.get(doc.get("artist_id")))
+    return validate_listings(serialized_docs, view)
+
+
+def card_body(card: dict, view: str) -> dict:
+    """A stored card as `view` renders it: key order and defaults as the
+    model dumps them, `_id` as a string."""
+    body = {"_id": str(card["_id"])}
+    if view == "full":
+        # Unset pass-through fields stay absent, as in the rendered path.
+        body.update((key, card[key]) for key in CARD_FIELDS[view][1:] if key in card)
+    else:
+        body.update((key, card.get(key)) for key in CARD_FIELDS[view][1:])
+    return body
+
+
+async def _build_cards(db, raw_docs: List[dict]) -> List[dict]:
+    """Stored card documents for rows read with _CARD_SOURCE_PROJECTION.
+
+    Artisan blocks are read from `users`, not this worker's ARTISAN_CACHE: a
+    card outlives any TTL, and the cache may predate a profile edit that
+    another worker has already written to the cards.
+    """
+    query_keys = {
+        str(doc["_id"]): {key: doc.pop(key, None) for key in CARD_QUERY_KEYS}
+        for doc in raw_docs
+    }
+    listings, _ = await render_cards(db, raw_docs, "full", fresh_artisans=True)
+    cards = []
+    for card in dump_listings(listings, "full"):
+        keys = query_keys[card["_id"]]
+        card["_id"] = ObjectId(card["_id"])
+        card.update(keys)
+        cards.append(card)
+    return cards
+
+
+async def refresh_listing_card(db, listing_id: str) -> None:
+    """Re-render one listing's card; drop it if the listing is gone."""
+    try:
+        oid = ObjectId(listing_id)
+    except (InvalidId, TypeError):
+        return
+    rows = await db.listings.aggregate(
+        [{"$match": {"_id": oid}}, {"$project": _CARD_SOURCE_PROJECTION}]
+    ).to_list(length=1)
+    cards = await _build_cards(db, rows) if rows else []
+    if cards:
+        await db[LISTING_CARDS_COLLECTION].replace_one({"_id": oid}, cards[0], upsert=True)
+    else:
+        # Deleted, or no longer renders: either way it is off the grid.
+        await db[LISTING_CARDS_COLLECTION].delete_one({"_id": oid})
+
+
+async def refresh_artisan_cards(db, firebase_uid: str) -> int:
+    """Rewrite the artisan block on every card of one artisan.
+
+    The caller has already dropped the artisan from ARTISAN_CACHE.
+    """
+    artisans = await fetch_artisans_by_uid(db, [firebase_uid], use_cache=False)
+    result = await db[LISTING_CARDS_COLLECTION].update_many(
+        {"artist_id": firebase_uid},
+        {"$set": {"artisan": build_artisan_block(artisans.get(firebase_uid))}},
+    )
+    return result.modified_count
+
+
+async def rebuild_listing_cards(db) -> int:
+    """Re-render every card, REBUILD_BATCH_SIZE listings at a time.
+
+    Every worker runs the migrations at startup and an operator may rerun this
+    while the app serves, so there is no destructive window: each batch is
+    upserted over the existing cards, then cards whose listing is gone or no
+    longer renders are deleted. Concurrent rebuilds write the same cards. A
+    listing edited mid-rebuild may keep the card as of the rebuild's read
+    until its next write.
+    """
+    cards = db[LISTING_CARDS_COLLECTION]
+    written = 0
+    batch: List[dict] = []
+    cursor = db.listings.aggregate([{"$project": _CARD_SOURCE_PROJECTION}])
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            written += await _upsert_cards(db, cards, batch)
+            batch = []
+    if batch:
+        written += await _upsert_cards(db, cards, batch)
+    removed = await _delete_orphan_cards(db, cards)
+    logger.info("listing_cards rebuilt: %d cards, %d orphans removed", written, removed)
+    return written
+
+
+async def _upsert_cards(db, cards, raw_docs: List[dict]) -> int:
+    ids = [doc["_id"] for doc in raw_docs]
+    built = await _build_cards(db, raw_docs)
+    if built:
+        await cards.bulk_write(
+            [ReplaceOne({"_id": card["_id"]}, card, upsert=True) for card in built],
+            ordered=False,
+        )
+    rendered = {card["_id"] for card in built}
+    unrendered = [oid for oid in ids if oid not in rendered]
+    if unrendered:
+        await cards.delete_many({"_id": {"$in": unrendered}})
+    return len(built)
+
+
+async def _delete_orphan_cards(db, cards) -> int:
+    """Delete cards whose listing no longer exists."""
+    removed = 0
+    batch: List[ObjectId] = []
+    async for card in cards.find({}, {"_id": 1}):
+        batch.append(card["_id"])
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            removed += await _delete_unlisted(db, cards, batch)
+            batch = []
+    if batch:
+        removed += await _delete_unlisted(db, cards, batch)
+    return removed
+
+
+async def _delete_unlisted(db, cards, card_ids: List[ObjectId]) -> int:
+    live = {doc["_id"] async for doc in db.listings.find({"_id": {"$in": card_ids}}, {"_id": 1})}
+    gone = [oid for oid in card_ids if oid not in live]
+    if not gone:
+        return 0
+    result = await cards.delete_many({"_id": {"$in": gone}})
+    return result.deleted_count
+
+
+if __name__ == "__main__":
+    from services.database import Database
+
+    async def _main():
+        await Database.connect_db()
+        try:
+            await rebuild_listing_cards(Database.get_db())
+        finally:
+            await Database.close_db()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
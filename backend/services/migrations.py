@@ -0,0 +1,283 @@
+"""One-off data migrations, run at startup right after the indexes.
+
+Each migration is idempotent and is recorded in `schema_migrations` once it
+completes, so it runs once per database rather than once per boot. As with
+Database._INDEXES, a failure is logged and retried on the next start rather
+than failing it. Unlike indexes, MIGRATIONS is a dependency chain, so a
+failure also stops the run: nothing after it runs on top of a step that did
+not happen.
+
+Every worker calls run_migrations() at startup. One lease document in
+`schema_migrations` (MIGRATION_LOCK_ID) lets one of them run the chain; the
+others skip it and serve. The lease lapses after MIGRATION_LOCK_SECONDS, so a
+worker that died mid-run does not block the chain for good.
+
+Startup migrations run inline, before the worker serves: the review move, the
+card rebuilds and the price backfill each walk the whole catalogue. For a
+large catalogue set RUN_MIGRATIONS_ON_STARTUP=false and run them by hand with
+`python -m services.migrations` before deploying the code that needs them.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from services.listing_cards import rebuild_listing_cards
+from utils.serialization import parse_price
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_ID = "_lock"
+MIGRATION_LOCK_SECONDS = int(os.getenv("MIGRATION_LOCK_SECONDS", "3600"))
+# Writes per bulk_write in the Python-side backfills.
+MIGRATION_BATCH_SIZE = 500
+
+
+def _filter_key_expr(field: str) -> dict:
+    """Aggregation twin of utils.serialization.filter_key: trim + lower-case,
+    null for anything that is not a string ($toLower alone turns null into "")."""
+    return {
+        "$cond": [
+            {"$eq": [{"$type": f"${field}"}, "string"]},
+            {"$toLower": {"$trim": {"input": f"${field}"}}},
+            None,
+        ]
+    }
+
+
+async def backfill_listing_filter_keys(db) -> int:
+    """Write `category_key` / `state_key` on listings that predate them.
+
+    Server-side pipeline update, so nothing is pulled into Python.
+    """
+    result = await db["listings"].update_many(
+        {"$or": [{"category_key": {"$exists": False}}, {"state_key": {"$exists": False}}]},
+        [
+            {
+                "$set": {
+                    "category_key": _filter_key_expr("category"),
+                    "state_key": _filter_key_expr("state"),
+                }
+            }
+        ],
+    )
+    return result.modified_count
+
+
+async def backfill_review_aggregates(db) -> int:
+    """Materialise review_count / rating_sum / rating_avg from the arrays."""
+    result = await db["listings"].update_many(
+        {"review_count": {"$exists": False}},
+        [
+            {
+                "$set": {
+                    "review_count": {"$size": {"$ifNull": ["$reviews", []]}},
+                    "rating_sum": {"$sum": "$reviews.rating"},
+                    "rating_avg": {"$ifNull": [{"$avg": "$reviews.rating"}, 0]},
+                }
+            }
+        ],
+    )
+    return result.modified_count
+
+
+def _review_aggregates(reviews: list) -> dict:
+    """backfill_review_aggregates' pipeline, in Python: non-numeric ratings
+    count as reviews but not toward the sum or average, as with $sum/$avg."""
+    ratings = [
+        review["rating"]
+        for review in reviews
+        if isinstance(review, dict)
+        and isinstance(review.get("rating"), (int, float))
+        and not isinstance(review.get("rating"), bool)
+    ]
+    return {
+        "review_count": len(reviews),
+        "rating_sum": sum(ratings),
+        "rating_avg": sum(ratings) / len(ratings) if ratings else 0,
+    }
+
+
+def _review_doc(listing: dict, review: dict) -> dict:
+    """An embedded review as a `reviews` collection document.
+
+    The embedded id becomes `_id`, so a re-run can tell what it has already
+    copied; its ObjectId timestamp is when the review was posted (the stored
+    `date` has day precision only).
+    """
+    doc = {key: value for key, value in review.items() if key != "id"}
+    review_id = str(review.get("id") or "")
+    if ObjectId.is_valid(review_id):
+        doc["_id"] = ObjectId(review_id)
+        doc["created_at"] = doc["_id"].generation_time.replace(tzinfo=None)
+    else:
+        doc["_id"] = ObjectId()
+        try:
+            doc["created_at"] = datetime.strptime(str(review.get("date")), "%B %d, %Y")
+        except ValueError:
+            doc["created_at"] = listing.get("created_at") or datetime.utcnow()
+    doc["listing_id"] = listing["_id"]
+    return doc
+
+
+async def move_reviews_to_collection(db) -> int:
+    """Move embedded `reviews` arrays into the `reviews` collection.
+
+    A popular listing's array grew without bound, toward the 16MB document
+    limit, and every read of the listing paid for it. Per listing, the reviews
+    not yet copied are inserted and then the array is unset, so an interrupted
+    run resumes where it stopped.
+
+    The aggregates are materialised by backfill_review_aggregates; a listing
+    that still lacks them gets them from its array in the same update that
+    unsets it, so they can never be recomputed from an array that is gone.
+    """
+    moved = 0
+    cursor = db["listings"].find(
+        {"reviews": {"$exists": True}}, {"reviews": 1, "created_at": 1, "review_count": 1}
+    )
+    async for listing in cursor:
+        docs = [
+            _review_doc(listing, review)
+            for review in listing.get("reviews") or []
+            if isinstance(review, dict)
+        ]
+        if docs:
+            copied = {
+                doc["_id"]
+                async for doc in db["reviews"].find(
+                    {"_id": {"$in": [doc["_id"] for doc in docs]}}, {"_id": 1}
+                )
+            }
+            fresh = [doc for doc in docs if doc["_id"] not in copied]
+            if fresh:
+                await db["reviews"].insert_many(fresh)
+                moved += len(fresh)
+        update = {"$unset": {"reviews": ""}}
+        if "review_count" not in listing:
+            update["$set"] = _review_aggregates(listing.get("reviews") or [])
+        await db["listings"].update_one({"_id": listing["_id"]}, update)
+    return moved
+
+
+async def backfill_numeric_prices(db) -> int:
+    """Store the price each listing renders as a number in `price`.
+
+    Legacy listings carry only a "₹1,299" `suggested_price`, or a string
+    `price`. serialize_listing_doc copes when rendering, but `sort=price_*`
+    orders and keysets on the stored field: a null sorts first, and a cursor
+    resuming after one asks for `{"price": {"$gt": null}}`, which matches
+    nothing, so every priced listing after it was unreachable. Same parse as
+    serialize_listing_doc, so the order matches what the cards show.
+    """
+    changed = 0
+    batch: List[UpdateOne] = []
+    cursor = db["listings"].find(
+        # A 0 price also falls back to suggested_price when rendered.
+        {"$or": [{"price": {"$not": {"$type": "number"}}}, {"price": 0}]},
+        {"price": 1, "suggested_price": 1},
+    )
+    async for listing in cursor:
+        stored = listing.get("price")
+        price = parse_price(stored or listing.get("suggested_price"), 0.0)
+        if stored == price and not isinstance(stored, (str, bool)):
+            continue  # a 0 with nothing better to fall back to
+        batch.append(UpdateOne({"_id": listing["_id"]}, {"$set": {"price": price}}))
+        if len(batch) >= MIGRATION_BATCH_SIZE:
+            changed += await _flush(db["listings"], batch)
+            batch = []
+    if batch:
+        changed += await _flush(db["listings"], batch)
+    return changed
+
+
+async def _flush(collection, requests: list) -> int:
+    await collection.bulk_write(requests, ordered=False)
+    return len(requests)
+
+
+# (name, coroutine). Append only - names are the record of what has run.
+MIGRATIONS = [
+    ("2025_listing_filter_keys", backfill_listing_filter_keys),
+    ("2025_review_aggregates", backfill_review_aggregates),
+    ("2025_reviews_collection", move_reviews_to_collection),
+    ("2025_listing_cards", rebuild_listing_cards),
+    # Again: card image URLs now ask for the `card` rendition. The rebuild
+    # overwrites cards in place, so it is safe on a deployment that serves them.
+    ("2025_listing_cards_card_images", rebuild_listing_cards),
+    ("2025_listing_numeric_prices", backfill_numeric_prices),
+]
+
+
+async def _acquire_lock(db) -> bool:
+    now = datetime.utcnow()
+    # A lease left by a worker that died mid-run has lapsed: take it over.
+    await db["schema_migrations"].delete_one(
+        {"_id": MIGRATION_LOCK_ID, "expires_at": {"$lt": now}}
+    )
+    try:
+        await db["schema_migrations"].insert_one(
+            {
+                "_id": MIGRATION_LOCK_ID,
+                "holder": f"{socket.gethostname()}:{os.getpid()}",
+                "expires_at": now + timedelta(seconds=MIGRATION_LOCK_SECONDS),
+            }
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def run_migrations(db) -> None:
+    if not await _acquire_lock(db):
+        logger.info("Another worker is running the migrations; skipping")
+        return
+    applied = 0
+    try:
+        for name, migration in MIGRATIONS:
+            if await db["schema_migrations"].find_one({"_id": name}):
+                continue
+            try:
+                changed = await migration(db)
+            except Exception:
+                # Later migrations may build on this one: stop here.
+                logger.warning(
+                    "Migration %s failed; it and later migrations will run on next start",
+                    name,
+                    exc_info=True,
+                )
+                break
+            # Upsert: a manual run may have recorded it meanwhile.
+            await db["schema_migrations"].replace_one(
+                {"_id": name},
+                {"applied_at": datetime.utcnow(), "changed": changed},
+                upsert=True,
+            )
+            applied += 1
+            logger.info("Migration %s applied (%s documents)", name, changed)
+    finally:
+        await db["schema_migrations"].delete_one({"_id": MIGRATION_LOCK_ID})
+    logger.info("Migrations up to date (%s newly applied)", applied)
+
+
+if __name__ == "__main__":
+    from services.database import Database
+
+    async def _main():
+        await Database.connect_db()
+        try:
+            # Already done by connect_db() unless RUN_MIGRATIONS_ON_STARTUP is
+            # off; a second run finds everything recorded.
+            await run_migrations(Database.get_db())
+        finally:
+            await Database.close_db()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,271 @@
+"""Optional in-process BM25 search engine for GET /listings.
+
+`$text` ranks with Mongo's own scoring: no field boosts we control and no
+synonyms, so "Mithila" never finds a Madhubani painting. This keeps an
+inverted index of the catalogue in memory and answers search + filter + page
+itself; Mongo is only asked for the cards on the page, by `_id`.
+
+Layout, kept compact so a large catalogue fits in a worker:
+
+  * every listing gets a slot; per-slot columns (id, created_at, price,
+    category_key, state_key, weighted length) are flat arrays and lists;
+  * each term maps to a posting list of two parallel arrays: slot numbers
+    (`array('I')`) and field-boosted term frequencies (`array('f')`).
+
+An update tombstones the old slot and appends a new one; tombstones are
+skipped at query time and compacted away once they pass COMPACT_DEAD_RATIO.
+
+Enabled with SEARCH_ENGINE_ENABLED=true: built at startup from one cursor
+scan, then maintained like every other index (services/versioned_index.py).
+Off, `auto` search keeps using $text / regex.
+"""
+
+import heapq
+import logging
+import math
+import os
+import re
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.versioned_index import VersionedIndex
+from utils.serialization import filter_key, parse_price
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ENGINE_ENABLED = os.getenv("SEARCH_ENGINE_ENABLED", "false").lower() == "true"
+
+# Title over tags over description.
+FIELD_BOOSTS = {"title": 3.0, "tags": 2.0, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+COMPACT_DEAD_RATIO = 0.25
+
+# Craft names with more than one spelling or name in use. Every member of a
+# group is indexed and queried as its first entry.
+SYNONYM_GROUPS = [
+    ("madhubani", "mithila"),
+    ("bandhani", "bandhej"),
+    ("dhokra", "dokra"),
+    ("ikat", "ikkat"),
+    ("chikankari", "chikan"),
+]
+_CANONICAL = {term: group[0] for group in SYNONYM_GROUPS for term in group}
+
+_TOKEN = re.compile(r"\w+")
+_STOP_WORDS = frozenset("a an and by for from in of on or the to with".split())
+
+# (score, created_at timestamp, listing id): the relevance sort order, best
+# first, with the id as the tie-breaker the keyset cursor needs.
+RankKey = Tuple[float, float, str]
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        _CANONICAL.get(token, token)
+        for token in _TOKEN.findall(str(text or "").lower())
+        if token not in _STOP_WORDS
+    ]
+
+
+def weighted_terms(doc: dict) -> Tuple[Dict[str, float], float]:
+    """Field-boosted term frequencies and the boosted document length."""
+    tf: Dict[str, float] = {}
+    length = 0.0
+    for field, boost in FIELD_BOOSTS.items():
+        value = doc.get(field)
+        if isinstance(value, list):
+            value = " ".join(v for v in value if isinstance(v, str))
+        for token in tokenize(value):
+            tf[token] = tf.get(token, 0.0) + boost
+            length += boost
+    return tf, length
+
+
+def _timestamp(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else 0.0
+
+
+class ListingSearchEngine(VersionedIndex):
+    name = "search_engine"
+    LISTING_FIELDS = (
+        "title",
+        "tags",
+        "description",
+        "category",
+        "state",
+        "price",
+        "created_at",
+    )
+
+    # Everything rebuild() swaps in from a freshly loaded engine.
+    _STATE = (
+        "_ids",
+        "_created",
+        "_price",
+        "_category",
+        "_state",
+        "_length",
+        "_slot_of",
+        "_postings",
+        "_total_length",
+        "_dead",
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._ids: List[Optional[str]] = []  # None = tombstone
+        self._created = array("d")
+        self._price = array("d")
+        self._category: List[Optional[str]] = []
+        self._state: List[Optional[str]] = []
+        self._length = array("f")
+        self._slot_of: Dict[str, int] = {}
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._total_length = 0.0
+        self._dead = 0
+
+    def reset(self) -> None:
+        """Drop all state. Used by tests; never called at runtime."""
+        self.__init__()
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    # --- maintenance ------------------------------------------------------- #
+    def _add(self, listing_id: str, doc: dict) -> None:
+        slot = len(self._ids)
+        tf, length = weighted_terms(doc)
+        self._ids.append(listing_id)
+        self._created.append(_timestamp(doc.get("created_at")))
+        self._price.append(parse_price(doc.get("price"), math.nan))
+        # `category_key` / `state_key` rules, so filters agree with Mongo's.
+        self._category.append(filter_key(doc.get("category")))
+        self._state.append(filter_key(doc.get("state")))
+        self._length.append(length)
+        self._slot_of[listing_id] = slot
+        self._total_length += length
+        for term, weight in tf.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("f"))
+            postings[0].append(slot)
+            postings[1].append(weight)
+
+    def _remove(self, listing_id: str) -> None:
+        slot = self._slot_of.pop(listing_id, None)
+        if slot is None:
+            return
+        self._ids[slot] = None
+        self._total_length -= self._length[slot]
+        self._dead += 1
+
+    def update_listing(self, listing_id: str, doc: Optional[dict]) -> None:
+        self._remove(listing_id)
+        if doc is not None:
+            self._add(listing_id, doc)
+        if self._dead > COMPACT_DEAD_RATIO * max(len(self._ids), 1):
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop tombstoned slots and renumber the rest."""
+        remap = array("i", [-1]) * len(self._ids)
+        live = [slot for slot, listing_id in enumerate(self._ids) if listing_id is not None]
+        for new, old in enumerate(live):
+            remap[old] = new
+        self._ids = [self._ids[i] for i in live]
+        self._created = array("d", (self._created[i] for i in live))
+        self._price = array("d", (self._price[i] for i in live))
+        self._category = [self._category[i] for i in live]
+        self._state = [self._state[i] for i in live]
+        self._length = array("f", (self._length[i] for i in live))
+        self._slot_of = {listing_id: slot for slot, listing_id in enumerate(self._ids)}
+        postings = {}
+        for term, (slots, weights) in self._postings.items():
+            kept = [(remap[s], w) for s, w in zip(slots, weights) if remap[s] >= 0]
+            if kept:
+                postings[term] = (array("I", (s for s, _ in kept)), array("f", (w for _, w in kept)))
+        self._postings = postings
+        self._dead = 0
+
+    def load(self, docs: Iterable[dict]) -> None:
+        for doc in docs:
+            self._add(str(doc["_id"]), doc)
+
+    async def rebuild(self, db, version: int) -> None:
+        """One cursor scan into a fresh engine, then swap it in."""
+        fresh = ListingSearchEngine()
+        cursor = db.listings.find({}, {f: 1 for f in self.LISTING_FIELDS}).batch_size(2000)
+        async for doc in cursor:
+            fresh._add(str(doc["_id"]), doc)
+        for attr in self._STATE:
+            setattr(self, attr, getattr(fresh, attr))
+        self.version = version
+        logger.info(
+            "Search engine rebuilt: %d listings, %d terms (catalogue v%s)",
+            len(self),
+            len(self._postings),
+            version,
+        )
+
+    # --- queries ----------------------------------------------------------- #
+    def _scores(self, terms: Sequence[str]) -> Dict[int, float]:
+        live = len(self._slot_of)
+        if not live:
+            return {}
+        avg_length = self._total_length / live or 1.0
+        scores: Dict[int, float] = {}
+        ids, lengths = self._ids, self._length
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            slots, weights = postings
+            df = len(slots)  # may include tombstones until the next compact()
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            for slot, tf in zip(slots, weights):
+                if ids[slot] is None:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[slot] / avg_length)
+                scores[slot] = scores.get(slot, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        *,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        category_key: Optional[str] = None,
+        state_key: Optional[str] = None,
+        after: Optional[RankKey] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Tuple[List[RankKey], int]:
+        """Return (page, total): `page` is up to `limit + 1` rank keys, best
+        first (the extra one says whether there is a next page); `total`
+        counts every match of the query and filters."""
+        matches: List[RankKey] = []
+        for slot, score in self._scores(tokenize(query)).items():
+            if category_key is not None and self._category[slot] != category_key:
+                continue
+            if state_key is not None and self._state[slot] != state_key:
+                continue
+            price = self._price[slot]
+            if min_price is not None and not price >= min_price:
+                continue
+            if max_price is not None and not price <= max_price:
+                continue
+            matches.append((round(score, 6), self._created[slot], self._ids[slot]))
+        total = len(matches)
+        if after is not None:
+            after = tuple(after)
+            matches = [key for key in matches if key < after]
+            skip = 0
+        # Only the top of the ranking is ever served.
+        page = heapq.nlargest(skip + limit + 1, matches)
+        return page[skip:], total
+
+
+SEARCH_ENGINE = ListingSearchEngine()
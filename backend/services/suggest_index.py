@@ -0,0 +1,176 @@
+"""In-process prefix index behind GET /listings/suggest.
+
+The search box used to send every keystroke to the full regex search in GET
+/listings. Suggestions now come from a sorted array of normalized terms
+(listing titles, tags and categories, and artisan crafts) searched with
+bisect: no Mongo round trip per keystroke.
+
+Each listing and artisan is a "source" whose terms are tracked, so a write
+re-indexes just that source. Build, incremental updates and catch-up with
+other workers follow services/versioned_index.py.
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.versioned_index import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+# Worst case for a one-letter prefix: stop collecting after this many index
+# entries. Ranking only needs the most common ones.
+SUGGEST_SCAN_LIMIT = int(os.getenv("SUGGEST_SCAN_LIMIT", "2000"))
+# Answers per (prefix, limit), dropped on any change to the index. One- and
+# two-letter prefixes are both the most frequent and the most expensive.
+SUGGEST_MEMO_MAX_ENTRIES = 4096
+
+# (key, kind, target): `key` is what a prefix is matched against, `target`
+# the normalized suggestion it leads to. A title is indexed under every word
+# start so "vase" finds "Blue Pottery Vase".
+Entry = Tuple[str, str, str]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", str(text)).strip().lower()
+
+
+def listing_entries(doc: dict) -> Dict[Entry, str]:
+    """Index entries for one listing, mapped to their display text."""
+    entries: Dict[Entry, str] = {}
+    title = str(doc.get("title") or "").strip()
+    target = normalize(title)
+    if target:
+        words = target.split(" ")
+        for i in range(len(words)):
+            entries[(" ".join(words[i:]), "title", target)] = title
+    category = str(doc.get("category") or "").strip()
+    if category:
+        entries[(normalize(category), "category", normalize(category))] = category
+    for tag in doc.get("tags") or []:
+        if isinstance(tag, str) and tag.strip():
+            entries[(normalize(tag), "tag", normalize(tag))] = tag.strip()
+    return entries
+
+
+def artisan_entries(doc: dict) -> Dict[Entry, str]:
+    craft = str(doc.get("craft") or "").strip()
+    if not craft:
+        return {}
+    return {(normalize(craft), "craft", normalize(craft)): craft}
+
+
+class SuggestIndex(VersionedIndex):
+    name = "suggest"
+    LISTING_FIELDS = ("title", "tags", "category")
+    ARTISAN_FIELDS = ("craft",)
+
+    def __init__(self):
+        super().__init__()
+        self._entries: List[Entry] = []  # sorted
+        self._counts: Dict[Entry, int] = {}
+        self._display: Dict[Tuple[str, str], str] = {}
+        self._sources: Dict[str, Dict[Entry, str]] = {}
+        self._memo: Dict[Tuple[str, int], List[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --- maintenance ------------------------------------------------------- #
+    def set_source(self, source_id: str, entries: Dict[Entry, str]) -> None:
+        """Replace everything `source_id` contributed with `entries`."""
+        self._memo.clear()
+        for entry in self._sources.pop(source_id, {}):
+            remaining = self._counts[entry] - 1
+            if remaining:
+                self._counts[entry] = remaining
+                continue
+            del self._counts[entry]
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+        for entry, display in entries.items():
+            count = self._counts.get(entry, 0)
+            if not count:
+                bisect.insort(self._entries, entry)
+            self._counts[entry] = count + 1
+            self._display.setdefault(entry[1:], display)
+        if entries:
+            self._sources[source_id] = entries
+
+    def reset(self) -> None:
+        """Drop all state. Used by tests; never called at runtime."""
+        self.__init__()
+
+    # --- queries ----------------------------------------------------------- #
+    def suggest(self, prefix: str, limit: int = 8) -> List[dict]:
+        """Most common suggestions whose key starts with `prefix`."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+        counts: Dict[Tuple[str, str], int] = {}
+        i = bisect.bisect_left(self._entries, (prefix,))
+        end = min(len(self._entries), i + SUGGEST_SCAN_LIMIT)
+        while i < end and self._entries[i][0].startswith(prefix):
+            entry = self._entries[i]
+            target = entry[1:]
+            counts[target] = max(counts.get(target, 0), self._counts[entry])
+            i += 1
+        best = heapq.nsmallest(
+            limit, counts.items(), key=lambda kv: (-kv[1], len(kv[0][1]), kv[0][1])
+        )
+        result = [
+            {"text": self._display.get(target, target[1]), "kind": target[0], "count": count}
+            for target, count in best
+        ]
+        if len(self._memo) >= SUGGEST_MEMO_MAX_ENTRIES:
+            self._memo.clear()
+        self._memo[memo_key] = result
+        return result
+
+    # --- loading ----------------------------------------------------------- #
+    def _load(self, listings: Iterable[dict], artisans: Iterable[dict]) -> None:
+        """Bulk load into an empty index: count everything, sort once."""
+        sources = [(f"listing:{doc['_id']}", listing_entries(doc)) for doc in listings]
+        sources += [(f"artisan:{doc['firebase_uid']}", artisan_entries(doc)) for doc in artisans]
+        for source_id, entries in sources:
+            if not entries:
+                continue
+            self._sources[source_id] = entries
+            for entry, display in entries.items():
+                self._counts[entry] = self._counts.get(entry, 0) + 1
+                self._display.setdefault(entry[1:], display)
+        self._entries = sorted(self._counts)
+
+    async def rebuild(self, db, version: int) -> None:
+        """Load everything into a fresh index, then swap it in."""
+        fresh = SuggestIndex()
+        listings = db.listings.find({}, {f: 1 for f in self.LISTING_FIELDS})
+        artisans = db.users.find({"craft": {"$ne": None}}, {"firebase_uid": 1, "craft": 1})
+        fresh._load(
+            [doc async for doc in listings],
+            [doc async for doc in artisans if doc.get("firebase_uid")],
+        )
+        self._entries, self._counts = fresh._entries, fresh._counts
+        self._display, self._sources = fresh._display, fresh._sources
+        self._memo = {}
+        self.version = version
+        logger.info("Suggest index rebuilt: %d entries (catalogue v%s)", len(self), version)
+
+    def update_listing(self, listing_id: str, doc: Optional[dict]) -> None:
+        self.set_source(f"listing:{listing_id}", listing_entries(doc) if doc else {})
+
+    def update_artisan(self, firebase_uid: str, doc: Optional[dict]) -> None:
+        self.set_source(f"artisan:{firebase_uid}", artisan_entries(doc) if doc else {})
+
+
+SUGGESTIONS = SuggestIndex()
@@ -0,0 +1,142 @@
+"""Base class for the in-process indexes over the listings catalogue.
+
+Each index is built from a full scan, then kept up to date by the write path:
+services.listing_cache.invalidate_listings() fetches the written listing once
+(LISTING_FIELDS of every built index) and hands it to update_listing(). Writes
+on other workers cannot reach this process, so each index also records the
+catalogue version it reflects; when a reader sees a newer one, the index
+catches up in the background while the current copy keeps answering.
+
+Catching up is incremental. The catalogue counter (services/listing_cache.py)
+keeps the last CHANGE_LOG_SIZE changes - which listing or artisan each write
+touched - in the same atomic update that bumps the version, so a worker
+re-fetches just those documents. A full rebuild is the fallback, for a worker
+further behind than the log reaches or a change that names no document; at
+1M listings that is a full collection scan, so keep CHANGE_LOG_SIZE above
+the number of writes a worker can miss between two reads.
+
+Same process-local trade-offs as utils/ttl_cache.py: one copy per worker,
+event-loop only.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_COUNTER_ID = "listings_catalogue"
+CHANGE_LOG_SIZE = int(os.getenv("CATALOGUE_CHANGE_LOG_SIZE", "1000"))
+# Read past the version the caller saw, in case it has moved on since.
+_CHANGE_LOG_SLACK = 64
+
+
+async def catalogue_changes(db, since: int, version: int) -> Optional[Tuple[List[dict], int]]:
+    """The changes after version `since`, oldest first, with the version they
+    reach (at least `version`), or None when the log no longer covers them.
+
+    Each change is {"listing_id": id}, {"artisan_uid": uid} or {} for "any
+    listing may have changed".
+    """
+    wanted = version - since
+    if wanted <= 0 or wanted > CHANGE_LOG_SIZE:
+        return None
+    doc = await db.counters.find_one(
+        {"_id": CATALOGUE_COUNTER_ID},
+        {"version": 1, "changes": {"$slice": -min(wanted + _CHANGE_LOG_SLACK, CHANGE_LOG_SIZE)}},
+    )
+    if not doc:
+        return None
+    reached = doc.get("version", 0)
+    changes = doc.get("changes") or []
+    needed = reached - since
+    if needed < wanted or needed > len(changes):
+        return None
+    return changes[len(changes) - needed :], reached
+
+
+class VersionedIndex:
+    name = "index"
+    # Listing fields update_listing() needs; user fields update_artisan() needs.
+    LISTING_FIELDS: Tuple[str, ...] = ()
+    ARTISAN_FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._rebuilding: Optional[asyncio.Task] = None
+
+    @property
+    def built(self) -> bool:
+        return self.version is not None
+
+    async def rebuild(self, db, version: int) -> None:
+        raise NotImplementedError
+
+    def update_listing(self, listing_id: str, doc: Optional[dict]) -> None:
+        """Re-index one listing; `doc` is None when it was deleted."""
+
+    def update_artisan(self, firebase_uid: str, doc: Optional[dict]) -> None:
+        """Re-index one artisan profile; most indexes ignore these."""
+
+    async def ensure_current(self, db, version: int) -> None:
+        """Build on first use; after that, catch up in the background when
+        another worker has moved the catalogue on."""
+        if not self.built:
+            await self.rebuild(db, version)
+        elif self.version != version and (
+            self._rebuilding is None or self._rebuilding.done()
+        ):
+            self._rebuilding = asyncio.create_task(self._catch_up(db, version))
+
+    async def _catch_up(self, db, version: int) -> None:
+        try:
+            since = self.version
+            found = None
+            if since is not None and since < version:
+                found = await catalogue_changes(db, since, version)
+            # {} in the log: any listing may have changed.
+            if found is None or not all(found[0]):
+                await self.rebuild(db, version)
+                return
+            changes, reached = found
+            await self._apply_changes(db, changes)
+            # Local writes meanwhile left the version alone (see caught_up());
+            # the next read catches up on them too.
+            if self.version == since:
+                self.version = reached
+        except Exception:
+            logger.warning("Catch-up of the %s index failed", self.name, exc_info=True)
+
+    async def _apply_changes(self, db, changes: List[dict]) -> None:
+        """Re-fetch every document the changes touched, once, in its current state."""
+        listing_ids = list(dict.fromkeys(c["listing_id"] for c in changes if "listing_id" in c))
+        artisan_uids = list(dict.fromkeys(c["artisan_uid"] for c in changes if "artisan_uid" in c))
+        if listing_ids:
+            oids = [ObjectId(i) for i in listing_ids if ObjectId.is_valid(i)]
+            cursor = db.listings.find({"_id": {"$in": oids}}, {f: 1 for f in self.LISTING_FIELDS})
+            docs: Dict[str, dict] = {str(doc["_id"]): doc async for doc in cursor}
+            for listing_id in listing_ids:
+                self.update_listing(listing_id, docs.get(listing_id))
+        if artisan_uids and self.ARTISAN_FIELDS:
+            cursor = db.users.find(
+                {"firebase_uid": {"$in": artisan_uids}},
+                {"firebase_uid": 1, **{f: 1 for f in self.ARTISAN_FIELDS}},
+            )
+            users = {doc["firebase_uid"]: doc async for doc in cursor}
+            for uid in artisan_uids:
+                self.update_artisan(uid, users.get(uid))
+        logger.info(
+            "%s index caught up: %d listings, %d artisans re-indexed",
+            self.name,
+            len(listing_ids),
+            len(artisan_uids),
+        )
+
+    def caught_up(self, previous: Optional[int], current: int) -> None:
+        """A local write moved the catalogue from `previous` to `current` and
+        has been applied incrementally; no rebuild is needed for it."""
+        if self.built and self.version == previous:
+            self.version = current
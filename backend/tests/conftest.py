@@ -8,6 +8,7 @@ check runs for real - that is the thing under test.
 
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 import pytest
@@ -25,6 +26,8 @@ os.environ["ALLOWED_ORIGINS"] = "http://localhost:3000"
 os.environ["STRIPE_SECRET_KEY"] = "sk_test_dummy"
 os.environ["STRIPE_WEBHOOK_SECRET"] = "whsec_test_secret"
 os.environ["API_BASE_URL"] = "http://localhost:8000"
+# Resized images go to disk (services/image_cache.py); never the real cache.
+os.environ["IMAGE_CACHE_DIR"] = tempfile.mkdtemp(prefix="kalamitra-test-images-")
 # A deliberately fake Gemini key: routes/ai.py only checks that one is present,
 # and every test monkeypatches the SDK call, so no request ever leaves the box.
 # The value doubles as the canary in the key-leakage tests.
@@ -41,10 +44,25 @@ from fastapi.testclient import TestClient  # noqa: E402
 import main  # noqa: E402
 from routes.auth import get_current_user  # noqa: E402
 from services.database import Database  # noqa: E402
+from services.search_engine import SEARCH_ENGINE  # noqa: E402
+from services.suggest_index import SUGGESTIONS  # noqa: E402
+from utils import ttl_cache  # noqa: E402
 
 from .fake_mongo import FakeDB  # noqa: E402
 
 
+@pytest.fixture(autouse=True)
+def clean_caches():
+    """Cache state is module-level and would otherwise leak between tests."""
+    ttl_cache.reset_all()
+    SUGGESTIONS.reset()
+    SEARCH_ENGINE.reset()
+    yield
+    ttl_cache.reset_all()
+    SUGGESTIONS.reset()
+    SEARCH_ENGINE.reset()
+
+
 @pytest.fixture
 def db() -> FakeDB:
     return FakeDB()
@@ -1,15 +1,22 @@
 """A deliberately tiny in-memory stand-in for Motor.
 
-Supports only the query features the payment paths use: equality, $in, $ne,
-$or, dotted paths, plus $set updates. It is not a Mongo emulator - if a test
-needs something it does not implement, implement it explicitly rather than
-guessing.
+Supports only the query features the payment and listing paths use: equality,
+$in, $ne, $not, $type "number", range operators, $regex, $text, $or/$and,
+dotted paths, plus $set/$inc/$unset/$push updates and ReplaceOne/UpdateOne
+bulk writes. Find projections only apply exclusions and array `$slice`;
+included fields are not filtered. It is not a Mongo emulator - if a test needs
+something it does not implement, implement it explicitly rather than guessing.
+FakeGridFSBucket does the same for the GridFS calls.
 """
 
 import copy
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, List, Optional
 
 from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 
 def _get_path(doc: dict, path: str):
@@ -43,6 +50,32 @@ def _match_condition(value: Any, condition: Any) -> bool:
             elif op == "$lte":
                 if value is None or value > operand:
                     return False
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                values = value if isinstance(value, list) else [value]
+                if not any(
+                    isinstance(v, str) and re.search(operand, v, flags) for v in values
+                ):
+                    return False
+            elif op == "$options":
+                continue
+            elif op == "$not":
+                if _match_condition(value, operand):
+                    return False
+            elif op == "$type":
+                if operand != "number":
+                    raise NotImplementedError(f"FakeMongo: $type {operand} not implemented")
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return False
+            elif op == "$exists":
+                if (value is not None) != bool(operand):
+                    return False
+            elif op == "$lt":
+                if value is None or operand is None or value >= operand:
+                    return False
+            elif op == "$gt":
+                if value is None or operand is None or value <= operand:
+                    return False
             else:
                 raise NotImplementedError(f"FakeMongo: operator {op} not implemented")
         return True
@@ -51,9 +84,28 @@ def _match_condition(value: Any, condition: Any) -> bool:
     return value == condition
 
 
+# Fields covered by the `listings_text` index. The fake's $text is a plain
+# whole-word match with a term-frequency score: no stemming, no stop words.
+TEXT_FIELDS = ("title", "description", "tags")
+
+
+def _words(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [w for item in value for w in _words(item)]
+    return re.findall(r"\w+", str(value or "").lower())
+
+
+def text_score(doc: dict, search: str) -> float:
+    terms = set(_words(search))
+    return float(sum(1 for f in TEXT_FIELDS for w in _words(doc.get(f)) if w in terms))
+
+
 def matches(doc: dict, query: dict) -> bool:
     for key, condition in query.items():
-        if key == "$or":
+        if key == "$text":
+            if not text_score(doc, condition["$search"]):
+                return False
+        elif key == "$or":
             if not any(matches(doc, sub) for sub in condition):
                 return False
         elif key == "$and":
@@ -69,7 +121,13 @@ class _Cursor:
     def __init__(self, docs: List[dict]):
         self._docs = docs
 
-    def sort(self, *args, **kwargs):
+    def sort(self, key_or_list, direction=None):
+        keys = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction or 1)]
+        # Stable sorts, last key first; None sorts low, as in Mongo.
+        for field, order in reversed(keys):
+            self._docs.sort(
+                key=lambda d: (d.get(field) is not None, d.get(field)), reverse=order < 0
+            )
         return self
 
     def skip(self, n):
@@ -80,6 +138,12 @@ class _Cursor:
         self._docs = self._docs[:n]
         return self
 
+    def batch_size(self, n):
+        return self
+
+    async def close(self):
+        pass
+
     async def to_list(self, length=None):
         return self._docs if length is None else self._docs[:length]
 
@@ -91,6 +155,58 @@ class _Cursor:
         return gen()
 
 
+def _apply_update(doc: dict, update) -> None:
+    if isinstance(update, list):
+        # Pipeline-style update: only $set stages, evaluated against the doc.
+        for stage in update:
+            (name, spec), = stage.items()
+            if name != "$set":
+                raise NotImplementedError(f"FakeMongo: update stage {name} not implemented")
+            values = {k: _eval_expr(doc, v) for k, v in spec.items()}
+            doc.update(values)
+        return
+    doc.update(update.get("$set", {}))
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+    for key, value in update.get("$push", {}).items():
+        items = doc.setdefault(key, [])
+        if isinstance(value, dict) and "$each" in value:
+            items.extend(value["$each"])
+            n = value.get("$slice")
+            if n is not None:
+                doc[key] = items[n:] if n < 0 else items[:n]
+        else:
+            items.append(value)
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+
+
+def _find_projection(doc: dict, projection) -> dict:
+    """Apply the `{"field": 0}`, `{"field": {"$slice": n | [skip, n]}}` and
+    computed (`{"field": {"$cond": ...}}`) parts of a find projection."""
+    source = copy.deepcopy(doc)
+    for key, value in (projection or {}).items():
+        if value in (0, False):
+            doc.pop(key, None)
+            continue
+        if not isinstance(value, dict):
+            continue
+        if "$slice" not in value:
+            doc[key] = _eval_expr(source, value)
+            continue
+        items = doc.get(key)
+        if not isinstance(items, list):
+            continue
+        arg = value["$slice"]
+        if isinstance(arg, list):
+            skip, n = arg
+            start = skip if skip >= 0 else max(len(items) + skip, 0)
+            doc[key] = items[start : start + n]
+        else:
+            doc[key] = items[arg:] if arg < 0 else items[:arg]
+    return doc
+
+
 class _Result:
     def __init__(self, matched_count=0, modified_count=0, deleted_count=0, inserted_id=None):
         self.matched_count = matched_count
@@ -103,15 +219,22 @@ class FakeCollection:
     def __init__(self, name: str):
         self.name = name
         self.docs: List[Dict[str, Any]] = []
+        self.index_names = {"_id_"}
 
     # --- reads ------------------------------------------------------------ #
     def find(self, query=None, projection=None):
-        return _Cursor([copy.deepcopy(d) for d in self.docs if matches(d, query or {})])
+        return _Cursor(
+            [
+                _find_projection(copy.deepcopy(d), projection)
+                for d in self.docs
+                if matches(d, query or {})
+            ]
+        )
 
     async def find_one(self, query=None, projection=None):
         for doc in self.docs:
             if matches(doc, query or {}):
-                return copy.deepcopy(doc)
+                return _find_projection(copy.deepcopy(doc), projection)
         return None
 
     async def count_documents(self, query=None):
@@ -121,6 +244,8 @@ class FakeCollection:
     async def insert_one(self, doc):
         stored = copy.deepcopy(doc)
         stored.setdefault("_id", ObjectId())
+        if any(d["_id"] == stored["_id"] for d in self.docs):
+            raise DuplicateKeyError(f"E11000 duplicate key: {stored['_id']!r}")
         self.docs.append(stored)
         return _Result(inserted_id=stored["_id"])
 
@@ -134,9 +259,7 @@ class FakeCollection:
     async def update_one(self, query, update):
         for doc in self.docs:
             if matches(doc, query):
-                doc.update(update.get("$set", {}))
-                for key, value in update.get("$push", {}).items():
-                    doc.setdefault(key, []).append(value)
+                _apply_update(doc, update)
                 return _Result(matched_count=1, modified_count=1)
         return _Result()
 
@@ -144,12 +267,43 @@ class FakeCollection:
         n = 0
         for doc in self.docs:
             if matches(doc, query):
-                doc.update(update.get("$set", {}))
+                _apply_update(doc, update)
                 n += 1
         return _Result(matched_count=n, modified_count=n)
 
-    async def find_one_and_update(self, query, update, **kwargs):
-        await self.update_one(query, update)
+    async def replace_one(self, query, replacement, upsert=False):
+        for i, doc in enumerate(self.docs):
+            if matches(doc, query):
+                stored = copy.deepcopy(replacement)
+                stored["_id"] = doc["_id"]
+                self.docs[i] = stored
+                return _Result(matched_count=1, modified_count=1)
+        if upsert:
+            stored = dict(query, **replacement)
+            await self.insert_one(stored)
+        return _Result()
+
+    async def bulk_write(self, requests, ordered=True):
+        # pymongo.ReplaceOne / UpdateOne only, read through their private
+        # attributes (UpdateOne without upsert).
+        for request in requests:
+            if isinstance(request, ReplaceOne):
+                await self.replace_one(request._filter, request._doc, upsert=request._upsert)
+            elif isinstance(request, UpdateOne) and not request._upsert:
+                doc = next((d for d in self.docs if matches(d, request._filter)), None)
+                if doc is not None:
+                    _apply_update(doc, request._doc)
+            else:
+                raise NotImplementedError(type(request).__name__)
+        return _Result(matched_count=len(requests), modified_count=len(requests))
+
+    async def find_one_and_update(self, query, update, upsert=False, **kwargs):
+        result = await self.update_one(query, update)
+        if not result.matched_count and upsert:
+            # Equality-only queries: the query itself seeds the new document.
+            stored = dict(query)
+            _apply_update(stored, update)
+            await self.insert_one(stored)
         return await self.find_one(query)
 
     async def delete_one(self, query):
@@ -159,37 +313,143 @@ class FakeCollection:
                 return _Result(deleted_count=1)
         return _Result()
 
-    async def create_index(self, *args, **kwargs):
-        return "ok"
+    async def delete_many(self, query):
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        deleted, self.docs[:] = len(self.docs) - len(kept), kept
+        return _Result(deleted_count=deleted)
+
+    async def create_index(self, keys, **kwargs):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = kwargs.get("name") or "_".join(f"{key}_{direction}" for key, direction in keys)
+        self.index_names.add(name)
+        return name
+
+    async def drop_index(self, name):
+        if name not in self.index_names:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        self.index_names.discard(name)
+
+    async def estimated_document_count(self):
+        return len(self.docs)
 
     # --- aggregation (only the stages GET /listings uses) ----------------- #
     def aggregate(self, pipeline):
-        docs = [copy.deepcopy(d) for d in self.docs]
-        for stage in pipeline:
-            (name, spec), = stage.items()
-            if name == "$match":
-                docs = [d for d in docs if matches(d, spec)]
-            elif name == "$sort":
-                for key, direction in reversed(list(spec.items())):
-                    docs.sort(key=lambda d: d.get(key) or 0, reverse=direction < 0)
-            elif name == "$skip":
-                docs = docs[spec:]
-            elif name == "$limit":
-                docs = docs[:spec]
-            elif name == "$project":
-                docs = [_project(d, spec) for d in docs]
-            else:
-                raise NotImplementedError(f"FakeMongo: stage {name} not implemented")
-        return _Cursor(docs)
+        return _Cursor(_run_pipeline([copy.deepcopy(d) for d in self.docs], pipeline))
+
+
+_TEXT_SCORE_KEY = "__text_score__"
+
+
+def _run_pipeline(docs: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if matches(d, spec)]
+            if "$text" in spec:
+                for d in docs:
+                    d[_TEXT_SCORE_KEY] = text_score(d, spec["$text"]["$search"])
+        elif name == "$addFields":
+            docs = [dict(d, **{k: _eval_expr(d, v) for k, v in spec.items()}) for d in docs]
+        elif name == "$sort":
+            for key, direction in reversed(list(spec.items())):
+                # Mongo sorts null/missing before any value.
+                docs.sort(
+                    key=lambda d: (d.get(key) is not None, d.get(key) or 0),
+                    reverse=direction < 0,
+                )
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [_project(d, spec) for d in docs]
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$bucket":
+            docs = _bucket(docs, spec)
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$facet":
+            docs = [
+                {
+                    key: _run_pipeline([copy.deepcopy(d) for d in docs], sub)
+                    for key, sub in spec.items()
+                }
+            ]
+        else:
+            raise NotImplementedError(f"FakeMongo: stage {name} not implemented")
+    return docs
+
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    """$group with the $sum / $first accumulators."""
+    groups: Dict[Any, dict] = {}
+    for doc in docs:
+        key = _eval_expr(doc, spec["_id"])
+        out = groups.get(key)
+        if out is None:
+            out = groups[key] = {"_id": key}
+            for field, acc in spec.items():
+                if field != "_id":
+                    (op, arg), = acc.items()
+                    out[field] = 0 if op == "$sum" else _eval_expr(doc, arg)
+        for field, acc in spec.items():
+            if field == "_id":
+                continue
+            (op, arg), = acc.items()
+            if op == "$sum":
+                out[field] += _eval_expr(doc, arg) or 0
+            elif op != "$first":
+                raise NotImplementedError(f"FakeMongo: accumulator {op} not implemented")
+    return list(groups.values())
+
+
+def _bucket(docs: List[dict], spec: dict) -> List[dict]:
+    """$bucket with the default `count` output only."""
+    edges = spec["boundaries"]
+    counts: Dict[Any, int] = {}
+    for doc in docs:
+        value = _eval_expr(doc, spec["groupBy"])
+        key = spec.get("default")
+        if isinstance(value, (int, float)):
+            for low, high in zip(edges, edges[1:]):
+                if low <= value < high:
+                    key = low
+                    break
+        counts[key] = counts.get(key, 0) + 1
+    order = {edge: i for i, edge in enumerate(edges)}
+    return [
+        {"_id": key, "count": n}
+        for key, n in sorted(counts.items(), key=lambda kv: order.get(kv[0], len(edges)))
+    ]
 
 
 def _eval_expr(doc: dict, expr):
     """Evaluate the handful of aggregation expressions the project stage uses."""
     if isinstance(expr, str) and expr.startswith("$"):
         return _get_path(doc, expr[1:])
+    if isinstance(expr, list):
+        return [_eval_expr(doc, item) for item in expr]
     if not isinstance(expr, dict):
         return expr
     (op, args), = expr.items()
+    if op == "$meta" and args == "textScore":
+        return doc.get(_TEXT_SCORE_KEY)
+    if op == "$cond":
+        condition, then, otherwise = args
+        return _eval_expr(doc, then) if _eval_expr(doc, condition) else _eval_expr(doc, otherwise)
+    if op == "$eq":
+        return _eval_expr(doc, args[0]) == _eval_expr(doc, args[1])
+    if op == "$type":
+        value = _eval_expr(doc, args)
+        return "missing" if value is None else "string" if isinstance(value, str) else "other"
+    if op == "$toLower":
+        value = _eval_expr(doc, args)
+        return "" if value is None else str(value).lower()
+    if op == "$trim":
+        value = _eval_expr(doc, args["input"])
+        return None if value is None else str(value).strip()
     if op == "$ifNull":
         value = _eval_expr(doc, args[0])
         return _eval_expr(doc, args[1]) if value is None else value
@@ -200,6 +460,22 @@ def _eval_expr(doc: dict, expr):
     if op == "$size":
         value = _eval_expr(doc, args)
         return len(value or [])
+    if op == "$literal":
+        return copy.deepcopy(args)
+    if op == "$concatArrays":
+        return [item for arg in args for item in (_eval_expr(doc, arg) or [])]
+    if op == "$add":
+        return sum(_eval_expr(doc, arg) or 0 for arg in args)
+    if op == "$divide":
+        return _eval_expr(doc, args[0]) / _eval_expr(doc, args[1])
+    if op == "$gt":
+        left, right = _eval_expr(doc, args[0]), _eval_expr(doc, args[1])
+        return left is not None and (right is None or left > right)
+    if op == "$sum":
+        value = _eval_expr(doc, args)
+        if isinstance(value, list):
+            return sum(v for v in value if isinstance(v, (int, float)))
+        return value if isinstance(value, (int, float)) else 0
     if op == "$avg":
         values = [v for v in (_eval_expr(doc, args) or []) if isinstance(v, (int, float))]
         return sum(values) / len(values) if values else None
@@ -237,3 +513,74 @@ class FakeDB:
         if name.startswith("_"):
             raise AttributeError(name)
         return self.get_collection(name)
+
+
+class _UploadStream:
+    def __init__(self, bucket: "FakeGridFSBucket", filename: str, metadata: Optional[dict]):
+        self._bucket = bucket
+        self._id = ObjectId()
+        self.filename = filename
+        self.metadata = metadata
+        self._parts: List[bytes] = []
+
+    async def write(self, data: bytes) -> None:
+        self._parts.append(data)
+
+    async def close(self) -> None:
+        self._bucket.files[self._id] = (b"".join(self._parts), self.metadata)
+
+
+class _DownloadStream:
+    def __init__(self, bucket: "FakeGridFSBucket", data: bytes, metadata: Optional[dict]):
+        self._bucket = bucket
+        self._data = data
+        self._position = 0
+        self.chunk_size = bucket.chunk_size
+        self.metadata = metadata
+        self.length = len(data)
+
+    def _take(self, size: int) -> bytes:
+        data = self._data[self._position : self._position + size]
+        if data:
+            first = self._position // self.chunk_size
+            last = (self._position + len(data) - 1) // self.chunk_size
+            self._bucket.chunks_read.extend(range(first, last + 1))
+        self._position += len(data)
+        return data
+
+    def seek(self, position: int) -> None:
+        self._position = position
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._take(self.length if size < 0 else size)
+
+    async def readchunk(self) -> bytes:
+        # The rest of the current chunk, as GridOut.readchunk does.
+        return self._take(self.chunk_size - self._position % self.chunk_size)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeGridFSBucket:
+    """The AsyncIOMotorGridFSBucket calls routes/listing.py makes, in memory."""
+
+    def __init__(self, chunk_size: int = 255 * 1024):
+        self.files: Dict[ObjectId, tuple] = {}  # id -> (bytes, metadata)
+        self.chunk_size = chunk_size
+        # Index of every chunk read, in order, across all files.
+        self.chunks_read: List[int] = []
+
+    def open_upload_stream(self, filename: str, metadata: Optional[dict] = None) -> _UploadStream:
+        return _UploadStream(self, filename, metadata)
+
+    async def open_download_stream(self, file_id) -> _DownloadStream:
+        if file_id not in self.files:
+            raise NoFile(f"no file {file_id}")
+        data, metadata = self.files[file_id]
+        return _DownloadStream(self, data, metadata)
+
+    async def delete(self, file_id) -> None:
+        if self.files.pop(file_id, None) is None:
+            raise NoFile(f"no file {file_id}")
+
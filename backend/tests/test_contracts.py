@@ -18,6 +18,8 @@ ARTISAN = {
 
 
 def _seed(db, price=4500.0, reviews=None):
+    reviews = reviews if reviews is not None else [{"rating": 4}, {"rating": 5}]
+    rating_sum = sum(r["rating"] for r in reviews)
     listing = {
         "_id": ObjectId(),
         "title": "Blue Pottery Vase",
@@ -30,7 +32,11 @@ def _seed(db, price=4500.0, reviews=None):
         "status": "active",
         "artist_id": ARTISAN["firebase_uid"],
         "image_ids": [str(ObjectId())],
-        "reviews": reviews if reviews is not None else [{"rating": 4}, {"rating": 5}],
+        "reviews": reviews,
+        # Stored aggregates, as submit_listing_review / the backfill keep them.
+        "review_count": len(reviews),
+        "rating_sum": rating_sum,
+        "rating_avg": rating_sum / len(reviews) if reviews else 0.0,
     }
     db.get_collection("listings").docs.append(listing)
     db.get_collection("users").docs.append(dict(ARTISAN))
@@ -0,0 +1,352 @@
+"""Listing images: renditions stored at upload and served by GET
+/api/listings/{id}/images/{image_id}. GridFS is the in-memory fake."""
+
+import asyncio
+import io
+import os
+
+import pytest
+from bson import ObjectId
+from PIL import Image
+
+from routes import listing as listing_routes
+
+from .fake_mongo import FakeGridFSBucket
+from .test_listings import OWNER, _seed_many
+
+
+def _jpeg(width, height) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (180, 90, 40)).save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def _edge(data: bytes) -> int:
+    with Image.open(io.BytesIO(data)) as img:
+        return max(img.size)
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeGridFSBucket()
+    monkeypatch.setattr(listing_routes, "_bucket", lambda db: bucket)
+    return bucket
+
+
+@pytest.fixture
+def uploaded(app_client, db, bucket, monkeypatch):
+    """One listing created through POST /create-listing with a 2400px photo."""
+
+    async def _gemini(transcription, images):
+        return {"title": "Terracotta horse", "suggestedPrice": "₹1,200"}
+
+    monkeypatch.setattr(listing_routes, "generate_listing_with_gemini", _gemini)
+    app_client.login_as(OWNER)
+    response = app_client.post(
+        "/api/create-listing",
+        data={"transcription": "a horse"},
+        files={"images": ("horse.jpg", _jpeg(2400, 1200), "image/jpeg")},
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return body["listing_id"], body["image_ids"][0]
+
+
+# --- Renditions ------------------------------------------------------------- #
+def test_one_decode_makes_every_smaller_rendition():
+    renditions = listing_routes._renditions_for_storage(_jpeg(2400, 1200))
+    assert {size: _edge(data) for size, (data, _) in renditions.items()} == {
+        "full": 1600,
+        "card": 640,
+        "thumb": 320,
+    }
+    assert {content_type for _, content_type in renditions.values()} == {"image/webp"}
+
+
+def test_small_and_undecodable_uploads():
+    small = listing_routes._renditions_for_storage(_jpeg(500, 400))
+    assert set(small) == {"full", "thumb"}  # `card` would be the same pixels
+
+    garbage = b"not an image"
+    assert listing_routes._renditions_for_storage(garbage) == {"full": (garbage, None)}
+
+
+def test_upload_stores_linked_renditions(uploaded, db, bucket):
+    listing_id, image_id = uploaded
+    listing = db.get_collection("listings").docs[0]
+    linked = listing["image_renditions"][image_id]
+    assert set(linked) == {"thumb", "card"}
+    assert len(bucket.files) == 3
+    _, metadata = bucket.files[ObjectId(image_id)]
+    assert metadata["renditions"] == linked
+    assert bucket.files[linked["thumb"]][1]["rendition"] == "thumb"
+
+
+# --- Serving ---------------------------------------------------------------- #
+def test_size_picks_the_rendition(app_client, uploaded):
+    listing_id, image_id = uploaded
+    url = f"/api/listings/{listing_id}/images/{image_id}"
+    full = app_client.get(url)
+    thumb = app_client.get(f"{url}?size=thumb")
+    assert full.status_code == thumb.status_code == 200
+    assert (_edge(full.content), _edge(thumb.content)) == (1600, 320)
+    assert full.headers["ETag"] != thumb.headers["ETag"]
+    assert app_client.get(f"{url}?size=huge").status_code == 422
+
+
+def test_images_without_renditions_are_served_full_size(app_client, db, bucket):
+    upload = bucket.open_upload_stream("legacy.jpg", metadata={"content_type": "image/jpeg"})
+    data = _jpeg(800, 600)
+    asyncio.run(upload.write(data))
+    asyncio.run(upload.close())
+    (doc,) = _seed_many(db, 1, image_ids=[upload._id])
+
+    response = app_client.get(f"/api/listings/{doc['_id']}/images/{upload._id}?size=card")
+    assert response.status_code == 200
+    assert response.content == data
+
+
+def test_cards_and_carts_point_at_small_renditions(app_client, uploaded):
+    listing_id, image_id = uploaded
+    card = app_client.get("/api/listings").json()["listings"][0]
+    assert card["images"][0].endswith(f"/images/{image_id}?size=card")
+    assert "image_renditions" not in card
+
+    cart = app_client.get(f"/api/listings/batch?ids={listing_id}&view=cart").json()
+    assert cart["listings"][0]["images"][0].endswith("?size=thumb")
+    detail = app_client.get(f"/api/listings/{listing_id}").json()["listing"]
+    assert detail["images"][0].endswith(f"/images/{image_id}")
+
+
+def test_delete_removes_every_rendition(app_client, uploaded, bucket):
+    listing_id, _ = uploaded
+    assert app_client.delete(f"/api/listings/{listing_id}").status_code == 200
+    assert bucket.files == {}
+
+
+# --- On-demand resizing ----------------------------------------------------- #
+def test_resized_once_then_served_from_disk(app_client, uploaded, bucket, monkeypatch):
+    listing_id, image_id = uploaded
+    url = f"/api/listings/{listing_id}/images/{image_id}?w=480&q=75"
+    first = app_client.get(url)
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "image/webp"
+    with Image.open(io.BytesIO(first.content)) as img:
+        assert img.width == 480
+
+    async def _no_gridfs(file_id):
+        raise AssertionError("a cached resize must not touch GridFS")
+
+    monkeypatch.setattr(bucket, "open_download_stream", _no_gridfs)
+    second = app_client.get(url)
+    assert second.content == first.content
+    assert second.headers["Content-Length"] == str(len(first.content))
+    assert second.headers["ETag"] == first.headers["ETag"]
+    stats = app_client.get("/health/caches").json()["resized_images"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+
+def test_resize_removed_before_it_is_opened_is_a_miss(app_client, uploaded, monkeypatch):
+    from services.image_cache import RESIZED_IMAGES
+
+    listing_id, image_id = uploaded
+    url = f"/api/listings/{listing_id}/images/{image_id}?w=480"
+    first = app_client.get(url)
+    real_get = RESIZED_IMAGES.get
+
+    async def _get_then_removed(key):
+        path = await real_get(key)
+        if path is not None:
+            os.unlink(path)  # between the lookup and the open
+        return path
+
+    monkeypatch.setattr(RESIZED_IMAGES, "get", _get_then_removed)
+    second = app_client.get(url)
+    assert (second.status_code, second.content) == (200, first.content)
+    stats = RESIZED_IMAGES.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (0, 2, 1)
+
+
+def test_resize_widths_and_qualities_are_allowlisted(app_client, uploaded):
+    listing_id, image_id = uploaded
+    url = f"/api/listings/{listing_id}/images/{image_id}"
+    assert app_client.get(f"{url}?w=481").status_code == 400
+    assert app_client.get(f"{url}?w=480&q=100").status_code == 400
+
+
+def test_disk_cache_holds_its_byte_budget(tmp_path):
+    from services.image_cache import DiskLRUCache
+
+    cache = DiskLRUCache("test_disk_lru", str(tmp_path), max_bytes=10)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await cache.get(key)
+            cache.write(key, b"1234")
+            await cache.add(key, 4)
+            await cache.get("a")  # keep `a` hot
+        assert await cache.get("a") and await cache.get("c")
+        assert await cache.get("b") is None
+
+    asyncio.run(scenario())
+    assert sorted(p.name for p in (tmp_path / str(os.getpid())).iterdir()) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_each_worker_has_its_own_directory(tmp_path):
+    from services.image_cache import DiskLRUCache
+
+    dead, alive = tmp_path / "999999999", tmp_path / str(os.getppid())
+    for directory in (dead, alive):
+        directory.mkdir()
+        (directory / "l1_i1_w320_q82.webp").write_bytes(b"x" * 4)
+    (tmp_path / "from-the-shared-layout.webp").write_bytes(b"x")
+    (tmp_path / str(os.getpid())).mkdir()
+    (tmp_path / str(os.getpid()) / "l2_i2_w320_q82.webp").write_bytes(b"12345678")
+
+    cache = DiskLRUCache("test_disk_workers", str(tmp_path), max_bytes=100)
+    assert asyncio.run(cache.get("l2_i2_w320_q82.webp"))  # adopted from a previous run
+    assert cache.stats()["bytes"] == 8  # the other workers' files do not count
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([alive.name, str(os.getpid())])
+
+    asyncio.run(cache.discard_prefix("l1_"))  # a deleted listing goes everywhere
+    assert list(alive.iterdir()) == []
+
+
+def test_deleting_the_listing_discards_its_resizes(app_client, uploaded):
+    from services.image_cache import RESIZED_IMAGES
+
+    listing_id, image_id = uploaded
+    app_client.get(f"/api/listings/{listing_id}/images/{image_id}?w=320")
+    assert RESIZED_IMAGES.stats()["size"] == 1
+    app_client.delete(f"/api/listings/{listing_id}")
+    assert RESIZED_IMAGES.stats()["size"] == 0
+
+
+# --- Range requests --------------------------------------------------------- #
+@pytest.fixture
+def stored(db, bucket):
+    """A 10 KB file in 1 KB chunks."""
+    bucket.chunk_size = 1024
+    data = bytes(range(256)) * 40
+    upload = bucket.open_upload_stream("raw.bin", metadata={"content_type": "image/jpeg"})
+    asyncio.run(upload.write(data))
+    asyncio.run(upload.close())
+    (doc,) = _seed_many(db, 1, image_ids=[upload._id])
+    return f"/api/listings/{doc['_id']}/images/{upload._id}", data
+
+
+def test_range_is_a_206_from_only_the_chunks_it_needs(app_client, bucket, stored):
+    url, data = stored
+    response = app_client.get(url, headers={"Range": "bytes=2000-4999"})
+    assert response.status_code == 206
+    assert response.content == data[2000:5000]
+    assert response.headers["Content-Range"] == f"bytes 2000-4999/{len(data)}"
+    assert response.headers["Content-Length"] == "3000"
+    assert response.headers["Cache-Control"] == listing_routes.IMAGE_CACHE_CONTROL
+    assert bucket.chunks_read == [1, 2, 3, 4]
+
+
+def test_open_and_suffix_ranges(app_client, stored):
+    url, data = stored
+    tail = app_client.get(url, headers={"Range": "bytes=-100"})
+    assert (tail.status_code, tail.content) == (206, data[-100:])
+    rest = app_client.get(url, headers={"Range": "bytes=10000-"})
+    assert rest.headers["Content-Range"] == f"bytes 10000-10239/{len(data)}"
+
+
+def test_if_range_and_unusable_ranges_get_the_whole_file(app_client, stored):
+    url, data = stored
+    etag = app_client.get(url).headers["ETag"]
+
+    resumed = app_client.get(url, headers={"Range": "bytes=100-", "If-Range": etag})
+    assert resumed.status_code == 206
+    stale = app_client.get(url, headers={"Range": "bytes=100-", "If-Range": '"other"'})
+    assert (stale.status_code, stale.content) == (200, data)
+    several = app_client.get(url, headers={"Range": "bytes=0-1,5-6"})
+    assert several.status_code == 200 and several.headers["Accept-Ranges"] == "bytes"
+
+    past_end = app_client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert past_end.status_code == 416
+    assert past_end.headers["Content-Range"] == f"bytes */{len(data)}"
+
+
+# --- Hot image cache -------------------------------------------------------- #
+def test_small_images_are_answered_from_memory(app_client, db, uploaded, bucket, monkeypatch):
+    listing_id, image_id = uploaded
+    url = f"/api/listings/{listing_id}/images/{image_id}?size=thumb"
+    first = app_client.get(url)
+    assert first.status_code == 200
+
+    def _no_mongo(*args, **kwargs):
+        raise AssertionError("a hot image must not touch Mongo or GridFS")
+
+    monkeypatch.setattr(db.get_collection("listings"), "find_one", _no_mongo)
+    monkeypatch.setattr(bucket, "open_download_stream", _no_mongo)
+    second = app_client.get(url)
+    assert second.content == first.content
+    assert second.headers["content-type"] == first.headers["content-type"] == "image/webp"
+    assert second.headers["ETag"] == first.headers["ETag"]
+
+    stats = app_client.get("/health/caches").json()["hot_images"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["bytes"] == len(first.content) and stats["hit_ratio"] == 0.5
+
+
+def test_hot_hits_honour_range(app_client, stored):
+    url, data = stored
+    app_client.get(url)
+    partial = app_client.get(url, headers={"Range": "bytes=10-19"})
+    assert (partial.status_code, partial.content) == (206, data[10:20])
+    assert partial.headers["Content-Range"] == f"bytes 10-19/{len(data)}"
+    past_end = app_client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert past_end.status_code == 416
+
+
+def test_large_images_keep_streaming(app_client, stored, monkeypatch):
+    from services.image_cache import HOT_IMAGES
+
+    url, data = stored
+    monkeypatch.setattr(HOT_IMAGES, "max_item_bytes", len(data) - 1)
+    assert app_client.get(url).content == data
+    assert app_client.get(url).content == data
+    assert HOT_IMAGES.stats()["size"] == 0
+
+
+def test_memory_cache_holds_its_byte_budget():
+    from services.image_cache import MemoryLRUCache
+
+    cache = MemoryLRUCache("test_memory_lru", max_bytes=10, max_item_bytes=6, ttl_seconds=60)
+    assert cache.set("too-big", b"1234567", 7) is False
+    for key in ("a", "b", "c"):
+        cache.set(key, key.encode() * 4, 4)
+        cache.get("a")  # keep `a` hot
+    assert cache.get("a") and cache.get("c")
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 8 and cache.stats()["evictions"] == 1
+
+
+def test_deleting_the_listing_discards_its_hot_images(app_client, uploaded):
+    from services.image_cache import HOT_IMAGES
+
+    listing_id, image_id = uploaded
+    app_client.get(f"/api/listings/{listing_id}/images/{image_id}?size=card")
+    assert HOT_IMAGES.stats()["size"] == 1
+    app_client.delete(f"/api/listings/{listing_id}")
+    assert HOT_IMAGES.stats()["size"] == 0
+
+
+def test_hot_images_expire(monkeypatch):
+    from services import image_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(image_cache.time, "monotonic", lambda: now[0])
+    cache = image_cache.MemoryLRUCache(
+        "test_memory_ttl", max_bytes=10, max_item_bytes=6, ttl_seconds=5
+    )
+    cache.set("a", b"1234", 4)
+    now[0] += 4.9
+    assert cache.get("a") == b"1234"
+    now[0] += 0.2  # e.g. the listing was deleted on another worker
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,70 @@
+"""Index advisor: plan parsing and flagging, against canned explain output;
+and the declared index set it checks."""
+
+import asyncio
+
+from services.database import Database
+from services.index_advisor import QUERY_SHAPES, index_report, plan_summary
+
+from .fake_mongo import FakeDB
+
+
+def _explain(plan: dict) -> dict:
+    return {"queryPlanner": {"winningPlan": plan}}
+
+
+IXSCAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "created_at_-1__id_-1"}}
+BLOCKING_SORT = {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+
+
+class _ExplainDB:
+    """Answers `explain` with a canned plan per collection."""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.commands = []
+
+    async def command(self, spec):
+        self.commands.append(spec)
+        return _explain(self.plans[spec["explain"]["find"]])
+
+
+def test_plan_summary_walks_nested_and_sbe_plans():
+    merged = {
+        "stage": "SORT_MERGE",
+        "inputStages": [
+            {"stage": "IXSCAN", "indexName": "buyer_id_1_order_date_-1"},
+            {"stage": "IXSCAN", "indexName": "buyerEmail_1_order_date_-1"},
+        ],
+    }
+    assert plan_summary(_explain({"queryPlan": merged})) == {
+        "stages": ["SORT_MERGE", "IXSCAN", "IXSCAN"],
+        "indexes": ["buyer_id_1_order_date_-1", "buyerEmail_1_order_date_-1"],
+    }
+
+
+def test_report_flags_collscans_and_blocking_sorts():
+    db = _ExplainDB({"listings": IXSCAN, "orders": BLOCKING_SORT, "artist_orders": IXSCAN})
+    report = asyncio.run(index_report(db))
+
+    assert len(db.commands) == len(QUERY_SHAPES)
+    assert all(c["verbosity"] == "queryPlanner" for c in db.commands)
+    by_shape = {row["shape"]: row for row in report}
+    assert by_shape["listings.newest"]["problems"] == []
+    assert by_shape["listings.newest"]["indexes"] == ["created_at_-1__id_-1"]
+    assert by_shape["buyer.orders"]["problems"] == ["in-memory sort", "collection scan"]
+
+
+def test_superseded_single_field_indexes_are_dropped(monkeypatch):
+    db = FakeDB()
+    # A database from before the compound indexes.
+    db.listings.index_names |= {"created_at_-1", "artist_id_1", "category_1", "price_1"}
+    db.orders.index_names |= {"buyerEmail_1", "product_id_1"}
+    monkeypatch.setattr(Database, "_db", db)
+
+    asyncio.run(Database._create_indexes())
+    assert "artist_id_1_created_at_-1" in db.listings.index_names
+    for collection, name in Database._SUPERSEDED_INDEXES:
+        assert name not in db[collection].index_names
+    # Nothing left to drop on the next boot; that is not an error.
+    asyncio.run(Database._create_indexes())
@@ -0,0 +1,196 @@
+"""The `listing_cards` read model: built by its migration, kept up to date by
+the write hooks, and served by GET /api/listings when enabled."""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from routes import listing as listing_routes
+from services.database import Database
+from services.listing_cache import LISTING_PAGES
+from services.listing_cards import rebuild_listing_cards
+
+from .test_listings import BASE_TIME, BUYER, OWNER, _seed_many, _walk
+
+
+@pytest.fixture
+def cards_enabled(monkeypatch):
+    monkeypatch.setattr(listing_routes, "LISTING_CARDS_ENABLED", True)
+
+
+def _seed_catalogue(db):
+    db.get_collection("users").docs.append(
+        {"firebase_uid": "artisan-1", "display_name": "Rekha Devi", "email": "a@example.com"}
+    )
+    docs = _seed_many(
+        db,
+        4,
+        updated_at=BASE_TIME,
+        state="Bihar",
+        state_key="bihar",
+        image_ids=[str(ObjectId())],
+        review_count=0,
+        rating_sum=0,
+        rating_avg=0.0,
+    )
+    docs += _seed_many(
+        db,
+        3,
+        updated_at=BASE_TIME,
+        category="Pottery",
+        category_key="pottery",
+        description="Coil built. " * 40,
+        review_count=2,
+        rating_sum=9,
+        rating_avg=4.5,
+    )
+    asyncio.run(rebuild_listing_cards(db))
+    return docs
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "",
+        "?view=card",
+        "?view=cart&sort=price_desc",
+        "?category=pottery&sort=rating",
+        "?state=bihar&limit=2",
+        "?min_price=101&count=none",
+    ],
+)
+def test_cards_render_the_same_bytes(app_client, db, monkeypatch, query):
+    _seed_catalogue(db)
+    expected = app_client.get(f"/api/listings{query}")
+    assert "X-Read-Model" not in expected.headers
+
+    LISTING_PAGES.clear()
+    monkeypatch.setattr(listing_routes, "LISTING_CARDS_ENABLED", True)
+    served = app_client.get(f"/api/listings{query}")
+    assert served.headers["X-Read-Model"] == "listing_cards"
+    assert served.content == expected.content
+    assert expected.json()["listings"]
+
+
+def test_cursors_walk_the_cards_in_the_same_order(app_client, db, monkeypatch):
+    _seed_catalogue(db)
+    url = "/api/listings?sort=popular&limit=2"
+    expected = _walk(app_client, url)
+    monkeypatch.setattr(listing_routes, "LISTING_CARDS_ENABLED", True)
+    assert _walk(app_client, url) == expected
+
+
+def test_browse_reads_neither_listings_nor_users(app_client, db, monkeypatch, cards_enabled):
+    _seed_catalogue(db)
+
+    def _no_db(*args, **kwargs):
+        raise AssertionError("a card page is one query on listing_cards")
+
+    monkeypatch.setattr(db.get_collection("listings"), "aggregate", _no_db)
+    monkeypatch.setattr(db.get_collection("users"), "find", _no_db)
+    body = app_client.get("/api/listings?category=pottery").json()
+    assert body["total"] == 3
+    assert {card["artisan"]["name"] for card in body["listings"]} == {"Rekha Devi"}
+
+
+def test_searches_stay_on_listings(app_client, db, cards_enabled):
+    _seed_catalogue(db)
+    response = app_client.get("/api/listings?search=coil")
+    assert "X-Read-Model" not in response.headers
+    assert response.json()["total"] == 3
+
+
+def test_cards_follow_listing_and_review_writes(app_client, db, cards_enabled):
+    docs = _seed_catalogue(db)
+    app_client.login_as(OWNER)
+    status = app_client.patch(f"/api/listings/{docs[0]['_id']}/status?status=inactive")
+    assert status.status_code == 200
+    assert app_client.delete(f"/api/listings/{docs[-1]['_id']}").status_code == 200
+    app_client.login_as(BUYER)
+    response = app_client.post(
+        f"/api/listings/{docs[1]['_id']}/reviews", json={"rating": 4, "comment": "Lovely"}
+    )
+    assert response.status_code == 200, response.text
+
+    cards = {card["_id"]: card for card in app_client.get("/api/listings").json()["listings"]}
+    assert cards[str(docs[0]["_id"])]["status"] == "inactive"
+    assert str(docs[-1]["_id"]) not in cards
+    reviewed = cards[str(docs[1]["_id"])]
+    assert (reviewed["review_count"], reviewed["rating"]) == (1, 4.0)
+    assert len(db.get_collection("listing_cards").docs) == 6
+
+
+def test_profile_update_rewrites_the_artisan_block(app_client, db, monkeypatch, cards_enabled):
+    # routes/users.py calls Database.get_db() directly rather than via Depends.
+    monkeypatch.setattr(Database, "_db", db)
+    _seed_catalogue(db)
+    app_client.login_as(OWNER)
+    assert app_client.patch("/api/me", json={"display_name": "New Name"}).status_code == 200
+
+    assert {c["artisan"]["name"] for c in db.get_collection("listing_cards").docs} == {"New Name"}
+    card = app_client.get("/api/listings").json()["listings"][0]
+    assert card["artisan"]["name"] == "New Name"
+
+
+def test_rebuild_never_empties_the_collection(db, monkeypatch):
+    docs = _seed_catalogue(db)
+    cards = db.get_collection("listing_cards")
+    orphan = {"_id": ObjectId(), "title": "Deleted meanwhile"}
+    cards.docs.append(orphan)
+    db.get_collection("listings").docs.remove(docs[0])
+
+    real_delete_many = cards.delete_many
+
+    async def _targeted_delete(query):
+        assert query, "a rebuild must not empty listing_cards"
+        return await real_delete_many(query)
+
+    monkeypatch.setattr(cards, "delete_many", _targeted_delete)
+    assert asyncio.run(rebuild_listing_cards(db)) == len(docs) - 1
+    assert {c["_id"] for c in cards.docs} == {d["_id"] for d in docs[1:]}
+
+
+def test_card_image_migration_rewrites_live_cards(app_client, db, cards_enabled):
+    from services.migrations import run_migrations
+
+    docs = _seed_catalogue(db)
+    cards = db.get_collection("listing_cards")
+    for card in cards.docs:
+        card["images"] = [url.replace("?size=card", "") for url in card["images"]]
+    db.get_collection("schema_migrations").docs.extend(
+        {"_id": name}
+        for name in (
+            "2025_listing_filter_keys",
+            "2025_review_aggregates",
+            "2025_reviews_collection",
+            "2025_listing_cards",
+        )
+    )
+
+    asyncio.run(run_migrations(db))
+    assert len(cards.docs) == len(docs)
+    image_urls = [url for card in cards.docs for url in card["images"] if "/images/" in url]
+    assert image_urls and all(url.endswith("?size=card") for url in image_urls)
+
+
+def test_a_stale_artisan_cache_never_reaches_the_cards(app_client, db, cards_enabled):
+    from services.listing_cards import refresh_artisan_cards
+    from utils.serialization import ARTISAN_CACHE
+
+    docs = _seed_catalogue(db)
+    users = db.get_collection("users")
+    # Worker B saved the new name and rewrote the cards...
+    users.docs[0]["display_name"] = "New Name"
+    asyncio.run(refresh_artisan_cards(db, "artisan-1"))
+    # ...while worker A's cache still holds the old profile.
+    ARTISAN_CACHE.set("artisan-1", {**users.docs[0], "display_name": "Rekha Devi"})
+
+    # A then handles a write to one of the artisan's listings.
+    app_client.login_as(BUYER)
+    response = app_client.post(
+        f"/api/listings/{docs[0]['_id']}/reviews", json={"rating": 5, "comment": "Lovely"}
+    )
+    assert response.status_code == 200, response.text
+    card = next(c for c in db.get_collection("listing_cards").docs if c["_id"] == docs[0]["_id"])
+    assert card["artisan"]["name"] == "New Name"
@@ -0,0 +1,1072 @@
+"""Listing read-path tests: pagination, filtering and the caches in front of
+GET /api/listings.
+
+Seeded straight into the in-memory fake; no Mongo, no network.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from services.database import Database
+from services.migrations import run_migrations
+
+from .fake_mongo import FakeDB
+
+BASE_TIME = datetime(2025, 1, 1, 12, 0, 0)
+
+
+def _seed_many(db, n, **overrides):
+    """`n` listings, newest last inserted; two share every created_at so the
+    `_id` tie-breaker is exercised."""
+    docs = []
+    for i in range(n):
+        doc = {
+            "_id": ObjectId(),
+            "title": f"Listing {i}",
+            "description": "Hand made.",
+            "price": 100.0 + i,
+            "suggested_price": f"₹{100 + i}",
+            "category": "Crafts",
+            "category_key": "crafts",
+            "status": "active",
+            "artist_id": "artisan-1",
+            "image_ids": [],
+            "created_at": BASE_TIME + timedelta(minutes=i // 2),
+        }
+        doc.update(overrides)
+        db.get_collection("listings").docs.append(doc)
+        docs.append(doc)
+    return docs
+
+
+def _walk(app_client, url):
+    """Follow next_cursor to the end; return every listing id in order."""
+    seen = []
+    body = app_client.get(url).json()
+    seen.extend(item["_id"] for item in body["listings"])
+    while body["next_cursor"]:
+        sep = "&" if "?" in url else "?"
+        response = app_client.get(f"{url}{sep}cursor={body['next_cursor']}")
+        assert response.status_code == 200, response.text
+        body = response.json()
+        seen.extend(item["_id"] for item in body["listings"])
+    return seen
+
+
+# --- Keyset pagination ------------------------------------------------------ #
+def test_cursor_walks_every_listing_once_in_order(app_client, db):
+    docs = _seed_many(db, 7)
+    expected = [
+        str(d["_id"])
+        for d in sorted(docs, key=lambda d: (d["created_at"], d["_id"]), reverse=True)
+    ]
+
+    assert _walk(app_client, "/api/listings?limit=3") == expected
+
+
+def test_cursor_and_skip_agree(app_client, db):
+    _seed_many(db, 6)
+    by_skip = [
+        item["_id"]
+        for skip in (0, 2, 4)
+        for item in app_client.get(f"/api/listings?limit=2&skip={skip}").json()["listings"]
+    ]
+    assert _walk(app_client, "/api/listings?limit=2") == by_skip
+
+
+def test_last_page_has_no_cursor(app_client, db):
+    _seed_many(db, 2)
+    body = app_client.get("/api/listings?limit=2").json()
+    assert len(body["listings"]) == 2
+    assert body["next_cursor"] is None
+
+
+def test_garbage_cursor_is_a_400(app_client, db):
+    _seed_many(db, 2)
+    assert app_client.get("/api/listings?cursor=not-a-cursor").status_code == 400
+
+
+# --- Single round trip + count modes ---------------------------------------- #
+def test_exact_count_comes_from_the_same_aggregate(app_client, db, monkeypatch):
+    """The page and the total used to be two scans of the same filter."""
+    _seed_many(db, 5)
+    listings = db.get_collection("listings")
+
+    async def _no_count(*args, **kwargs):
+        raise AssertionError("count_documents must not run")
+
+    monkeypatch.setattr(listings, "count_documents", _no_count)
+    body = app_client.get("/api/listings?limit=2").json()
+    assert body["total"] == 5
+    assert body["has_more"] is True
+    assert len(body["listings"]) == 2
+
+
+def test_exact_total_counts_the_whole_filter_when_paging_by_cursor(app_client, db):
+    _seed_many(db, 5)
+    first = app_client.get("/api/listings?limit=2").json()
+    second = app_client.get(f"/api/listings?limit=2&cursor={first['next_cursor']}").json()
+    assert second["total"] == 5
+
+
+def test_count_none_returns_has_more_instead_of_total(app_client, db):
+    _seed_many(db, 3)
+    body = app_client.get("/api/listings?limit=2&count=none").json()
+    assert body["total"] is None
+    assert body["has_more"] is True
+    body = app_client.get("/api/listings?limit=3&count=none").json()
+    assert body["has_more"] is False
+
+
+def test_count_estimate_only_without_a_filter(app_client, db):
+    _seed_many(db, 3)
+    assert app_client.get("/api/listings?count=estimate").json()["total"] == 3
+    assert app_client.get("/api/listings?count=estimate&max_price=101").json()["total"] is None
+    assert app_client.get("/api/listings?count=bogus").status_code == 422
+
+
+# --- Text search ------------------------------------------------------------ #
+def _seed_titles(db, *titles):
+    for i, title in enumerate(titles):
+        db.get_collection("listings").docs.append(
+            {
+                "_id": ObjectId(),
+                "title": title,
+                "description": "",
+                "tags": [],
+                "price": 100.0,
+                "suggested_price": "₹100",
+                "category": "Crafts",
+                "artist_id": "artisan-1",
+                "created_at": BASE_TIME + timedelta(minutes=i),
+            }
+        )
+
+
+def test_text_search_ranks_by_relevance(app_client, db):
+    _seed_titles(db, "Blue vase", "Blue pottery blue vase", "Wooden toy")
+    response = app_client.get("/api/listings?search=blue vase")
+    assert response.headers["X-Search-Mode"] == "text"
+    titles = [item["title"] for item in response.json()["listings"]]
+    assert titles == ["Blue pottery blue vase", "Blue vase"]
+
+
+def test_text_search_cursor_follows_relevance_order(app_client, db):
+    _seed_titles(db, "Blue vase", "Blue pottery blue vase", "Blue bowl", "Wooden toy")
+    body = app_client.get("/api/listings?search=blue vase&limit=1").json()
+    titles = [body["listings"][0]["title"]]
+    while body["next_cursor"]:
+        body = app_client.get(
+            f"/api/listings?search=blue vase&limit=1&cursor={body['next_cursor']}"
+        ).json()
+        titles.extend(item["title"] for item in body["listings"])
+    assert titles == ["Blue pottery blue vase", "Blue vase", "Blue bowl"]
+
+
+def test_partial_word_falls_back_to_regex(app_client, db):
+    _seed_titles(db, "Blue pottery vase", "Wooden toy")
+    response = app_client.get("/api/listings?search=pott")
+    assert response.headers["X-Search-Mode"] == "regex"
+    assert [item["title"] for item in response.json()["listings"]] == ["Blue pottery vase"]
+
+
+def test_short_query_goes_straight_to_regex(app_client, db):
+    _seed_titles(db, "Blue pottery vase")
+    response = app_client.get("/api/listings?search=bl")
+    assert response.headers["X-Search-Mode"] == "regex"
+    assert len(response.json()["listings"]) == 1
+
+
+def test_search_mode_flag_forces_a_path(app_client, db):
+    _seed_titles(db, "Blue pottery vase")
+    forced_text = app_client.get("/api/listings?search=pott&search_mode=text")
+    assert forced_text.headers["X-Search-Mode"] == "text"
+    assert forced_text.json()["listings"] == []
+    forced_regex = app_client.get("/api/listings?search=pottery&search_mode=regex")
+    assert forced_regex.headers["X-Search-Mode"] == "regex"
+    assert len(forced_regex.json()["listings"]) == 1
+
+
+# --- Response cache --------------------------------------------------------- #
+OWNER = {"firebase_uid": "artisan-1", "email": "a@example.com", "role": "artisan"}
+
+
+def test_repeat_queries_are_served_from_the_cache(app_client, db, monkeypatch):
+    _seed_many(db, 3)
+    first = app_client.get("/api/listings?category=Crafts")
+    assert first.headers["X-Cache"] == "MISS"
+
+    def _no_db(*args, **kwargs):
+        raise AssertionError("a cache hit must not touch Mongo")
+
+    monkeypatch.setattr(db.get_collection("listings"), "aggregate", _no_db)
+    # Same query modulo case/whitespace -> same entry, same bytes.
+    second = app_client.get("/api/listings?category=crafts%20")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+
+
+def test_listing_writes_invalidate_the_cache(app_client, db):
+    docs = _seed_many(db, 2)
+    app_client.get("/api/listings")
+    assert app_client.get("/api/listings").headers["X-Cache"] == "HIT"
+
+    app_client.login_as(OWNER)
+    response = app_client.patch(f"/api/listings/{docs[0]['_id']}/status?status=inactive")
+    assert response.status_code == 200, response.text
+
+    after = app_client.get("/api/listings")
+    assert after.headers["X-Cache"] == "MISS"
+    statuses = {item["_id"]: item["status"] for item in after.json()["listings"]}
+    assert statuses[str(docs[0]["_id"])] == "inactive"
+
+
+def test_cursor_pages_bypass_the_cache(app_client, db):
+    _seed_many(db, 3)
+    cursor = app_client.get("/api/listings?limit=1").json()["next_cursor"]
+    assert app_client.get(f"/api/listings?limit=1&cursor={cursor}").headers["X-Cache"] == "BYPASS"
+
+
+def test_cache_counters_are_reported(app_client, db):
+    _seed_many(db, 1)
+    app_client.get("/api/listings")
+    app_client.get("/api/listings")
+    stats = app_client.get("/health/caches").json()["listing_pages"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+# --- Indexable category/state keys ------------------------------------------ #
+def test_backfill_writes_canonical_filter_keys_once(db):
+    listings = db.get_collection("listings")
+    listings.docs.append({"_id": ObjectId(), "category": " Pottery ", "state": "Rajasthan"})
+    listings.docs.append({"_id": ObjectId(), "category": "Textiles"})
+
+    asyncio.run(run_migrations(db))
+
+    assert [(d["category_key"], d["state_key"]) for d in listings.docs] == [
+        ("pottery", "rajasthan"),
+        ("textiles", None),
+    ]
+    applied = {d["_id"] for d in db.get_collection("schema_migrations").docs}
+    assert "2025_listing_filter_keys" in applied
+    # Recorded, so a second boot does not re-run it.
+    listings.docs[0]["category_key"] = "changed"
+    asyncio.run(run_migrations(db))
+    assert listings.docs[0]["category_key"] == "changed"
+
+
+def test_category_and_state_filters_match_the_keys(app_client, db):
+    _seed_many(db, 2)
+    _seed_many(db, 1, category="Textiles", category_key="textiles", state="Bihar", state_key="bihar")
+
+    assert len(app_client.get("/api/listings?category=CRAFTS").json()["listings"]) == 2
+    by_state = app_client.get("/api/listings?state=bihar").json()["listings"]
+    assert [item["category"] for item in by_state] == ["Textiles"]
+
+
+# --- Materialized review aggregates ----------------------------------------- #
+BUYER = {"firebase_uid": "buyer-1", "email": "b@example.com", "display_name": "B"}
+
+
+def test_review_submission_maintains_stored_aggregates(app_client, db):
+    (doc,) = _seed_many(db, 1, review_count=0, rating_sum=0, rating_avg=0.0)
+    app_client.login_as(BUYER)
+    for rating, comment in ((5, "$5 well spent"), (2, "meh")):
+        response = app_client.post(
+            f"/api/listings/{doc['_id']}/reviews", json={"rating": rating, "comment": comment}
+        )
+        assert response.status_code == 200, response.text
+
+    stored = db.get_collection("listings").docs[0]
+    assert (stored["review_count"], stored["rating_sum"], stored["rating_avg"]) == (2, 7, 3.5)
+    assert "reviews" not in stored
+    reviews = db.get_collection("reviews").docs
+    assert [r["comment"] for r in reviews] == ["$5 well spent", "meh"]
+    assert {r["listing_id"] for r in reviews} == {doc["_id"]}
+
+    card = app_client.get("/api/listings").json()["listings"][0]
+    assert (card["review_count"], card["rating"]) == (2, 3.5)
+
+
+def test_backfill_materializes_review_aggregates(db):
+    listings = db.get_collection("listings")
+    listings.docs.append({"_id": ObjectId(), "reviews": [{"rating": 3}, {"rating": 4}]})
+    listings.docs.append({"_id": ObjectId()})
+
+    asyncio.run(run_migrations(db))
+
+    assert [(d["review_count"], d["rating_sum"], d["rating_avg"]) for d in listings.docs] == [
+        (2, 7, 3.5),
+        (0, 0, 0),
+    ]
+
+
+# --- Artisan block cache ---------------------------------------------------- #
+def _count_user_queries(db, monkeypatch):
+    users = db.get_collection("users")
+    calls = []
+    original = users.find
+
+    def _find(query=None, projection=None):
+        calls.append(query)
+        return original(query, projection)
+
+    monkeypatch.setattr(users, "find", _find)
+    return calls
+
+
+def test_artisans_are_fetched_once_across_pages(app_client, db, monkeypatch):
+    _seed_many(db, 2)
+    db.get_collection("users").docs.append(
+        {"firebase_uid": "artisan-1", "display_name": "Rekha Devi", "email": "a@example.com"}
+    )
+    calls = _count_user_queries(db, monkeypatch)
+
+    app_client.get("/api/listings?limit=1")
+    app_client.get("/api/listings?limit=2")
+    assert len(calls) == 1
+
+    card = app_client.get("/api/listings?limit=2").json()["listings"][0]
+    assert card["artisan"]["name"] == "Rekha Devi"
+    stats = app_client.get("/health/caches").json()["artisans"]
+    assert stats["misses"] == 1 and stats["hits"] >= 1
+
+
+def test_profile_update_invalidates_the_artisan_block(app_client, db, monkeypatch):
+    # routes/users.py calls Database.get_db() directly rather than via Depends.
+    monkeypatch.setattr(Database, "_db", db)
+    _seed_many(db, 1)
+    db.get_collection("users").docs.append(
+        {"firebase_uid": "artisan-1", "display_name": "Old Name", "email": "a@example.com"}
+    )
+    assert app_client.get("/api/listings").json()["listings"][0]["artisan"]["name"] == "Old Name"
+
+    app_client.login_as(OWNER)
+    assert app_client.patch("/api/me", json={"display_name": "New Name"}).status_code == 200
+
+    assert app_client.get("/api/listings").json()["listings"][0]["artisan"]["name"] == "New Name"
+
+
+def test_profile_edits_that_render_nowhere_keep_the_catalogue(app_client, db, monkeypatch):
+    from services.listing_cache import LISTING_PAGES
+
+    monkeypatch.setattr(Database, "_db", db)
+    _seed_many(db, 1)
+    db.get_collection("users").docs.extend(
+        [
+            {"firebase_uid": "artisan-1", "display_name": "Rekha", "email": "a@example.com"},
+            dict(BUYER),
+        ]
+    )
+    etag = app_client.get("/api/listings").headers["ETag"]
+
+    app_client.login_as(BUYER)
+    assert app_client.patch("/api/me", json={"display_name": "Buyer B"}).status_code == 200
+    app_client.login_as(OWNER)
+    assert app_client.patch("/api/me", json={"phone_number": "+91 98"}).status_code == 200
+
+    assert len(LISTING_PAGES) == 1
+    assert db.get_collection("counters").docs == []
+    assert app_client.get("/api/listings", headers={"If-None-Match": etag}).status_code == 304
+
+
+# --- Fast rendering --------------------------------------------------------- #
+def test_fast_render_matches_the_response_model_bytes():
+    from fastapi.responses import JSONResponse
+
+    from models.listingModel import Listing, ListingsResponse
+    from utils.rendering import render_listings_response, validate_listings
+    from utils.serialization import serialize_listing_doc
+
+    docs = [
+        serialize_listing_doc(doc)
+        for doc in _seed_many(
+            FakeDB(),
+            3,
+            title="Hand-thrown kulhad ₹",
+            updated_at=BASE_TIME.replace(microsecond=1234),
+            ai_metadata={"model": "gemini", "generated_at": BASE_TIME},
+            custom_field={"nested": [ObjectId()]},
+        )
+    ]
+    listings, skipped = validate_listings(docs)
+    assert skipped == 0
+
+    legacy = JSONResponse(
+        ListingsResponse(
+            listings=[Listing(**doc) for doc in docs],
+            total=3,
+            has_more=True,
+            limit=3,
+            skip=0,
+            next_cursor="abc",
+        ).model_dump(mode="json", by_alias=True)
+    ).body
+    fast = render_listings_response(
+        listings, total=3, has_more=True, limit=3, skip=0, next_cursor="abc"
+    )
+    assert fast == legacy
+
+
+def test_invalid_listing_is_dropped_from_the_page(app_client, db):
+    docs = _seed_many(db, 3)
+    docs[1]["title"] = None
+
+    body = app_client.get("/api/listings").json()
+    ids = [item["_id"] for item in body["listings"]]
+    assert str(docs[1]["_id"]) not in ids
+    assert len(ids) == 2
+    assert body["total"] == 2
+
+
+def test_artist_listings_use_the_fast_renderer(app_client, db, monkeypatch):
+    # routes/artists.py calls Database.get_db() directly rather than via Depends.
+    monkeypatch.setattr(Database, "_db", db)
+    _seed_many(db, 2)
+    app_client.login_as(OWNER)
+
+    response = app_client.get("/api/artist/listings")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["total"] == 2
+    assert {item["title"] for item in body["listings"]} == {"Listing 0", "Listing 1"}
+
+
+def test_card_view_rating_matches_the_browse_page(app_client, db, monkeypatch):
+    monkeypatch.setattr(Database, "_db", db)
+    reviewed, unreviewed = _seed_many(db, 2)
+    reviewed.update(review_count=2, rating_avg=4.5)
+    app_client.login_as(OWNER)
+
+    def ratings(url):
+        return {
+            item["_id"]: (item["rating"], item["review_count"])
+            for item in app_client.get(url).json()["listings"]
+        }
+
+    expected = {str(reviewed["_id"]): (4.5, 2), str(unreviewed["_id"]): (None, 0)}
+    ids = ",".join(expected)
+    assert ratings("/api/listings?view=card") == expected
+    assert ratings("/api/artist/listings?view=card") == expected
+    assert ratings(f"/api/listings/batch?ids={ids}&view=card") == expected
+
+
+
+# --- Conditional GET -------------------------------------------------------- #
+def test_matching_etag_is_a_304_without_touching_mongo(app_client, db, monkeypatch):
+    _seed_many(db, 2)
+    first = app_client.get("/api/listings?category=Crafts")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+
+    def _no_db(*args, **kwargs):
+        raise AssertionError("a 304 must not touch Mongo")
+
+    monkeypatch.setattr(db.get_collection("listings"), "aggregate", _no_db)
+    monkeypatch.setattr(db.get_collection("counters"), "find_one", _no_db)
+    again = app_client.get("/api/listings?category=Crafts", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+
+
+def test_etag_depends_on_the_query(app_client, db):
+    _seed_many(db, 3)
+    a = app_client.get("/api/listings?limit=1")
+    b = app_client.get("/api/listings?limit=2")
+    assert a.headers["ETag"] != b.headers["ETag"]
+    cursor = a.json()["next_cursor"]
+    c = app_client.get(f"/api/listings?limit=1&cursor={cursor}")
+    assert c.headers["ETag"] not in (a.headers["ETag"], b.headers["ETag"])
+
+
+def test_listing_writes_change_the_etag(app_client, db):
+    docs = _seed_many(db, 2)
+    etag = app_client.get("/api/listings").headers["ETag"]
+
+    app_client.login_as(OWNER)
+    app_client.patch(f"/api/listings/{docs[0]['_id']}/status?status=inactive")
+
+    after = app_client.get("/api/listings", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["ETag"] != etag
+    assert db.get_collection("counters").docs[0]["version"] == 1
+
+
+def test_catalogue_version_survives_a_restart(app_client, db):
+    from utils import ttl_cache
+
+    (doc,) = _seed_many(db, 1)
+    app_client.login_as(OWNER)
+    app_client.patch(f"/api/listings/{doc['_id']}/status?status=active")
+    etag = app_client.get("/api/listings").headers["ETag"]
+
+    # A fresh worker re-reads the version from Mongo and agrees on the ETag.
+    ttl_cache.reset_all()
+    response = app_client.get("/api/listings", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+# --- Facets ----------------------------------------------------------------- #
+def _seed_facets(db):
+    for n, category, state, price in (
+        (2, "Pottery", "Rajasthan", 400.0),
+        (1, "Textiles", "Gujarat", 1200.0),
+        (1, "Pottery", "Gujarat", 25000.0),
+    ):
+        _seed_many(
+            db,
+            n,
+            category=category,
+            category_key=category.lower(),
+            state=state,
+            state_key=state.lower(),
+            price=price,
+        )
+
+
+def test_facets_count_every_dimension_in_one_aggregate(app_client, db, monkeypatch):
+    _seed_facets(db)
+    calls = []
+    listings = db.get_collection("listings")
+    original = listings.aggregate
+    monkeypatch.setattr(listings, "aggregate", lambda p: calls.append(p) or original(p))
+
+    body = app_client.get("/api/listings/facets").json()
+    assert len(calls) == 1
+    assert body["total"] == 4
+    assert body["categories"] == [
+        {"key": "pottery", "label": "Pottery", "count": 3},
+        {"key": "textiles", "label": "Textiles", "count": 1},
+    ]
+    assert {s["key"]: s["count"] for s in body["states"]} == {"gujarat": 2, "rajasthan": 2}
+    bands = {b["min"]: b["count"] for b in body["price_bands"]}
+    assert bands[0] == 2 and bands[1000] == 1 and bands[20000] == 1 and bands[500] == 0
+    assert body["price_bands"][-1]["max"] is None
+
+
+def test_facets_ignore_their_own_filter(app_client, db):
+    _seed_facets(db)
+    body = app_client.get("/api/listings/facets?category=Pottery&state=Gujarat").json()
+    assert body["total"] == 1
+    # Every category available in Gujarat, not just the selected one.
+    assert {c["key"]: c["count"] for c in body["categories"]} == {"pottery": 1, "textiles": 1}
+    assert {s["key"]: s["count"] for s in body["states"]} == {"gujarat": 1, "rajasthan": 2}
+
+
+def test_facets_are_cached_until_a_write(app_client, db, monkeypatch):
+    docs = _seed_many(db, 2)
+    app_client.get("/api/listings/facets?category=Crafts")
+    stats = app_client.get("/health/caches").json()["listing_facets"]
+    assert stats["misses"] == 1
+    assert app_client.get("/api/listings/facets?category=crafts").json()["total"] == 2
+    assert app_client.get("/health/caches").json()["listing_facets"]["hits"] == 1
+
+    app_client.login_as(OWNER)
+    app_client.delete(f"/api/listings/{docs[0]['_id']}")
+    assert app_client.get("/api/listings/facets?category=Crafts").json()["total"] == 1
+
+
+# --- NDJSON export ---------------------------------------------------------- #
+def test_export_streams_every_listing_as_ndjson(app_client, db):
+    import json
+
+    docs = _seed_many(db, 5)
+    app_client.login_as(OWNER)
+
+    response = app_client.get("/api/listings/export?batch_size=2")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [str(d["_id"]) for d in docs]
+    assert rows[0]["images"] == ["/placeholder.svg"]
+    assert rows[0]["created_at"] == BASE_TIME.isoformat()
+
+
+def test_export_applies_filters_and_requires_auth(app_client, db):
+    _seed_many(db, 2)
+    _seed_many(db, 1, category="Textiles", category_key="textiles")
+    assert app_client.get("/api/listings/export").status_code == 401
+
+    app_client.login_as(OWNER)
+    lines = app_client.get("/api/listings/export?category=Textiles").text.splitlines()
+    assert len(lines) == 1
+
+
+# --- Typeahead -------------------------------------------------------------- #
+def _seed_suggest(db):
+    _seed_many(db, 2, title="Blue Pottery Vase", category="Pottery", tags=["blue", "vase"])
+    _seed_many(db, 1, title="Block Print Saree", category="Textiles", tags=["block print"])
+    db.get_collection("users").docs.append({"firebase_uid": "artisan-1", "craft": "Blue Pottery"})
+
+
+def test_suggest_matches_word_prefixes_across_sources(app_client, db):
+    _seed_suggest(db)
+    body = app_client.get("/api/listings/suggest?q=bl").json()
+    assert body["query"] == "bl"
+    found = {(s["kind"], s["text"]): s["count"] for s in body["suggestions"]}
+    assert found == {
+        ("title", "Blue Pottery Vase"): 2,
+        ("tag", "blue"): 2,
+        ("title", "Block Print Saree"): 1,
+        ("tag", "block print"): 1,
+        ("craft", "Blue Pottery"): 1,
+    }
+    # Most common first.
+    assert body["suggestions"][0]["count"] == 2
+    vase = app_client.get("/api/listings/suggest?q=VAS").json()["suggestions"]
+    assert [s["text"] for s in vase] == ["vase", "Blue Pottery Vase"]
+
+
+def test_suggest_does_not_query_mongo_per_keystroke(app_client, db, monkeypatch):
+    _seed_suggest(db)
+    app_client.get("/api/listings/suggest?q=b")
+
+    def _no_db(*args, **kwargs):
+        raise AssertionError("suggestions must come from memory")
+
+    for name in ("listings", "users", "counters"):
+        monkeypatch.setattr(db.get_collection(name), "find", _no_db)
+        monkeypatch.setattr(db.get_collection(name), "find_one", _no_db)
+    for q in ("bl", "blu", "blue"):
+        assert app_client.get(f"/api/listings/suggest?q={q}").status_code == 200
+
+
+def test_suggest_index_follows_local_writes_incrementally(app_client, db, monkeypatch):
+    _seed_suggest(db)
+    saree = db.get_collection("listings").docs[-1]
+    assert app_client.get("/api/listings/suggest?q=saree").json()["suggestions"]
+
+    app_client.login_as(OWNER)
+    assert app_client.delete(f"/api/listings/{saree['_id']}").status_code == 200
+
+    def _no_rebuild(*args, **kwargs):
+        raise AssertionError("a local write must not trigger a full rebuild")
+
+    monkeypatch.setattr(db.get_collection("listings"), "find", _no_rebuild)
+    assert app_client.get("/api/listings/suggest?q=saree").json()["suggestions"] == []
+
+
+def test_suggest_index_rebuilds_after_another_workers_write(db):
+    from services.suggest_index import SuggestIndex
+
+    async def scenario():
+        index = SuggestIndex()
+        _seed_suggest(db)
+        await index.ensure_current(db, 0)
+        _seed_many(db, 1, title="Madhubani Painting")
+        await index.ensure_current(db, 0)
+        assert index.suggest("madh") == []
+
+        await index.ensure_current(db, 1)
+        await index._rebuilding
+        assert index.suggest("madh")[0]["text"] == "Madhubani Painting"
+        assert index.version == 1
+
+    asyncio.run(scenario())
+
+
+def test_indexes_catch_up_on_other_workers_writes_without_a_rescan(db, monkeypatch):
+    from services.listing_cache import invalidate_artisan, invalidate_listings
+    from services.suggest_index import SuggestIndex
+
+    async def scenario():
+        index = SuggestIndex()  # this worker's copy
+        _seed_suggest(db)
+        await index.ensure_current(db, 0)
+
+        # Writes handled by another worker.
+        (doc,) = _seed_many(db, 1, title="Madhubani Painting")
+        await invalidate_listings(db, str(doc["_id"]))
+        db.get_collection("users").docs[0]["craft"] = "Dhokra"
+        await invalidate_artisan(db, "artisan-1")
+
+        real_find = db.get_collection("listings").find
+
+        def _no_full_scan(query=None, projection=None):
+            assert query, "catching up must not rescan the catalogue"
+            return real_find(query, projection)
+
+        monkeypatch.setattr(db.get_collection("listings"), "find", _no_full_scan)
+        await index.ensure_current(db, 2)
+        await index._rebuilding
+        assert index.suggest("madh")[0]["text"] == "Madhubani Painting"
+        assert index.suggest("dhok")[0]["text"] == "Dhokra"
+        assert not any(s["kind"] == "craft" for s in index.suggest("blue"))
+        assert index.version == 2
+
+    asyncio.run(scenario())
+
+
+# --- Batch fetch ------------------------------------------------------------ #
+def test_batch_matches_the_detail_endpoint_in_two_queries(app_client, db, monkeypatch):
+    docs = _seed_many(db, 3)
+    db.get_collection("users").docs.append(
+        {"firebase_uid": "artisan-1", "display_name": "Rekha Devi", "email": "a@example.com"}
+    )
+    ids = [str(docs[2]["_id"]), str(ObjectId()), str(docs[0]["_id"]), str(docs[2]["_id"])]
+
+    listings = db.get_collection("listings")
+    queries = []
+    original = (listings.find, listings.find_one)
+
+    def _find(query=None, projection=None):
+        queries.append(query)
+        return original[0](query, projection)
+
+    def _no_find_one(*args, **kwargs):
+        raise AssertionError("the batch must not fetch listings one by one")
+
+    monkeypatch.setattr(listings, "find", _find)
+    monkeypatch.setattr(listings, "find_one", _no_find_one)
+    user_calls = _count_user_queries(db, monkeypatch)
+
+    response = app_client.get(f"/api/listings/batch?ids={','.join(ids)}")
+    assert response.status_code == 200, response.text
+    assert len(queries) == 1 and len(user_calls) == 1
+
+    body = response.json()
+    assert body["missing"] == [ids[1]]
+    monkeypatch.setattr(listings, "find_one", original[1])
+    for item, listing_id in zip(body["listings"], (ids[0], ids[2]), strict=True):
+        detail = app_client.get(f"/api/listings/{listing_id}").json()["listing"]
+        # updated_at defaults to "now" for documents that never set it.
+        item.pop("updated_at"), detail.pop("updated_at")
+        assert item == detail
+
+
+def test_batch_rejects_bad_and_oversized_id_lists(app_client, db):
+    assert app_client.get("/api/listings/batch?ids=nope").status_code == 400
+    assert app_client.get("/api/listings/batch?ids=,").status_code == 400
+    too_many = ",".join(str(ObjectId()) for _ in range(51))
+    assert app_client.get(f"/api/listings/batch?ids={too_many}").status_code == 400
+
+
+# --- Listing detail cache --------------------------------------------------- #
+def test_detail_is_read_through_and_conditional(app_client, db, monkeypatch):
+    doc = _seed_many(db, 1)[0]
+    url = f"/api/listings/{doc['_id']}"
+    first = app_client.get(url)
+    assert first.headers["X-Cache"] == "MISS"
+
+    def _no_db(*args, **kwargs):
+        raise AssertionError("a cached detail must not touch Mongo")
+
+    monkeypatch.setattr(db.get_collection("listings"), "find_one", _no_db)
+    monkeypatch.setattr(db.get_collection("users"), "find", _no_db)
+    second = app_client.get(url)
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+
+    not_modified = app_client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_detail_writes_drop_the_cached_body(app_client, db):
+    doc = _seed_many(db, 1)[0]
+    url = f"/api/listings/{doc['_id']}"
+    etag = app_client.get(url).headers["ETag"]
+
+    app_client.login_as(OWNER)
+    review = {"rating": 5, "comment": "Lovely"}
+    assert app_client.post(f"{url}/reviews", json=review).status_code == 200
+    response = app_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.json()["listing"]["reviews"][0]["comment"] == "Lovely"
+
+    assert app_client.delete(url).status_code == 200
+    assert app_client.get(url).status_code == 404
+
+
+# --- Paginated reviews ------------------------------------------------------ #
+def _seed_reviews(db, n):
+    doc = _seed_many(db, 1, review_count=n)[0]
+    db.get_collection("reviews").docs.extend(
+        {
+            "_id": ObjectId(),
+            "listing_id": doc["_id"],
+            # Pairs share a timestamp, so the `_id` tie-breaker is exercised.
+            "created_at": BASE_TIME + timedelta(minutes=i // 2),
+            "rating": 4,
+            "comment": f"Review {i}",
+            "userId": "u",
+            "userName": "U",
+        }
+        for i in range(n)
+    )
+    return f"/api/listings/{doc['_id']}"
+
+
+def _review_comments(reviews):
+    return [r["comment"] for r in reviews]
+
+
+def test_reviews_page_newest_first_by_cursor(app_client, db):
+    url = _seed_reviews(db, 7)
+    seen = []
+    body = app_client.get(f"{url}/reviews?limit=3").json()
+    assert body["total"] == 7
+    seen.extend(_review_comments(body["reviews"]))
+    while body["next_cursor"]:
+        body = app_client.get(f"{url}/reviews?limit=3&cursor={body['next_cursor']}").json()
+        seen.extend(_review_comments(body["reviews"]))
+    assert seen == [f"Review {i}" for i in range(6, -1, -1)]
+
+    assert app_client.get(f"{url}/reviews?cursor=garbage").status_code == 400
+
+
+def test_reviews_cursor_is_stable_while_reviews_arrive(app_client, db):
+    url = _seed_reviews(db, 4)
+    first = app_client.get(f"{url}/reviews?limit=2").json()
+
+    app_client.login_as(OWNER)
+    assert app_client.post(f"{url}/reviews", json={"rating": 5, "comment": "New"}).status_code == 200
+    rest = app_client.get(f"{url}/reviews?limit=2&cursor={first['next_cursor']}").json()
+    assert _review_comments(rest["reviews"]) == ["Review 1", "Review 0"]
+    assert rest["total"] == 5
+    latest = app_client.get(f"{url}/reviews?limit=1").json()["reviews"]
+    assert _review_comments(latest) == ["New"]
+
+
+def test_detail_review_modes(app_client, db):
+    url = _seed_reviews(db, 8)
+    latest = app_client.get(f"{url}?reviews=latest").json()["listing"]
+    assert _review_comments(latest["reviews"]) == [f"Review {i}" for i in range(3, 8)]
+    none = app_client.get(f"{url}?reviews=none").json()["listing"]
+    assert none["reviews"] == [] and none["review_count"] == 8
+    every = app_client.get(url).json()["listing"]["reviews"]
+    assert _review_comments(every) == [f"Review {i}" for i in range(8)]
+
+
+def test_migration_moves_embedded_reviews_out_of_listings(db):
+    review_id = ObjectId()
+    embedded = [
+        {"id": str(review_id), "rating": 5, "comment": "Lovely", "userId": "u", "userName": "U"},
+        {"id": "legacy", "rating": 3, "comment": "Ok", "date": "March 02, 2025"},
+    ]
+    (doc,) = _seed_many(db, 1, reviews=embedded)
+    reviews = db.get_collection("reviews")
+    # An earlier, interrupted run already copied the first one.
+    reviews.docs.append({"_id": review_id, "listing_id": doc["_id"], "comment": "Lovely"})
+
+    asyncio.run(run_migrations(db))
+
+    assert "reviews" not in doc
+    assert (doc["review_count"], doc["rating_sum"]) == (2, 8)
+    assert sorted(r["comment"] for r in reviews.docs) == ["Lovely", "Ok"]
+    legacy = next(r for r in reviews.docs if r["comment"] == "Ok")
+    assert legacy["listing_id"] == doc["_id"]
+    assert legacy["created_at"] == datetime(2025, 3, 2)
+
+
+def test_failed_migration_stops_the_chain_until_it_succeeds(db, monkeypatch):
+    from services import migrations
+
+    (doc,) = _seed_many(db, 1, reviews=[{"rating": 4, "comment": "Nice"}])
+    real = dict(migrations.MIGRATIONS)
+    calls = []
+
+    async def _flaky_backfill(db):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("primary stepped down")
+        return await real["2025_review_aggregates"](db)
+
+    monkeypatch.setattr(
+        migrations,
+        "MIGRATIONS",
+        [
+            (name, _flaky_backfill if name == "2025_review_aggregates" else migration)
+            for name, migration in migrations.MIGRATIONS
+        ],
+    )
+
+    asyncio.run(run_migrations(db))
+    assert "reviews" in doc  # the move waited for the backfill
+    applied = {d["_id"] for d in db.get_collection("schema_migrations").docs}
+    assert applied == {"2025_listing_filter_keys"}
+
+    asyncio.run(run_migrations(db))
+    assert "reviews" not in doc
+    assert (doc["review_count"], doc["rating_sum"], doc["rating_avg"]) == (1, 4, 4.0)
+    assert len(db.get_collection("reviews").docs) == 1
+
+
+def test_only_one_worker_runs_the_migrations(db):
+    from services.migrations import MIGRATION_LOCK_ID
+
+    records = db.get_collection("schema_migrations")
+    records.docs.append(
+        {"_id": MIGRATION_LOCK_ID, "expires_at": datetime.utcnow() + timedelta(minutes=5)}
+    )
+    asyncio.run(run_migrations(db))  # another worker holds the lease
+    assert [d["_id"] for d in records.docs] == [MIGRATION_LOCK_ID]
+
+    records.docs[0]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    asyncio.run(run_migrations(db))  # ...and died: the lease has lapsed
+    assert "2025_listing_filter_keys" in {d["_id"] for d in records.docs}
+    assert MIGRATION_LOCK_ID not in {d["_id"] for d in records.docs}
+
+
+def test_a_migration_recorded_meanwhile_does_not_fail_the_boot(db, monkeypatch):
+    from services import migrations
+
+    async def _recorded_by_a_manual_run(db):
+        await db["schema_migrations"].insert_one({"_id": "2025_only"})
+        return 0
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [("2025_only", _recorded_by_a_manual_run)])
+    asyncio.run(run_migrations(db))
+    assert [d["_id"] for d in db.get_collection("schema_migrations").docs] == ["2025_only"]
+
+
+def test_review_move_materializes_missing_aggregates(db):
+    from services.migrations import move_reviews_to_collection
+
+    (doc,) = _seed_many(db, 1, reviews=[{"rating": 5}, {"rating": 2}, {"comment": "?"}])
+    asyncio.run(move_reviews_to_collection(db))
+    assert "reviews" not in doc
+    assert (doc["review_count"], doc["rating_sum"], doc["rating_avg"]) == (3, 7, 3.5)
+
+
+# --- Sort orders ------------------------------------------------------------ #
+def _seed_sortable(db):
+    docs = _seed_many(db, 6)
+    # Pairs tie on every sort key, so `_id` has to break them.
+    values = [
+        (300.0, 2, 4.5),
+        (100.0, 0, 0.0),
+        (300.0, 9, 3.0),
+        (200.0, 2, 4.5),
+        (50.0, 9, 5.0),
+        (100.0, 1, 2.0),
+    ]
+    for doc, (price, count, avg) in zip(docs, values):
+        doc.update(price=price, review_count=count, rating_sum=count * avg, rating_avg=avg)
+    return docs
+
+
+def _desc(object_id):
+    return tuple(-b for b in object_id.binary)
+
+
+def test_every_sort_pages_through_in_order(app_client, db):
+    docs = _seed_sortable(db)
+    expectations = {
+        "price_asc": lambda d: (d["price"], d["_id"]),
+        "price_desc": lambda d: (-d["price"], _desc(d["_id"])),
+        "rating": lambda d: (-d["rating_avg"], -d["review_count"], _desc(d["_id"])),
+        "popular": lambda d: (-d["review_count"], _desc(d["_id"])),
+    }
+    for sort, key in expectations.items():
+        expected = [str(d["_id"]) for d in sorted(docs, key=key)]
+        assert _walk(app_client, f"/api/listings?sort={sort}&limit=2") == expected, sort
+
+
+def test_price_sorts_reach_every_listing_after_a_legacy_price(app_client, db):
+    docs = _seed_many(db, 4)
+    del docs[0]["price"]  # legacy: suggested_price only
+    docs[0]["suggested_price"] = "₹1,250"
+    docs[1]["price"] = "₹80"
+    docs[2]["price"] = None
+    docs[2]["suggested_price"] = "not a price"
+
+    asyncio.run(run_migrations(db))
+
+    assert [d["price"] for d in docs] == [1250.0, 80.0, 0.0, 103.0]
+    expected = [str(d["_id"]) for d in (docs[2], docs[1], docs[3], docs[0])]
+    assert _walk(app_client, "/api/listings?sort=price_asc&limit=1") == expected
+    assert _walk(app_client, "/api/listings?sort=price_desc&limit=1") == expected[::-1]
+    cards = app_client.get("/api/listings?sort=price_asc").json()["listings"]
+    assert [card["price"] for card in cards] == [0.0, 80.0, 103.0, 1250.0]
+
+
+def test_price_backfill_reads_and_writes_only_what_needs_it(db, monkeypatch):
+    from services.migrations import backfill_numeric_prices
+
+    docs = _seed_many(db, 3)
+    docs[0]["price"] = "₹1,250"
+    docs[1]["price"] = 0
+    docs[1]["suggested_price"] = "₹90"
+    listings = db.get_collection("listings")
+    real_find = listings.find
+    read = []
+
+    def _find(query=None, projection=None):
+        cursor = real_find(query, projection)
+        read.extend(doc["_id"] for doc in cursor._docs)
+        return cursor
+
+    async def _one_at_a_time(*args, **kwargs):
+        raise AssertionError("writes go through bulk_write")
+
+    monkeypatch.setattr(listings, "find", _find)
+    monkeypatch.setattr(listings, "update_one", _one_at_a_time)
+    assert asyncio.run(backfill_numeric_prices(db)) == 2
+    assert read == [docs[0]["_id"], docs[1]["_id"]]
+    assert [d["price"] for d in docs] == [1250.0, 90.0, 102.0]
+
+
+def test_sort_keys_stay_out_of_the_cards(app_client, db):
+    _seed_sortable(db)
+    body = app_client.get("/api/listings?sort=rating&limit=2").json()
+    assert "rating_avg" not in body["listings"][0]
+    assert body["listings"][0]["rating"] == 5.0
+    assert app_client.get("/api/listings?sort=cheapest").status_code == 422
+
+
+def test_sorted_search_stays_on_the_text_index(app_client, db):
+    _seed_titles(db, "Blue pottery vase", "Pottery bowl", "Pottery lamp")
+    prices = {"Blue pottery vase": 300.0, "Pottery bowl": 100.0, "Pottery lamp": 200.0}
+    for doc in db.get_collection("listings").docs:
+        doc["price"] = prices[doc["title"]]
+
+    first = app_client.get("/api/listings?search=pottery&sort=price_asc&limit=2")
+    assert first.headers["X-Search-Mode"] == "text"
+    body = first.json()
+    nxt = app_client.get(
+        f"/api/listings?search=pottery&sort=price_asc&limit=2&cursor={body['next_cursor']}"
+    )
+    assert nxt.headers["X-Search-Mode"] == "text"
+    titles = [item["title"] for item in body["listings"] + nxt.json()["listings"]]
+    assert titles == ["Pottery bowl", "Pottery lamp", "Blue pottery vase"]
+
+
+# --- View profiles ---------------------------------------------------------- #
+def test_card_view_reads_and_sends_only_card_fields(app_client, db, monkeypatch):
+    _seed_many(db, 2, specifications={"size": "L"}, shippingInfo={"days": "3"}, secret="x")
+    listings = db.get_collection("listings")
+    pipelines = []
+    original = listings.aggregate
+
+    def _aggregate(pipeline):
+        pipelines.append(pipeline)
+        return original(pipeline)
+
+    monkeypatch.setattr(listings, "aggregate", _aggregate)
+    card = app_client.get("/api/listings?view=card").json()["listings"][0]
+    full = app_client.get("/api/listings").json()["listings"][0]
+
+    for field in ("specifications", "shippingInfo", "secret", "reviews", "ai_metadata"):
+        assert field not in card
+    assert {"_id", "title", "price", "images", "artisan", "rating"} <= set(card)
+    assert "ai_metadata" in full
+    projected = pipelines[0][-1]["$facet"]["page"][-1]["$project"]
+    assert "updated_at" not in projected and "title" in projected
+
+
+def test_cart_view_in_batch_and_sorted_pages(app_client, db):
+    from models.listingModel import ListingCartItem
+
+    docs = _seed_many(db, 3)
+    ids = ",".join(str(d["_id"]) for d in docs)
+    items = app_client.get(f"/api/listings/batch?ids={ids}&view=cart").json()["listings"]
+    assert set(items[0]) == set(ListingCartItem.model_fields) - {"id"} | {"_id"}
+    # The cursor still works when the view does not render the sort key.
+    walked = _walk(app_client, "/api/listings?view=cart&sort=popular&limit=2")
+    assert sorted(walked) == sorted(str(d["_id"]) for d in docs)
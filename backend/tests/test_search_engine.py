@@ -0,0 +1,107 @@
+"""The in-process BM25 engine, on its own and behind GET /api/listings."""
+
+import pytest
+from bson import ObjectId
+
+from routes import listing as listing_routes
+from services.search_engine import ListingSearchEngine
+
+from .test_listings import OWNER, _seed_many
+
+
+def _engine(*docs):
+    engine = ListingSearchEngine()
+    engine.load(docs)
+    return engine
+
+
+def _doc(title, description="", tags=(), **extra):
+    return {
+        "_id": ObjectId(),
+        "title": title,
+        "description": description,
+        "tags": list(tags),
+        **extra,
+    }
+
+
+def test_title_outranks_tags_outranks_description():
+    in_title = _doc("Brass lamp")
+    in_tags = _doc("Table light", tags=["brass"])
+    in_description = _doc("Table light", description="Made of brass")
+    page, total = _engine(in_description, in_tags, in_title).search("brass")
+    assert total == 3
+    expected = [in_title, in_tags, in_description]
+    assert [key[2] for key in page] == [str(doc["_id"]) for doc in expected]
+
+
+def test_synonyms_share_a_term():
+    painting = _doc("Madhubani fish painting")
+    page, _ = _engine(painting).search("mithila")
+    assert [key[2] for key in page] == [str(painting["_id"])]
+
+
+def test_filters_and_keyset_paging():
+    docs = [_doc(f"Silk stole {i}", price=100.0 * i, category="Textiles") for i in range(1, 6)]
+    docs.append(_doc("Silk purse", price=300.0, category="Bags"))
+    engine = _engine(*docs)
+
+    page, total = engine.search("silk", category_key="textiles", max_price=400, limit=2)
+    assert total == 4
+    assert len(page) == 3  # limit + 1
+    rest, _ = engine.search("silk", category_key="textiles", max_price=400, after=page[1], limit=10)
+    assert len(page[:2]) + len(rest) == 4
+    assert not {k[2] for k in page[:2]} & {k[2] for k in rest}
+
+
+def test_updates_tombstone_and_compact():
+    docs = [_doc(f"Jute bag {i}") for i in range(4)]
+    engine = _engine(*docs)
+    engine.update_listing(str(docs[0]["_id"]), None)
+    engine.update_listing(str(docs[1]["_id"]), _doc("Wooden toy"))
+    engine.update_listing(str(docs[2]["_id"]), None)  # passes the dead ratio
+
+    assert engine._dead == 0
+    assert len(engine) == 2
+    assert [key[2] for key in engine.search("jute")[0]] == [str(docs[3]["_id"])]
+    assert [key[2] for key in engine.search("toy")[0]] == [str(docs[1]["_id"])]
+
+
+# --- Behind GET /api/listings ---------------------------------------------- #
+@pytest.fixture
+def engine_enabled(monkeypatch):
+    monkeypatch.setattr(listing_routes, "SEARCH_ENGINE_ENABLED", True)
+
+
+def test_listings_search_is_answered_by_the_engine(app_client, db, engine_enabled):
+    _seed_many(db, 3, title="Madhubani painting")
+    _seed_many(db, 2, title="Block print saree")
+
+    response = app_client.get("/api/listings?search=mithila&search_mode=engine&limit=2")
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Search-Mode"] == "engine"
+    body = response.json()
+    assert body["total"] == 3
+    assert [item["title"] for item in body["listings"]] == ["Madhubani painting"] * 2
+
+    nxt = app_client.get(f"/api/listings?search=mithila&limit=2&cursor={body['next_cursor']}")
+    assert nxt.headers["X-Search-Mode"] == "engine"
+    assert len(nxt.json()["listings"]) == 1
+    assert nxt.json()["next_cursor"] is None
+
+
+def test_engine_follows_listing_writes(app_client, db, engine_enabled):
+    docs = _seed_many(db, 2, title="Dhokra horse")
+    assert app_client.get("/api/listings?search=dokra&search_mode=engine").json()["total"] == 2
+
+    app_client.login_as(OWNER)
+    app_client.delete(f"/api/listings/{docs[0]['_id']}")
+    body = app_client.get("/api/listings?search=dokra&search_mode=engine").json()
+    assert body["total"] == 1
+    assert body["listings"][0]["_id"] == str(docs[1]["_id"])
+
+
+def test_engine_mode_is_ignored_when_disabled(app_client, db):
+    _seed_many(db, 1, title="Brass lamp")
+    response = app_client.get("/api/listings?search=brass&search_mode=engine")
+    assert response.headers["X-Search-Mode"] == "text"
@@ -0,0 +1,49 @@
+"""`Range` / `If-Range` for GET /listings/{id}/images/{image_id}.
+
+Single byte ranges only, which is what resumed downloads and media players
+send. Anything else - another unit, several ranges, a malformed header - is
+ignored and the whole file is served, as RFC 9110 allows.
+"""
+
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """The range starts past the end of the file: a 416."""
+
+
+def parse_range(header: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+    """`bytes=` range -> inclusive (start, end) within `length`, or None to
+    serve the whole file."""
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes.
+            suffix = int(last)
+            if suffix <= 0 or length == 0:
+                raise RangeNotSatisfiable(header)
+            return max(length - suffix, 0), length - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start < 0 or (end is not None and end < start):
+        return None
+    if start >= length:
+        raise RangeNotSatisfiable(header)
+    return start, length - 1 if end is None else min(end, length - 1)
+
+
+def if_range_allows(if_range: Optional[str], etag: str) -> bool:
+    """Whether a Range may be honoured. If-Range must carry our (strong) ETag;
+    a date or any other validator means "send the whole thing"."""
+    if not if_range:
+        return True
+    return if_range.strip() == etag and not etag.startswith("W/")
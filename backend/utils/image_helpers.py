@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import List
+from typing import List, Optional
 
 from bson import ObjectId
 from dotenv import load_dotenv
@@ -23,6 +23,15 @@ if not (os.getenv("API_BASE_URL") or os.getenv("NEXT_PUBLIC_API_BASE_URL")):
         API_BASE_URL,
     )
 
+# Stored renditions of every uploaded image: longest edge in pixels, smallest
+# first. `full` is the GridFS file listed in a listing's `image_ids`; the
+# smaller ones are separate GridFS files linked to it through the listing's
+# `image_renditions`. Grid tiles and cart rows used to download the 1600px
+# file to draw 200px thumbnails.
+IMAGE_RENDITIONS = {"thumb": 320, "card": 640, "full": 1600}
+IMAGE_SIZES = tuple(IMAGE_RENDITIONS)
+FULL_IMAGE_SIZE = "full"
+
 
 def _image_id_str(img_id) -> str:
     if isinstance(img_id, ObjectId):
@@ -34,18 +43,27 @@ def _image_id_str(img_id) -> str:
     return ""
 
 
-def construct_image_urls(listing_id: str, image_ids: List[str]) -> List[str]:
-    """Construct full image URLs from a listing ID and its image IDs."""
+def construct_image_urls(
+    listing_id: str, image_ids: List[str], size: Optional[str] = None
+) -> List[str]:
+    """Construct full image URLs from a listing ID and its image IDs.
+
+    `size` picks one of IMAGE_RENDITIONS; None (or `full`) is the stored
+    original, at the URL it has always had.
+    """
+    query = f"?size={size}" if size and size != FULL_IMAGE_SIZE else ""
     urls = []
     for img_id in image_ids:
         img_id_str = _image_id_str(img_id)
         if img_id_str:
-            urls.append(f"{API_BASE_URL}/api/listings/{listing_id}/images/{img_id_str}")
+            urls.append(f"{API_BASE_URL}/api/listings/{listing_id}/images/{img_id_str}{query}")
         else:
             urls.append("/placeholder.svg")
     return urls or ["/placeholder.svg"]
 
 
-def get_first_image_url(listing_id: str, image_ids: List[str]) -> str:
+def get_first_image_url(
+    listing_id: str, image_ids: List[str], size: Optional[str] = None
+) -> str:
     """Get the first image URL, or a placeholder if there are none."""
-    return construct_image_urls(listing_id, image_ids)[0]
+    return construct_image_urls(listing_id, image_ids, size)[0]
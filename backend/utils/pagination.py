@@ -0,0 +1,111 @@
+"""Opaque keyset cursors for the paginated list endpoints.
+
+`$skip` makes Mongo walk and discard every earlier document, so page 500 of
+the marketplace cost 500x page 1. A keyset cursor instead remembers the sort
+key of the last row served and asks for rows strictly after it, which an index
+on the same keys answers in constant time regardless of depth.
+
+The cursor is opaque to clients: base64url of a small JSON document carrying a
+tag (which sort order it belongs to) and the sort-key values of the last row.
+It is not signed - tampering with it can only change which page you get.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not produced by `encode_cursor` for this sort order."""
+
+
+def _encode_value(value: Any) -> Any:
+    # bson.json_util truncates datetimes to milliseconds; keep full precision so
+    # the keyset comparison is exact against whatever the driver handed us.
+    if isinstance(value, datetime):
+        return {"d": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"o": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "d" in value:
+            return datetime.fromisoformat(value["d"])
+        if "o" in value:
+            return ObjectId(value["o"])
+        raise InvalidCursor("Unknown cursor value")
+    return value
+
+
+def _get_path(doc: dict, path: str) -> Any:
+    current: Any = doc
+    for part in path.split("."):
+        if not isinstance(current, dict):
+            return None
+        current = current.get(part)
+    return current
+
+
+def encode_cursor(tag: str, values: Sequence[Any]) -> str:
+    raw = json.dumps(
+        {"s": tag, "k": [_encode_value(v) for v in values]}, separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _load(cursor: str) -> Any:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def cursor_tag(cursor: str) -> Optional[str]:
+    """The sort-order tag inside `cursor`, or None if it is unreadable."""
+    try:
+        payload = _load(cursor)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+    return payload.get("s") if isinstance(payload, dict) else None
+
+
+def decode_cursor(cursor: str, tag: str, size: int) -> List[Any]:
+    """Return the sort-key values in `cursor`, or raise InvalidCursor."""
+    try:
+        payload = _load(cursor)
+        if not isinstance(payload, dict) or payload.get("s") != tag:
+            raise InvalidCursor("Cursor belongs to a different sort order")
+        values = payload.get("k")
+        if not isinstance(values, list) or len(values) != size:
+            raise InvalidCursor("Malformed cursor")
+        return [_decode_value(v) for v in values]
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, InvalidId, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def cursor_for(doc: dict, tag: str, sort: SortSpec) -> str:
+    """The cursor that resumes right after `doc` in `sort` order."""
+    return encode_cursor(tag, [_get_path(doc, field) for field, _ in sort])
+
+
+def keyset_filter(sort: SortSpec, values: Sequence[Any]) -> dict:
+    """A `$or` selecting documents strictly after `values` in `sort` order.
+
+    For sort [(a, -1), (b, -1)] that is `a < va OR (a == va AND b < vb)`; the
+    last key must be unique (`_id`) so no two rows ever tie.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev: value for (prev, _), value in zip(sort[:i], values[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
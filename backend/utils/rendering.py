@@ -0,0 +1,129 @@
+"""Fast JSON rendering for the list endpoints.
+
+GET /listings and GET /artist/listings used to build a `Listing(**doc)` per
+row, wrap them in a `ListingsResponse`, and then let FastAPI validate and
+`jsonable_encoder` the whole thing again on the way out - three Python walks
+over every card on a 100-card page. The documents are ours (projected by the
+route, normalised by `serialize_listing_doc`), so they are validated once, as a
+list, in pydantic-core, and the result goes straight to orjson.
+
+The bytes are identical to what the response_model path rendered: same
+aliases, same ISO datetimes, same key order. tests/test_listings.py pins that.
+"""
+
+import logging
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import orjson
+from pydantic import TypeAdapter, ValidationError
+
+from models.listingModel import Listing, ListingCard, ListingCartItem
+
+logger = logging.getLogger(__name__)
+
+# `view=` profiles for the listing endpoints. Every client used to get the
+# whole `Listing` - specifications, shippingInfo, AI metadata and whatever
+# `extra = "allow"` let through - whether it drew a grid tile or a cart line.
+# A view picks the response model and, through view_projection(), what is
+# read from Mongo in the first place.
+VIEW_MODELS = {"full": Listing, "card": ListingCard, "cart": ListingCartItem}
+LISTING_VIEWS = tuple(VIEW_MODELS)
+_VIEW_ADAPTERS = {view: TypeAdapter(List[model]) for view, model in VIEW_MODELS.items()}
+LISTINGS_ADAPTER = _VIEW_ADAPTERS["full"]
+
+# Response fields built from another document field rather than read as is.
+_DERIVED_FROM = {"images": "image_ids", "artisan": "artist_id"}
+
+
+def _source_fields(model) -> FrozenSet[str]:
+    return frozenset(
+        _DERIVED_FROM.get(info.alias or name, info.alias or name)
+        for name, info in model.model_fields.items()
+    )
+
+
+VIEW_SOURCE_FIELDS: Dict[str, FrozenSet[str]] = {
+    view: _source_fields(model) for view, model in VIEW_MODELS.items() if view != "full"
+}
+
+# Pydantic renders UTC datetimes with a trailing "Z"; match it. `default=str`
+# mirrors the models' `json_encoders = {ObjectId: str}` for anything that
+# slipped through `extra = "allow"`.
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def render_json(payload: Any) -> bytes:
+    return orjson.dumps(payload, default=str, option=_ORJSON_OPTIONS)
+
+
+def view_projection(view: str, base: Optional[dict] = None) -> Optional[dict]:
+    """The projection that reads only what `view` renders.
+
+    `base` is the endpoint's projection for the full view, whose computed
+    fields (the truncated description, `rating`) a narrower view keeps; None
+    means whole documents.
+    """
+    if view == "full":
+        return base
+    fields = VIEW_SOURCE_FIELDS[view]
+    if base is None:
+        return {field: 1 for field in fields}
+    return {field: spec for field, spec in base.items() if field in fields}
+
+
+def validate_listings(docs: List[dict], view: str = "full") -> Tuple[List[Any], int]:
+    """Validate a page of serialized listing docs in one pass.
+
+    Returns (listings, skipped). A document that fails validation is dropped
+    and logged, as the per-item loop used to do; the rest of the page is then
+    validated again without it.
+    """
+    skipped = 0
+    while docs:
+        try:
+            return _VIEW_ADAPTERS[view].validate_python(docs), skipped
+        except ValidationError as exc:
+            bad = {err["loc"][0] for err in exc.errors() if err.get("loc")}
+            if not bad:
+                raise
+            for index in sorted(bad):
+                logger.warning(
+                    "Skipping listing %s: does not validate against the %s view",
+                    docs[index].get("id"),
+                    view,
+                )
+            skipped += len(bad)
+            docs = [doc for i, doc in enumerate(docs) if i not in bad]
+    return [], skipped
+
+
+def dump_listings(listings: Iterable[Any], view: str = "full") -> list:
+    return _VIEW_ADAPTERS[view].dump_python(list(listings), by_alias=True)
+
+
+def render_listings_response(
+    listings: Iterable[Any],
+    *,
+    view: str = "full",
+    dumped: bool = False,
+    total: Optional[int],
+    limit: int,
+    skip: int,
+    has_more: bool = False,
+    next_cursor: Optional[str] = None,
+) -> bytes:
+    """A `ListingsResponse` body, without building a `ListingsResponse`.
+
+    `dumped`: the listings are already plain dicts in the view's shape (read
+    from services/listing_cards.py), not models.
+    """
+    return render_json(
+        {
+            "listings": list(listings) if dumped else dump_listings(listings, view),
+            "total": total,
+            "has_more": has_more,
+            "limit": limit,
+            "skip": skip,
+            "next_cursor": next_cursor,
+        }
+    )
@@ -8,13 +8,41 @@ same listing serialized differently depending on which endpoint you hit.
 """
 
 import logging
+import os
 from datetime import datetime
 from typing import Any, Dict, Iterable, List, Optional
 
 from bson import ObjectId
 
+from utils.ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Projected artisan documents keyed by firebase_uid. Every listings page used
+# to re-query `users` for the same popular artisans. Profile writes call
+# services.listing_cache.invalidate_artisan(); the TTL bounds staleness from
+# other workers' writes.
+ARTISAN_CACHE = TTLCache(
+    "artisans",
+    int(os.getenv("ARTISAN_CACHE_MAX_ENTRIES", "2048")),
+    float(os.getenv("ARTISAN_CACHE_TTL_SECONDS", "300")),
+)
+_MISSING = object()
+
+ARTISAN_PROJECTION = {
+    "firebase_uid": 1,
+    "display_name": 1,
+    "name": 1,
+    "craft": 1,
+    "region": 1,
+    "state": 1,
+    "address": 1,
+    "experience": 1,
+    "rating": 1,
+    "bio": 1,
+    "avatar_url": 1,
+}
+
 DEFAULT_ARTISAN = {
     "id": None,
     "name": "Unknown Artisan",
@@ -48,6 +76,50 @@ def parse_price(value: Any, default: float = 0.0) -> float:
         return default
 
 
+def filter_key(value: Any) -> Optional[str]:
+    """Canonical, index-friendly form of a category/state filter value.
+
+    The `$trim` + `$toLower` backfill in services/migrations.py must agree.
+    """
+    if not isinstance(value, str):
+        return None
+    return value.strip().lower()
+
+
+def listing_filter_keys(listing_doc: dict) -> Dict[str, Optional[str]]:
+    """`category_key` / `state_key` to store alongside a listing."""
+    return {
+        "category_key": filter_key(listing_doc.get("category")),
+        "state_key": filter_key(listing_doc.get("state")),
+    }
+
+
+def review_aggregate_update(rating: int) -> list:
+    """Pipeline update that counts one more review of `rating`.
+
+    Reviews live in their own collection; the listing keeps only
+    `review_count` / `rating_sum` / `rating_avg`, which the list endpoints
+    read. `rating_avg` is 0 rather than null with no reviews so it stays
+    sortable; readers gate it on `review_count`.
+    """
+    return [
+        {
+            "$set": {
+                "review_count": {"$add": [{"$ifNull": ["$review_count", 0]}, 1]},
+                "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating]},
+            }
+        },
+        {"$set": {"rating_avg": {"$divide": ["$rating_sum", "$review_count"]}}},
+    ]
+
+
+def serialize_review_doc(review_doc: dict) -> dict:
+    """A `reviews` collection document in the shape of the `Review` model."""
+    doc: Dict[str, Any] = _convert_objectids(review_doc)
+    doc["id"] = doc.pop("_id", None) or doc.get("id")
+    return doc
+
+
 def serialize_listing_doc(listing_doc: dict) -> dict:
     """Normalise a raw `listings` document for the `Listing` Pydantic model."""
     # _convert_objectids already rebuilds every dict/list, so the caller's
@@ -63,6 +135,9 @@ def serialize_listing_doc(listing_doc: dict) -> dict:
 
     image_ids = doc.get("image_ids")
     doc["image_ids"] = [str(i) for i in image_ids] if isinstance(image_ids, list) else []
+    # GridFS ids of the smaller renditions: internal, read only by the image
+    # endpoint's `?size=`.
+    doc.pop("image_renditions", None)
 
     doc.setdefault("tags", [])
     doc.setdefault("story", "")
@@ -107,28 +182,38 @@ def build_artisan_block(user_doc: Optional[dict]) -> Dict[str, Any]:
     }
 
 
-async def fetch_artisans_by_uid(db, uids: Iterable[str]) -> Dict[str, dict]:
-    """One `$in` query instead of one query per listing (the marketplace N+1)."""
-    unique = [u for u in {u for u in uids if u}]
-    if not unique:
-        return {}
-    cursor = db["users"].find(
-        {"firebase_uid": {"$in": unique}},
-        {
-            "firebase_uid": 1,
-            "display_name": 1,
-            "name": 1,
-            "craft": 1,
-            "region": 1,
-            "state": 1,
-            "address": 1,
-            "experience": 1,
-            "rating": 1,
-            "bio": 1,
-            "avatar_url": 1,
-        },
-    )
-    return {doc["firebase_uid"]: doc async for doc in cursor}
+async def fetch_artisans_by_uid(
+    db, uids: Iterable[str], use_cache: bool = True
+) -> Dict[str, dict]:
+    """One `$in` query instead of one query per listing (the marketplace N+1),
+    and only for the artisans not already in ARTISAN_CACHE.
+
+    `use_cache=False` reads every artisan from `users` (and refreshes the
+    cache with it): for writes to shared state such as `listing_cards`, which
+    must not persist another worker's stale copy.
+    """
+    found: Dict[str, dict] = {}
+    misses = []
+    for uid in {u for u in uids if u}:
+        if not use_cache:
+            misses.append(uid)
+            continue
+        cached = ARTISAN_CACHE.get(uid, _MISSING)
+        if cached is _MISSING:
+            misses.append(uid)
+        elif cached is not None:
+            found[uid] = cached
+    if not misses:
+        return found
+
+    cursor = db["users"].find({"firebase_uid": {"$in": misses}}, ARTISAN_PROJECTION)
+    async for doc in cursor:
+        found[doc["firebase_uid"]] = doc
+    for uid in misses:
+        # Unknown uids are cached as None too, so a listing whose artisan was
+        # deleted does not cost a query on every page view.
+        ARTISAN_CACHE.set(uid, found.get(uid))
+    return found
 
 
 def serialize_datetimes(doc: dict, keys: List[str]) -> dict:
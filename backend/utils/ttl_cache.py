@@ -0,0 +1,112 @@
+"""A tiny in-process TTL + LRU cache with hit/miss counters.
+
+Same trade-offs as utils/rate_limit.py, for the same reason: the hot read
+paths (the marketplace home page sends the same few `GET /listings` queries
+thousands of times a minute) need a cache today, without adding Redis to the
+stack.
+
+KNOWN LIMITATIONS:
+
+  * State lives in this process. With N uvicorn workers there are N caches,
+    and a write only invalidates the cache of the worker that handled it - the
+    others serve their copy until its TTL runs out. Keep TTLs short for
+    anything a user can change.
+  * Not thread-safe. Every caller runs on the event loop; nothing here awaits,
+    so no lock is needed there. Do not share an instance with worker threads.
+
+Every instance registers itself by name so `cache_stats()` can report all of
+them from one place (GET /health/caches). Other caches join with register().
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+# name -> anything with stats() and reset(); TTLCache instances add themselves.
+_REGISTRY: Dict[str, Any] = {}
+
+
+class TTLCache:
+    """At most `maxsize` entries, each living at most `ttl_seconds`.
+
+    Expired entries are dropped lazily on read; the LRU bound keeps the ones
+    nobody reads again from piling up.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl_seconds: float):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        if ttl_seconds <= 0:
+            raise ValueError("ttl_seconds must be > 0")
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = float(ttl_seconds)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        _REGISTRY[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry. Counters survive; use reset() to zero them too."""
+        self._data.clear()
+
+    def reset(self) -> None:
+        """Drop all state. Used by tests; never called at runtime."""
+        self._data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def register(name: str, cache: Any) -> None:
+    """Report a cache that is not a TTLCache; it needs stats() and reset()."""
+    _REGISTRY[name] = cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters for every cache in the process, keyed by cache name."""
+    return {name: cache.stats() for name, cache in sorted(_REGISTRY.items())}
+
+
+def reset_all() -> None:
+    """Reset every registered cache. Used by tests; never called at runtime."""
+    for cache in _REGISTRY.values():
+        cache.reset()
@@ -161,6 +161,8 @@ export default function Marketplace() {
           max_price: query.maxPrice < MAX_PRICE ? query.maxPrice : undefined,
           category: query.category,
           state: query.region,
+          // Grid tiles only: no specifications, shipping info or AI metadata.
+          view: "card",
         });
 
         const res = await fetch(`${API_BASE_URL}/api/listings${qs}`, { signal: controller.signal });
@@ -177,7 +179,7 @@ export default function Marketplace() {
             description: item.description || "",
             price: toPrice(item.price),
             image: item.image_ids?.[0]
-              ? `${API_BASE_URL}/api/listings/${item._id}/images/${item.image_ids[0]}`
+              ? `${API_BASE_URL}/api/listings/${item._id}/images/${item.image_ids[0]}?size=card`
               : undefined,
             artisanName: item.artisan?.name || "Independent maker",
             region: item.artisan?.region || item.artisan?.location || "",